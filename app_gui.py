@@ -4,6 +4,8 @@ from pathlib import Path
 import pandas as pd
 import streamlit as st
 
+from biological_random_walks.experiment_spec import load_experiment_spec
+
 
 # ---------- Constants ----------
 ROOT = Path(__file__).resolve().parent
@@ -15,19 +17,14 @@ PPI = DATA / "ppi_network/HIPPIE.tsv"
 ONTO = DATA / "ontology/ontology_graph.txt"
 ONCOKB = ROOT / "Dataset OncoKB.xlsx"
 
-CANCERS = ["BRCA", "COAD", "LUAD", "THCA", "BLCA", "PRAD", "STAD"]
-
-ABLATIONS = {
-    "FULL": dict(use_c=True, use_de=True, use_onto=True),
-    "noCOEXP": dict(use_c=False, use_de=True, use_onto=True),
-    "noDE": dict(use_c=True, use_de=False, use_onto=True),
-    "noONTO": dict(use_c=True, use_de=True, use_onto=False),
-    "PPI_only": dict(use_c=False, use_de=False, use_onto=False),
-}
+# cancers and ablations of the batch experiment spec
+SPEC = load_experiment_spec(str(ROOT / "experiments/brw_batch.json"))
+CANCERS = SPEC["cancers"]
+ABLATIONS = SPEC["ablations"]
 
 
 # ---------- Helpers ----------
-def build_cmd_main(ppi, seed, alpha, beta, restart_prob, out_txt, cfg, coexp=None, de=None, onto=None, diso=None):
+def build_cmd_main(ppi, seed, alpha, beta, restart_prob, out_txt, cfg, coexp=None, de=None, onto=None, diso=None, top_k=None):
     cmd = [
         "python",
         str(ROOT / "main.py"),
@@ -44,6 +41,9 @@ def build_cmd_main(ppi, seed, alpha, beta, restart_prob, out_txt, cfg, coexp=Non
         "-o",
         str(out_txt),
     ]
+    # only the top k genes are written (check_genes.py reads the top 100)
+    if top_k is not None:
+        cmd += ["-k", str(top_k)]
     if cfg.get("use_c") and coexp is not None:
         cmd += ["-c", str(coexp)]
     if cfg.get("use_de") and de is not None:
@@ -53,7 +53,7 @@ def build_cmd_main(ppi, seed, alpha, beta, restart_prob, out_txt, cfg, coexp=Non
     return cmd
 
 
-def run_once(cancer: str, tag: str, alpha: float, beta: float, cfg: dict) -> int:
+def run_once(cancer: str, tag: str, alpha: float, beta: float, cfg: dict, top_k=None) -> int:
     out_cancer = OUT / cancer
     out_cancer.mkdir(exist_ok=True)
 
@@ -92,6 +92,7 @@ def run_once(cancer: str, tag: str, alpha: float, beta: float, cfg: dict) -> int
         de=de,
         onto=ONTO,
         diso=diso,
+        top_k=top_k,
     )
 
     subprocess.run(cmd, cwd=str(ROOT), check=True)
@@ -148,6 +149,10 @@ if mode == "Execute BRW":
     # Restart probability
     restart_prob = st.sidebar.number_input("Restart probability (r)", min_value=0.1, max_value=0.99, value=0.9, step=0.05)
 
+    # Off by default: results files then hold the full ranked list, as main.py and the batch write it
+    top_100_only = st.sidebar.checkbox("Top 100 only (faster)", value=False, help="Stop the random walk once the top 100 genes are certified and write only them to results_<tag>.txt")
+    top_k = 100 if top_100_only else None
+
     # Separator between options and alpha-beta
     st.sidebar.markdown("---")
     st.sidebar.markdown("**Matrix Weights**", help="Configure alpha-beta weights for network combination")
@@ -200,6 +205,7 @@ else:
     selected_opts = list(ABLATIONS.keys())
     alpha_beta_pairs = [(1.0, 1.0), (0.0, 0.0), (1.0, 0.0), (0.0, 1.0), (0.5, 0.5), (0.75, 0.25), (0.25, 0.75), (0.6, 0.4), (0.4, 0.6), (0.8, 0.2)]
     restart_prob = 0.9
+    top_k = None
 
 
 if mode == "Execute BRW":
@@ -236,7 +242,7 @@ if mode == "Execute BRW":
                         tag = f"{name}_A{alpha}_B{beta}"
                     
                     try:
-                        hits = run_once(cancer, tag, alpha, beta, cfg)
+                        hits = run_once(cancer, tag, alpha, beta, cfg, top_k=top_k)
                         results.append(dict(
                             Cancer=cancer, 
                             Option=name,
@@ -4,15 +4,19 @@ from biological_random_walks.loader.loader import Loader
 from biological_random_walks.graph_weight_computation.PPI_graph_weight_computation import ComputePPIGraphWeight
 
 from biological_random_walks.matrix_creation.convex_combination_aggregation_matrix_creation import ConvexCombinationMatrixAggregationCreation
+from biological_random_walks.matrix_creation.multiplex_aggregation_matrix_creation import MultiplexMatrixAggregationCreation
 
 from biological_random_walks.personalization_vector_creation.default_personalization_vector_creation import DefaultPersonalizationVectorCreation
 from biological_random_walks.personalization_vector_creation.biological_personalization_vector_creation import BiologicalPersonalizationVectorCreation
 from biological_random_walks.personalization_vector_creation.topological_personalization_vector_creation import TopologicalPersonalizationVectorCreation
+from biological_random_walks.personalization_vector_creation.personalization_vector_cache import PersonalizationVectorCache
 
 
 from biological_random_walks.personalization_vector_aggregation.p_v_aggregation import PersonalizationVectorAggregation
 
 from biological_random_walks.core.page_rank_core import RandomWalkWithRestartCore
+from biological_random_walks.core.local_push_core import LocalPushRandomWalkWithRestartCore
+from biological_random_walks.core.alpha_free_core import AlphaFreeRandomWalkWithRestartCore
 
 import time
 import csv
@@ -44,6 +48,18 @@ class BiologicalRandomWalks():
 		network_weight_flag = True,
 		output_file_path = None,
 
+		solver = "power",
+		initial_vector_file_path = None,
+		top_k = None,
+		sparse_graphs = False,
+		cache_dir = None,
+		network_store = None,
+
+		layer_file_paths = None,
+		layer_weights = None,
+
+		alphas = None,
+		personalization_vector_cache = None,
 
 		):
 
@@ -53,6 +69,23 @@ class BiologicalRandomWalks():
 		self.alpha = alpha
 		self.beta = beta
 
+		self.restart_prob = restart_prob
+		self.solver = solver
+
+		# shared across runs of the same cancer; with cache_dir also on disk
+		if personalization_vector_cache == None and cache_dir != None:
+			personalization_vector_cache = PersonalizationVectorCache(cache_dir = cache_dir)
+		self.personalization_vector_cache = personalization_vector_cache
+
+		# several alphas: output_file_path is then one path per alpha
+		self.alphas = alphas
+		if alphas != None:
+			assert personalization_vector_aggregation_policy == "Sum", "Only the Sum aggregation is linear in alpha"
+			assert solver != "push" and initial_vector_file_path == None, "The alpha grid is solved from scratch with a global solver"
+			assert output_file_path == None or len(output_file_path) == len(alphas), "One output file per alpha is needed"
+
+			self.alpha = alphas[0]
+
 
 		print("Loading Networks....")
 		self.file_loader_step = Loader(ppi_file_path,
@@ -61,26 +94,39 @@ class BiologicalRandomWalks():
 			secondary_seed_file_path = secondary_seed_file_path,
 
 			disease_ontology_file_path = disease_ontology_file_path,
-			map_gene_ontologies_file_path = map__gene__ontologies_file_path)
+			map_gene_ontologies_file_path = map__gene__ontologies_file_path,
+			sparse_graphs = sparse_graphs,
+			cache_dir = cache_dir,
+			network_store = network_store)
 		
 		PPI, CO_expression, seed_set, secondary_seed_set, map__gene__ontologies, disease_ontology = self.file_loader_step.run()
+		self.vocabulary = self.file_loader_step.vocabulary
+
+		# further layers of a multiplex network (signalling, pathways, ...)
+		layers = [self.file_loader_step.load_network(file_path) for file_path in (layer_file_paths or [])]
+		self.layer_weights = layer_weights
+
 		print("Loading Time:", time.perf_counter() - t0)
 		print()
 
-
 		if network_weight_flag:
 			t0 = time.perf_counter()
 
 			print("Weighting Networks....")
 			self.compute_ppi_weight = ComputePPIGraphWeight(PPI,map__gene__ontologies = map__gene__ontologies, disease_ontology = disease_ontology)
-			PPI = self.compute_ppi_weight.compute_weight_on_graph()
+
+			if sparse_graphs:
+				PPI = self.compute_ppi_weight.compute_sparse_weight_on_graph()
+			else:
+				PPI = self.compute_ppi_weight.compute_weight_on_graph()
+
 			print("Weighting Networks Computation Time:", time.perf_counter() - t0)
 			print()
 
 		
 		t0 = time.perf_counter()
 		print("Computing aggragation with policy:", matrix_aggregation_policy,"....")
-		G, V = self.compute_matrix_aggregation(PPI, CO_expression, matrix_aggregation_policy)
+		G, V = self.compute_matrix_aggregation(PPI, CO_expression, matrix_aggregation_policy, sparse_graphs, layers)
 		
 		print("Time for computing Aggregation Matrix:", time.perf_counter() - t0)
 		print()
@@ -103,7 +149,8 @@ class BiologicalRandomWalks():
 
 			G = G,
 			secondary_seed_set = secondary_seed_set,
-			chosen_policies = personalization_vector_creation_policies )
+			chosen_policies = personalization_vector_creation_policies,
+			nodes = list(G.nodes()) )
 
 		print("Time for computing personalization Vectors:", time.perf_counter() - t0)
 		print()
@@ -114,7 +161,7 @@ class BiologicalRandomWalks():
 		print("Aggregating personalization vectors with policy:", personalization_vector_aggregation_policy ,"....")
 		self.personalization_vector_aggregation_step = PersonalizationVectorAggregation(personalization_vectors, universe = V, alpha = self.alpha)
 		p_0 = self.personalization_vector_aggregation_step.run(chosen_policy = personalization_vector_aggregation_policy)
-		
+
 		print("Time for aggregating personalization Vectors:", time.perf_counter() - t0)
 		print()
 
@@ -123,12 +170,39 @@ class BiologicalRandomWalks():
 
 		print("Exectuting Random Walks with Restart....")
 
-		core = RandomWalkWithRestartCore(p_0,G,restart_prob)		
+		if alphas != None:
+			# one solve per personalization vector, then any alpha is a mix of them
+			core = AlphaFreeRandomWalkWithRestartCore(personalization_vectors,G,restart_prob, solver = solver, vocabulary = self.vocabulary)
+
+			self.ranked_lists = core.run_grid(alphas, top_k = top_k)
+			self.ranked_list = self.ranked_lists[0]
+
+		else:
+			if solver == "push":
+				core = LocalPushRandomWalkWithRestartCore(p_0,G,restart_prob, vocabulary = self.vocabulary)
+			else:
+				core = RandomWalkWithRestartCore(p_0,G,restart_prob, solver = solver, vocabulary = self.vocabulary)
+
+			if initial_vector_file_path != None:
+				# warm start from a previously computed ranked list
+				initial_vector = self.file_loader_step.load_ranked_list(initial_vector_file_path)
+			else:
+				initial_vector = None
 
-		self.ranked_list = core.run()
+			self.ranked_list = core.run(initial_vector = initial_vector, top_k = top_k)
+
+		self.convergence_info = core.get_convergence_info()
+
+		print("Solver:", solver, "- iterations:", self.convergence_info["iterations"], "- L1 residual:", self.convergence_info["residual"])
+		if top_k != None:
+			print("Certified top-k:", self.convergence_info["certified_k"], "of", top_k, "- in order:", self.convergence_info["certified_order_k"])
 		print("Time for Exectuting Random Walks with Restart", time.perf_counter() - t0)
 				
-		if output_file_path != None:
+		if output_file_path != None and alphas != None:
+			for file_path, ranked_list in zip(output_file_path, self.ranked_lists):
+				self.save_ranked_list(file_path, ranked_list)
+
+		elif output_file_path != None:
 			self.save_ranked_list(output_file_path)
 
 	def compute_personalization_vectors(self,
@@ -142,8 +216,10 @@ class BiologicalRandomWalks():
 		G = None,
 		secondary_seed_set = None,
 
-		chosen_policies = ["biological"]):
+		chosen_policies = ["biological"],
+		nodes = None):
 
+		# with the nodes of G every vector is a dense array aligned with them
 		default_p_v = None
 		overwritten_p_v = None
 		biological_p_v = None
@@ -153,11 +229,13 @@ class BiologicalRandomWalks():
 
 		if "default" in chosen_policies:
 			personalization_vector_creation_step = DefaultPersonalizationVectorCreation(seed_set, V)
-			default_p_v = personalization_vector_creation_step.run()
+			default_p_v = self.__run_personalization_vector_creation__("default", personalization_vector_creation_step, nodes,
+				[self.file_loader_step.seed_file_path])
 
 		if "topological" in chosen_policies:
 			personalization_vector_creation_step = TopologicalPersonalizationVectorCreation(seed_set, V,G = G, secondary_seed_set = secondary_seed_set)
-			topological_p_v = personalization_vector_creation_step.run()
+			topological_p_v = self.__run_personalization_vector_creation__("topological", personalization_vector_creation_step, nodes,
+				[self.file_loader_step.seed_file_path, self.file_loader_step.secondary_seed_file_path], G = G)
 
 		if "biological" in chosen_policies:
 
@@ -167,32 +245,65 @@ class BiologicalRandomWalks():
 				disease_ontology = disease_ontology, 
 				map__gene_name__ontologies = map__gene_name__ontologies)
 
-			biological_p_v = personalization_vector_creation_step.run()
+			biological_p_v = self.__run_personalization_vector_creation__("biological", personalization_vector_creation_step, nodes,
+				[self.file_loader_step.seed_file_path, self.file_loader_step.disease_ontology_file_path, self.file_loader_step.map_gene_ontologies_file_path])
 
 
-		if default_p_v != None:
+		if default_p_v is not None:
 			personalization_vectors.append(default_p_v)
 
-		if biological_p_v != None:
+		if biological_p_v is not None:
 			personalization_vectors.append(biological_p_v)
 
-		if topological_p_v != None:
+		if topological_p_v is not None:
 			personalization_vectors.append(topological_p_v)
 
 
 		
 		return personalization_vectors
 
-	def compute_matrix_aggregation(self, PPI_network, CO_expression_network, matrix_aggregation_policy = "convex_combination"):
+	def __run_personalization_vector_creation__(self, policy, personalization_vector_creation_step, nodes, file_paths, G = None):
+
+		if nodes is None:
+			return personalization_vector_creation_step.run()
+
+		if self.personalization_vector_cache == None:
+			return personalization_vector_creation_step.run_vector(nodes)
+
+		# the vector only depends on the input files, on the nodes and (topological) on G
+		key = self.personalization_vector_cache.key(policy, file_paths, self.vocabulary.decode(nodes), G)
+		personalization_vector = self.personalization_vector_cache.get(key)
+
+		if personalization_vector is None:
+			personalization_vector = personalization_vector_creation_step.run_vector(nodes)
+			self.personalization_vector_cache.put(key, personalization_vector)
+
+		return personalization_vector
+
+	def compute_matrix_aggregation(self, PPI_network, CO_expression_network, matrix_aggregation_policy = "convex_combination", sparse_graphs = False, layers = []):
 
 
 		if matrix_aggregation_policy == "convex_combination":
 			
 			matrix_creation_step = ConvexCombinationMatrixAggregationCreation(PPI_network, CO_expression_network,self.beta) 
-			G, V = matrix_creation_step.run(chosen_policy = "PPI_network")
+
+			if sparse_graphs:
+				G, V = matrix_creation_step.run_sparse(chosen_policy = "PPI_network")
+			else:
+				G, V = matrix_creation_step.run(chosen_policy = "PPI_network")
 
 			return G,V
 
+		elif matrix_aggregation_policy == "multiplex":
+
+			# PPI first: its nodes are the nodes of the walk, as for the convex combination
+			layers = [layer for layer in [PPI_network, CO_expression_network] if layer != None] + layers
+
+			matrix_creation_step = MultiplexMatrixAggregationCreation(layers, self.layer_weights)
+			G, V = matrix_creation_step.run(chosen_policy = "First_layer")
+
+			return G, V
+
 		elif matrix_aggregation_policy == "only_ppi_network":
 			
 			V = set(PPI_network.nodes())
@@ -204,9 +315,13 @@ class BiologicalRandomWalks():
 			return CO_expression_network, V
 
 
-	def save_ranked_list(self, file_path):
+	def save_ranked_list(self, file_path, ranked_list = None):
+
+		if ranked_list == None:
+			ranked_list = self.ranked_list
 
-		ranked_list = [[item[0], item[1]] for item in self.ranked_list]
+		# back from int indices to gene identifiers
+		ranked_list = [[self.vocabulary.name(item[0]), item[1]] for item in ranked_list]
 
 		csv_writer = csv.writer(open(file_path,'w'), delimiter = "\t")
 		csv_writer.writerow(["GeneNames","Score"])
@@ -222,6 +337,6 @@ class BiologicalRandomWalks():
 	def __print_aggregated_network_stats__(self,G):
 		print()
 		print("Final Graph Stats:")
-		print("# of Nodes:", len(G.nodes()))
-		print('# of Edges:', len(G.edges()))
+		print("# of Nodes:", G.number_of_nodes())
+		print('# of Edges:', G.number_of_edges())
 		print()
@@ -0,0 +1,86 @@
+import numpy as np
+
+from biological_random_walks.core.page_rank_core import RandomWalkWithRestartCore
+
+class AlphaFreeRandomWalkWithRestartCore():
+
+	""" RWR is linear in p_0 and the Sum aggregation of the personalization
+	vectors is p_0 = (alpha * pv_0 + (1 - alpha) * (pv_1 + ...)) / l_1, so
+	the stationary vector for any alpha is the same mix of the stationary
+	vectors of the components. These are solved once (one batch solve) and
+	every alpha is then an O(n) combination.
+	"""
+
+	def __init__(self,
+
+		personalization_vectors,
+		G,
+		restart_prob = 0.75,
+		solver = "power",
+		transition_matrix = None,
+		vocabulary = None):
+
+		assert len(personalization_vectors) > 0, "No personalization vector"
+
+		self.core = RandomWalkWithRestartCore(None, G, restart_prob, solver = solver, transition_matrix = transition_matrix, vocabulary = vocabulary)
+		self.restart_prob = restart_prob
+
+		self.personalization_matrix = self.core.get_personalization_matrix(personalization_vectors)
+		self.stationary_vectors = None
+
+
+	def get_stationary_vectors(self, initial_matrix = None):
+
+		# initial_matrix: a warm start, e.g. the stationary vectors of a nearby network
+		if self.stationary_vectors is None:
+			self.stationary_vectors = self.core.solve_batch(self.personalization_matrix, initial_matrix)
+
+		return self.stationary_vectors
+
+	def get_weights(self, alpha):
+
+		# [alpha, 1 - alpha, 1 - alpha, ...] over the l_1 norm of the mix
+		weights = np.full(self.personalization_matrix.shape[1], 1 - alpha)
+		weights[0] = alpha
+
+		l_1 = float(weights.dot(self.personalization_matrix.sum(axis = 0)))
+		assert l_1 > 0.0, "personalization vector is the null vector"
+
+		return weights / l_1
+
+	def get_page_rank_vector(self, alpha):
+		return self.get_stationary_vectors().dot(self.get_weights(alpha))
+
+	def get_convergence_info(self,):
+		return self.core.get_convergence_info()
+
+
+	def run(self, alpha, top_k = None):
+
+		page_rank_vector = self.get_page_rank_vector(alpha)
+
+		if top_k != None:
+			# the error of the mix is at most the same mix of the errors
+			error_bound = float(np.abs(self.get_weights(alpha)).dot(self.get_convergence_info()["residual"])) / self.restart_prob
+			self.core.convergence_info["certified_k"], self.core.convergence_info["certified_order_k"] = self.core.__certify_top_k__(page_rank_vector, top_k, error_bound)
+
+		return self.core.__generate_ranked_list__(page_rank_vector, top_k)
+
+	def run_grid(self, alphas, top_k = None):
+
+		ranked_lists = []
+		certified_k = []
+		certified_order_k = []
+
+		for alpha in alphas:
+			ranked_lists.append(self.run(alpha, top_k))
+
+			if top_k != None:
+				certified_k.append(self.core.convergence_info["certified_k"])
+				certified_order_k.append(self.core.convergence_info["certified_order_k"])
+
+		if top_k != None:
+			self.core.convergence_info["certified_k"] = certified_k
+			self.core.convergence_info["certified_order_k"] = certified_order_k
+
+		return ranked_lists
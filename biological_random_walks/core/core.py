@@ -61,7 +61,7 @@ class RandomWalkWithRestartCore:
 
     def _calculate_next_p(self, p_t, p_0):
 
-        epsilon = np.squeeze(np.asarray(np.dot(self.normalized_adjacency_matrix, p_t)))
+        epsilon = self.normalized_adjacency_matrix.dot(p_t)
         no_restart = epsilon * (1 - self.restart_prob)
         
         restart = p_0 * self.restart_prob
@@ -93,7 +93,8 @@ class RandomWalkWithRestartCore:
         """
         adjacency_matrix_not_normalized = nx.adjacency_matrix(self.G,)
         
-        self.normalized_adjacency_matrix = self._normalize_cols(adjacency_matrix_not_normalized).todense()
+        # keep the matrix sparse: memory and matvec cost scale with the edges
+        self.normalized_adjacency_matrix = self._normalize_cols(adjacency_matrix_not_normalized).tocsr()
 
 
 
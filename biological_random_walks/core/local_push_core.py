@@ -0,0 +1,177 @@
+import time
+from collections import deque
+
+import numpy as np
+import networkx as nx
+from scipy import sparse
+
+from biological_random_walks.core.page_rank_core import RandomWalkWithRestartCore
+from biological_random_walks.loader.sparse_graph import SparseGraph
+
+# a node is pushed while its residual is above PUSH_THRESHOLD times its out-degree
+PUSH_THRESHOLD = 0.0000001
+
+class LocalPushRandomWalkWithRestartCore(RandomWalkWithRestartCore):
+
+	""" Forward push (Andersen-Chung-Lang) over the CSR adjacency of G:
+	residuals and scores are dicts of the touched nodes and a node's
+	transition probabilities are normalized when it is pushed, so a query
+	with a few seeds never reads the whole graph (a networkx graph is
+	converted to CSR first). The full transition matrix of the global
+	solvers is not built.
+	"""
+
+	def __init__(self,
+
+		personalization_vector,
+		G,
+		restart_prob = 0.75,
+		epsilon = PUSH_THRESHOLD,
+		vocabulary = None):
+
+		self.restart_prob = restart_prob
+		self.personalization_vector = personalization_vector
+		self.G = G
+		self.solver = "push"
+		self.epsilon = epsilon
+
+		self.convergence_info = None
+
+		if isinstance(G, SparseGraph):
+			# shared with G, nothing is copied
+			self.adjacency_matrix = G.adjacency_matrix
+			self.node_ids = G.node_ids
+			self.node_index = G.get_node_index()
+		else:
+			self.node_ids = list(G.nodes())
+			self.adjacency_matrix = sparse.csr_matrix(nx.adjacency_matrix(G, nodelist = self.node_ids, weight = "weight"), dtype = np.float64)
+			self.node_index = {node: index for index, node in enumerate(self.node_ids)}
+
+		self.vocabulary = vocabulary if vocabulary is not None else getattr(G, "vocabulary", None)
+
+		# the whole node list is only needed for a full ranked list
+		self.nodes = None
+		self.tie_order = None
+
+
+	def __get_residual__(self, personalization_vector):
+
+		if personalization_vector is None:
+			personalization_vector = self.personalization_vector
+
+		if isinstance(personalization_vector, np.ndarray):
+			assert personalization_vector.shape == (len(self.node_ids),), "personalization vector must be aligned with the nodes of G"
+			indices = np.flatnonzero(personalization_vector)
+			return dict(zip(indices.tolist(), personalization_vector[indices].tolist()))
+
+		return {self.node_index[node]: float(score) for node, score in personalization_vector.items() if score != 0.0}
+
+	def __push__(self, residual):
+
+		""" The invariant is p* = p + r * (I - (1 - r)W)^-1 residual, so moving
+		r * residual[u] into p[u] and spreading the rest over the out-going
+		edges of u never changes p*. A node is pushed while its residual is
+		above epsilon * d(u): each push then settles more than r * epsilon
+		per edge it reads, hence at most 1 / (r * epsilon) edge reads,
+		independently of |V|.
+		"""
+
+		indptr = self.adjacency_matrix.indptr
+		indices = self.adjacency_matrix.indices
+		data = self.adjacency_matrix.data
+
+		degree = lambda u: indptr[u + 1] - indptr[u]
+
+		p = {}
+		residual_mass = sum(residual.values())
+
+		queue = deque(u for u, residual_u in residual.items() if residual_u > self.epsilon * degree(u))
+		in_queue = set(queue)
+
+		pushes = 0
+
+		while queue:
+
+			u = queue.popleft()
+			in_queue.discard(u)
+
+			residual_u = residual.pop(u)
+			p[u] = p.get(u, 0.0) + self.restart_prob * residual_u
+			residual_mass -= residual_u
+			pushes += 1
+
+			# row normalization of u, as in the transition matrix: a node
+			# without out-going weight spreads nothing
+			weights = data[indptr[u]:indptr[u + 1]]
+			total_weight = weights.sum()
+			if total_weight == 0.0:
+				continue
+
+			spread = (1 - self.restart_prob) * residual_u / total_weight
+			residual_mass += (1 - self.restart_prob) * residual_u
+
+			for v, weight in zip(indices[indptr[u]:indptr[u + 1]].tolist(), weights.tolist()):
+				residual_v = residual.get(v, 0.0) + spread * weight
+				residual[v] = residual_v
+
+				if residual_v > self.epsilon * degree(v) and v not in in_queue:
+					in_queue.add(v)
+					queue.append(v)
+
+		return p, max(float(residual_mass), 0.0), pushes, len(p.keys() | residual.keys())
+
+
+	def __get_node__(self, index):
+
+		node = self.node_ids[index]
+		return node.item() if isinstance(node, np.generic) else node
+
+	def __get_name__(self, index):
+
+		node = self.__get_node__(index)
+		return self.vocabulary.name(node) if self.vocabulary is not None else str(node)
+
+	def run(self, personalization_vector = None, initial_vector = None, top_k = None):
+
+		# a warm start would leave negative residuals and void the error bound
+		assert initial_vector is None, "Local push always starts from the personalization vector"
+
+		t0 = time.perf_counter()
+		p, error_bound, pushes, touched_nodes = self.__push__(self.__get_residual__(personalization_vector))
+
+		# the columns of W sum to at most one, so the mass still in the
+		# residual bounds the L1 error, and hence the error on every node
+		self.convergence_info = {
+			"solver": "push",
+			"iterations": pushes,
+			"residual": error_bound,
+			"touched_nodes": touched_nodes,
+			"wall_time": time.perf_counter() - t0,
+		}
+
+		if top_k != None:
+			# only pushed nodes score above 0, ties in name order as in the
+			# main core
+			ranked = sorted(p.items(), key = lambda item: (-item[1], self.__get_name__(item[0])))
+
+			top_scores = [score for _, score in ranked[:top_k + 1]]
+			top_scores += [0.0] * (min(top_k + 1, len(self.node_ids)) - len(top_scores))
+			self.convergence_info["certified_k"] = self.__certify_top_scores__(np.array(top_scores), top_k, error_bound)
+			self.convergence_info["certified_order_k"] = self.__certify_top_order__(np.array(top_scores), top_k, error_bound)
+
+			if len(ranked) >= top_k:
+				return [[self.__get_node__(u), score] for u, score in ranked[:top_k]]
+
+			# fewer pushed nodes than k: the list goes on with the zero scores
+
+		return self.__generate_ranked_list__(self.__get_page_rank_vector__(p), top_k)
+
+	def __get_page_rank_vector__(self, p):
+
+		if self.nodes is None:
+			self.nodes = list(self.G.nodes())
+
+		page_rank_vector = np.zeros(len(self.nodes))
+		page_rank_vector[list(p)] = list(p.values())
+
+		return page_rank_vector
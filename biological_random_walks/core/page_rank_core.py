@@ -1,97 +1,462 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
 import networkx as nx
+from scipy import sparse
+from scipy.sparse.linalg import splu, gmres, bicgstab, LinearOperator
+
+from biological_random_walks.loader.sparse_graph import SparseGraph
+
 CONV_THRESHOLD = 0.000001
 
+SOLVERS = ["power", "gauss_seidel", "gmres", "bicgstab", "direct"]
+
+# solvers that only need products with W, so W can be a LinearOperator
+MATRIX_FREE_SOLVERS = ["power", "gmres", "bicgstab"]
+
+# LU factorizations of I - (1 - r)W shared by every core built on the same
+# network and restart probability (each one holds a few million non zeros).
+# A factorization costs about ten power solves on HIPPIE and only pays off
+# for many personalization vectors on one matrix: every beta of a sweep is
+# a new matrix, so sweeps should keep the power solver
+FACTORIZATION_CACHE_SIZE = 2
+factorization_cache = OrderedDict()
+# cores may solve on several threads (StageScheduler)
+factorization_lock = threading.Lock()
+
 class RandomWalkWithRestartCore:
 
-	def __init__(self, 
+	def __init__(self,
 
 		personalization_vector,
 		G,
-		restart_prob = 0.75):
+		restart_prob = 0.75,
+		solver = "power",
+		transition_matrix = None,
+		vocabulary = None):
+
+		assert solver in SOLVERS, "Unknown solver " + str(solver) + ", choose one of " + ", ".join(SOLVERS)
+		assert transition_matrix is None or sparse.issparse(transition_matrix) or solver in MATRIX_FREE_SOLVERS, "Solver " + solver + " needs W as a matrix, choose one of " + ", ".join(MATRIX_FREE_SOLVERS)
 
 		self.restart_prob = restart_prob
 		self.personalization_vector = personalization_vector
-		self.G =self.__normalize_graph__(G)
+		self.G = G
+		self.solver = solver
+
+		self.system_matrix = None
+		self.factorization = None
+		self.splitting = None
+		self.convergence_info = None
+
+		self.nodes = list(self.G.nodes())
+		self.node_index = {node: index for index, node in enumerate(self.nodes)}
+
+		# names of the int node ids, used to order tied scores
+		self.vocabulary = vocabulary if vocabulary is not None else getattr(self.G, "vocabulary", None)
+		self.tie_order = None
+
+		# W can come already built (e.g. BetaSweepAggregation), aligned with G's nodes
+		if transition_matrix is not None:
+			assert transition_matrix.shape == (len(self.nodes), len(self.nodes)), "transition matrix must be n x n with n = number of nodes in G"
+			self.transition_matrix = transition_matrix
+		else:
+			self.transition_matrix = self.__build_transition_matrix__()
+
+
+	def __build_transition_matrix__(self,):
+
+		# row i of the adjacency matrix holds the out-going edges of node i
+		if isinstance(self.G, SparseGraph):
+			adjacency_matrix = self.G.adjacency_matrix
+		else:
+			adjacency_matrix = sparse.csr_matrix(nx.adjacency_matrix(self.G, nodelist = self.nodes, weight = "weight"), dtype = np.float64)
+
+		# row normalization: a node without out-going weight keeps zero-weight edges
+		total_weight = np.asarray(adjacency_matrix.sum(axis = 1)).ravel()
+		scale = np.divide(1.0, total_weight, out = np.zeros_like(total_weight), where = total_weight != 0.0)
+
+		# p_t_1[i] = sum_j p_t[j] * w(j -> i), i.e. the transposed (column-stochastic)
+		# matrix: the CSR arrays of A read as CSC are A^T, so only the data is
+		# new and the structure stays shared with G (e.g. a SharedNetworkStore)
+		data = adjacency_matrix.data * np.repeat(scale, np.diff(adjacency_matrix.indptr))
+
+		return sparse.csc_matrix((data, adjacency_matrix.indices, adjacency_matrix.indptr), shape = adjacency_matrix.shape)
+
+
+	def __get_system_matrix__(self,):
+
+		if self.system_matrix is None and not sparse.issparse(self.transition_matrix):
+			transition_matrix = self.transition_matrix
+			self.system_matrix = LinearOperator(transition_matrix.shape, matvec = lambda x: x - (1 - self.restart_prob) * transition_matrix.matvec(x), dtype = np.float64)
+
+		if self.system_matrix is None:
+			self.system_matrix = sparse.csr_matrix(sparse.identity(len(self.nodes), format = "csr") - (1 - self.restart_prob) * self.transition_matrix)
+
+		return self.system_matrix
+
+	def __get_factorization__(self,):
+
+		if self.factorization is not None:
+			return self.factorization
+
+		key = hashlib.sha1(repr(self.restart_prob).encode())
+		for array in (self.transition_matrix.indptr, self.transition_matrix.indices, self.transition_matrix.data):
+			key.update(array.tobytes())
+		key = key.hexdigest()
+
+		with factorization_lock:
+			factorization = factorization_cache.get(key)
+
+			if factorization is not None:
+				factorization_cache.move_to_end(key)
+
+		if factorization is None:
+			# I - (1 - r)W is strictly diagonally dominant by columns, so the
+			# diagonal can be used as pivot and a symmetric ordering applies;
+			# other threads keep solving while this one factorizes
+			factorization = splu(sparse.csc_matrix(self.__get_system_matrix__()),
+				permc_spec = "MMD_AT_PLUS_A",
+				diag_pivot_thresh = 0.0,
+				options = dict(SymmetricMode = True))
+
+			with factorization_lock:
+				factorization_cache[key] = factorization
+
+				if len(factorization_cache) > FACTORIZATION_CACHE_SIZE:
+					factorization_cache.popitem(last = False)
+
+		# a local reference: the entry may be evicted by another thread
+		self.factorization = factorization
+
+		return self.factorization
+
+	def __get_splitting__(self,):
+
+		if self.splitting is not None:
+			return self.splitting
+
+		# W has no diagonal, so Jacobi would be power iteration itself: only
+		# Gauss-Seidel uses a splitting of I - (1 - r)W
+		if self.solver == "gauss_seidel":
+			# lower triangle (diagonal included) of I - (1 - r)W; factorizing a
+			# triangular matrix with the natural ordering creates no fill-in and
+			# gives a compiled forward substitution
+			lower_matrix = sparse.tril(self.__get_system_matrix__(), format = "csc")
+			self.splitting = splu(lower_matrix, permc_spec = "NATURAL", diag_pivot_thresh = 0.0)
+
+		return self.splitting
+
+	def __compute_next_page_rank__(self, p_t, restart):
+
+		return (1 - self.restart_prob) * self.transition_matrix.dot(p_t) + restart
+
+	def __solve_direct__(self, P_0, P_init, iterations, residual_history):
+
+		# (I - (1 - r)W) p = r * p_0, one forward/back substitution per column
+		return self.__get_factorization__().solve(self.restart_prob * P_0)
+
+	def __solve_stationary__(self, P_0, P_init, iterations, residual_history, top_k = None):
+
+		B = self.restart_prob * P_0
+
+		P_t = np.array(P_init)
+		active_columns = np.arange(P_0.shape[1])
+
+		# all the columns still moving share the same pass over the matrix;
+		# a column is frozen as soon as its own L1 residual converges
+		while active_columns.size > 0:
+
+			P_active = P_t[:, active_columns]
+			P_t_1 = self.__compute_next_page_rank__(P_active, B[:, active_columns])
+
+			# r * p_0 - (I - (1 - r)W) p_t, which for power iteration is p_t_1 - p_t
+			residual = P_t_1 - P_active
+
+			if self.solver == "gauss_seidel":
+				P_t_1 = P_active + self.__get_splitting__().solve(residual)
+
+			diff_norm = np.abs(residual).sum(axis = 0)
+			P_t[:, active_columns] = P_t_1
+
+			for j, norm in zip(active_columns, diff_norm.tolist()):
+				iterations[j] += 1
+				residual_history[j].append(norm)
+
+			still_moving = diff_norm > CONV_THRESHOLD
+
+			if top_k != None and self.solver == "power":
+				# p* - p_t_1 = (1 - r)W (p* - p_t) and ||p* - p_t||_1 <= ||p_t_1 - p_t||_1 / r,
+				# so the top k (set and order) can stop before the whole vector has converged
+				error_bound = (1 - self.restart_prob) / self.restart_prob * diff_norm
+				certain_k = min(top_k, P_t.shape[0])
+
+				for position, j in enumerate(active_columns):
+					if still_moving[position] and self.__certify_top_order__(self.__top_k_scores__(P_t[:, j], top_k), top_k, error_bound[position]) == certain_k:
+						still_moving[position] = False
+
+			active_columns = active_columns[still_moving]
+
+		return P_t
+
+	def __solve_krylov__(self, P_0, P_init, iterations, residual_history):
+
+		system_matrix = self.__get_system_matrix__()
+
+		# ||x||_1 <= sqrt(n) ||x||_2, so this absolute 2-norm tolerance
+		# guarantees the same L1 criterion as the stationary solvers
+		atol = CONV_THRESHOLD / np.sqrt(len(self.nodes))
+
+		P_t = np.zeros(P_0.shape)
+
+		for j in range(P_0.shape[1]):
+
+			b = self.restart_prob * P_0[:, j]
+			history = residual_history[j]
 
+			if self.solver == "gmres":
+				# GMRES only exposes the 2-norm of the residual at each inner iteration
+				b_norm = np.linalg.norm(b)
+				callback = lambda pr_norm: history.append(float(pr_norm * b_norm))
+				P_t[:, j], info = gmres(system_matrix, b, x0 = P_init[:, j], rtol = 0.0, atol = atol, callback = callback, callback_type = "pr_norm")
 
-	def __compute_next_page_rank__(self,p_t):
-		
-		residual_j = {}
-		
-		for i in p_t.keys():
-			sum_ = 0
-			
-			for j in self.G[i]:
-				sum_ += p_t[j] * self.G[j][i]["weight"]
-			residual_j[i] = sum_
+			else:
+				callback = lambda p_t: history.append(float(np.abs(b - system_matrix.dot(p_t)).sum()))
+				P_t[:, j], info = bicgstab(system_matrix, b, x0 = P_init[:, j], rtol = 0.0, atol = atol, callback = callback)
 
-		p_t_1 = { gene: (1 - self.restart_prob) * residual_j[gene] + self.restart_prob * self.personalization_vector[gene] for gene in p_t.keys()}
+			assert info >= 0, self.solver + " breakdown on personalization vector " + str(j)
+			iterations[j] = len(history)
 
-		return p_t_1
+		return P_t
 
-	def __generate_ranked_list__(self,page_rank_vector):
-		
-		generate_probabilities = []
-		for k,v in page_rank_vector.items():
-			generate_probabilities.append([k,v])
-		sorted_list =  sorted(generate_probabilities, key=lambda x: x[1], reverse=True)
-		return sorted_list
+	def __solve__(self, P_0, P_init = None, top_k = None):
 
-	def __norm_l1__(self,p_t_1,p_t):
-		
-		sum_ = 0
-		for gene in p_t_1:
-			sum_ += abs(p_t_1[gene] - p_t[gene])
-		return sum_
+		# without a warm start every solver starts from the personalization vector
+		if P_init is None:
+			P_init = P_0
 
-	def __normalize_graph__(self, G):
+		iterations = [0] * P_0.shape[1]
+		residual_history = [[] for _ in range(P_0.shape[1])]
 
-		G_normalized = nx.DiGraph()
+		t0 = time.perf_counter()
 
-		for node_1 in G:
-			total_weight = 0.0
-			
-			for node_2 in G[node_1]:
-				total_weight += G[node_1][node_2]['weight']
+		if self.solver == "direct":
+			P_t = self.__solve_direct__(P_0, P_init, iterations, residual_history)
 
-			for node_2 in G[node_1]:
-				if total_weight != 0.0:
-					G_normalized.add_edge(node_1,node_2, weight = G[node_1][node_2]['weight']/total_weight)
-				else:
-					G_normalized.add_edge(node_1,node_2, weight = 0.0)
+		elif self.solver in ("gmres", "bicgstab"):
+			P_t = self.__solve_krylov__(P_0, P_init, iterations, residual_history)
 
-		return G_normalized
+		else:
+			P_t = self.__solve_stationary__(P_0, P_init, iterations, residual_history, top_k = top_k)
+
+		wall_time = time.perf_counter() - t0
+
+		residual = np.abs(self.restart_prob * P_0 - self.__get_system_matrix__().dot(P_t)).sum(axis = 0)
+
+		self.convergence_info = {
+			"solver": self.solver,
+			"iterations": iterations,
+			"residual_history": residual_history,
+			"residual": residual.tolist(),
+			"wall_time": wall_time,
+		}
+
+		if top_k != None:
+			# ||p* - p_t||_1 <= ||r * p_0 - (I - (1 - r)W) p_t||_1 / r for any solver
+			certified = [self.__certify_top_k__(P_t[:, j], top_k, residual[j] / self.restart_prob) for j in range(P_t.shape[1])]
+
+			self.convergence_info["certified_k"] = [certified_k for certified_k, _ in certified]
+			self.convergence_info["certified_order_k"] = [certified_order_k for _, certified_order_k in certified]
+
+		return P_t
+
+	def get_convergence_info(self,):
+
+		return self.convergence_info
+
+	def __get_tie_order__(self,):
+
+		# rank of every node by gene name: tied scores are listed in name
+		# order, whatever the node order of the graph (the dict based core
+		# listed them in the iteration order of a set of names)
+		if self.tie_order is None:
+			names = self.vocabulary.decode(self.nodes) if self.vocabulary is not None else self.nodes
+
+			self.tie_order = np.empty(len(self.nodes), dtype = np.int64)
+			self.tie_order[np.argsort(np.array(names, dtype = str), kind = "stable")] = np.arange(len(self.nodes))
+
+		return self.tie_order
+
+	def __top_k_indices__(self, page_rank_vector, top_k):
+
+		tie_order = self.__get_tie_order__()
+
+		if top_k >= len(page_rank_vector):
+			return np.lexsort((tie_order, -page_rank_vector))
+
+		# partial selection first, then only the k selected scores are sorted;
+		# ties at the k-th score are taken in name order, as the full sort does
+		kth_score = page_rank_vector[np.argpartition(-page_rank_vector, top_k - 1)[top_k - 1]]
+
+		above = np.flatnonzero(page_rank_vector > kth_score)
+		ties = np.flatnonzero(page_rank_vector == kth_score)
+		ties = ties[np.argsort(tie_order[ties], kind = "stable")][:top_k - len(above)]
+		top_indices = np.concatenate((above, ties))
+
+		return top_indices[np.lexsort((tie_order[top_indices], -page_rank_vector[top_indices]))]
+
+	def __top_k_scores__(self, page_rank_vector, top_k):
+
+		# the k + 1 best scores, decreasing: one partial selection, then only they are sorted
+		if top_k + 1 >= len(page_rank_vector):
+			return -np.sort(-page_rank_vector)
+
+		return -np.sort(np.partition(-page_rank_vector, top_k)[:top_k + 1])
+
+	def __certify_top_k__(self, page_rank_vector, top_k, error_bound):
+
+		""" (certified_k, certified_order_k): the largest k' <= k whose top
+		k' set is certain, and the largest whose set and order both are.
+
+		A gene inside and one outside can only swap if s_k' - s_k'+1 <=
+		|e_i| + |e_j| <= ||e||_1 <= error_bound; a tie at the k-th score can
+		never be decided and certifies the set before the tied genes. The
+		order also needs every adjacent gap inside the top k' above 2 *
+		error_bound: an exact tie of p_t says nothing about the order of
+		p*, so it is never certified either.
+		"""
+
+		top_scores = self.__top_k_scores__(page_rank_vector, top_k)
+
+		return self.__certify_top_scores__(top_scores, top_k, error_bound), self.__certify_top_order__(top_scores, top_k, error_bound)
+
+	@staticmethod
+	def __certify_top_scores__(top_scores, top_k, error_bound):
+
+		# top_scores: the k + 1 best scores (fewer on a small graph), decreasing;
+		# gaps[i] separates the top i + 1 from the rest
+		gaps = top_scores[:-1] - top_scores[1:]
+		if len(top_scores) <= top_k:
+			gaps = np.append(gaps, np.inf)
+
+		certified = np.flatnonzero(gaps[:top_k] > error_bound)
+
+		return int(certified[-1]) + 1 if certified.size > 0 else 0
+
+	@staticmethod
+	def __certify_top_order__(top_scores, top_k, error_bound):
+
+		# gaps[i] separates the top i + 1 from the rest, as above
+		gaps = top_scores[:-1] - top_scores[1:]
+		if len(top_scores) <= top_k:
+			gaps = np.append(gaps, np.inf)
+		gaps = gaps[:top_k]
+
+		# the genes i and i + 1 are in their final order, and the top i + 1
+		# is in order when all the pairs before it are
+		ordered = gaps > 2 * error_bound
+		in_order = np.concatenate(([True], np.logical_and.accumulate(ordered[:-1])))
+
+		certified = np.flatnonzero((gaps > error_bound) & in_order)
+
+		return int(certified[-1]) + 1 if certified.size > 0 else 0
+
+	def __generate_ranked_list__(self,page_rank_vector, top_k = None):
+
+		order = self.__top_k_indices__(page_rank_vector, top_k if top_k != None else len(page_rank_vector))
+
+		scores = page_rank_vector.tolist()
+
+		return [[self.nodes[i], scores[i]] for i in order]
+
+	def __set_up_p0__(self, personalization_vector = None):
+
+		if personalization_vector is None:
+			personalization_vector = self.personalization_vector
+
+		if isinstance(personalization_vector, np.ndarray):
+			assert personalization_vector.shape == (len(self.nodes),), "personalization vector must be aligned with the nodes of G"
+			return np.asarray(personalization_vector, dtype = np.float64)
+
+		p_0 = np.zeros(len(self.nodes))
+
+		for node, score in personalization_vector.items():
+			p_0[self.node_index[node]] = score
+
+		return p_0
+
+	def __set_up_initial_vector__(self, initial_vector):
+
+		if isinstance(initial_vector, np.ndarray):
+			assert initial_vector.shape == (len(self.nodes),), "initial vector must be aligned with the nodes of G"
+			return np.asarray(initial_vector, dtype = np.float64)
+
+		# a previous solution may come from a slightly different network:
+		# only the nodes of G are used, the others start from zero
+		p_init = np.zeros(len(self.nodes))
+
+		for node, score in initial_vector.items():
+			if node in self.node_index:
+				p_init[self.node_index[node]] = score
+
+		return p_init
+
+	def get_personalization_matrix(self, personalization_vectors):
+
+		# one column per personalization vector, rows aligned with self.nodes
+		return np.column_stack([self.__set_up_p0__(p_v) for p_v in personalization_vectors])
 
 
 	def get_adjacency_matrix(self,):
-		adjacency_matrix = []
 
-		for source in self.G:
-			for target in self.G[source]:
-				adjacency_matrix.append([source, target,self.G[source][target]["weight"]])
+		normalized_adjacency_matrix = self.transition_matrix.T.tocoo()
 
+		adjacency_matrix = [[self.nodes[source], self.nodes[target], weight] for source, target, weight in zip(normalized_adjacency_matrix.row, normalized_adjacency_matrix.col, normalized_adjacency_matrix.data.tolist())]
 		adjacency_matrix.sort(key = lambda x: (x[0],x[1]))
-		
+
 		return adjacency_matrix
 
 	def get_p_0(self,):
 
-		p_0 = [[k,v] for k,v in self.personalization_vector.items()]
+		if isinstance(self.personalization_vector, np.ndarray):
+			p_0 = [[k,v] for k,v in zip(self.nodes, self.personalization_vector.tolist())]
+		else:
+			p_0 = [[k,v] for k,v in self.personalization_vector.items()]
 		p_0.sort(key = lambda x: x[1], reverse = True)
 		return p_0
 
 
-	def run(self):
+	def run(self, personalization_vector = None, initial_vector = None, top_k = None):
+
+		p_0 = self.__set_up_p0__(personalization_vector)
+
+		if initial_vector is not None:
+			p_t = self.__solve__(p_0[:, None], self.__set_up_initial_vector__(initial_vector)[:, None], top_k = top_k)[:, 0]
+		else:
+			p_t = self.__solve__(p_0[:, None], top_k = top_k)[:, 0]
+
+		# a single vector: report its own iterations and residuals
+		self.convergence_info = {k: v[0] if type(v) == list else v for k, v in self.convergence_info.items()}
+
+		return self.__generate_ranked_list__(p_t, top_k)
+
+	def solve_batch(self, personalization_matrix, initial_matrix = None, top_k = None):
+
+		# stationary vectors, one column per column of the personalization matrix
+		P_0 = np.asarray(personalization_matrix, dtype = np.float64)
 
-		p_v = self.personalization_vector
+		assert P_0.ndim == 2 and P_0.shape[0] == len(self.nodes), "personalization matrix must be n x k with n = number of nodes in G"
 
-		diff_norm = 1
+		if initial_matrix is not None:
+			initial_matrix = np.asarray(initial_matrix, dtype = np.float64)
+			assert initial_matrix.shape == P_0.shape, "initial matrix must have the same shape as the personalization matrix"
 
-		while diff_norm > CONV_THRESHOLD:
+		return self.__solve__(P_0, initial_matrix, top_k = top_k)
 
-			p_t_1 = self.__compute_next_page_rank__(p_v)
+	def run_batch(self, personalization_matrix, initial_matrix = None, top_k = None):
 
-			diff_norm = self.__norm_l1__(p_t_1, p_v)
-			p_v = p_t_1
+		P_t = self.solve_batch(personalization_matrix, initial_matrix, top_k)
 
-		return self.__generate_ranked_list__(p_v)
\ No newline at end of file
+		return [self.__generate_ranked_list__(P_t[:, j], top_k) for j in range(P_t.shape[1])]
@@ -0,0 +1,63 @@
+import json
+import os
+
+def load_experiment_spec(file_path):
+
+	""" Experiment spec from a JSON file, or YAML (.yaml, .yml) when PyYAML
+	is installed. See experiments/brw_batch.json for the fields.
+	"""
+
+	with open(file_path, 'r') as fp:
+
+		if file_path.endswith((".yaml", ".yml")):
+			try:
+				import yaml
+			except ImportError:
+				assert False, "PyYAML is needed to read " + file_path
+
+			return yaml.safe_load(fp)
+
+		return json.load(fp)
+
+
+def get_input_file_paths(spec, cancer, ablation):
+
+	# the main.py inputs of a cancer under an ablation, None when not used
+	data_dir = spec.get("data_dir", ".")
+	cfg = spec["ablations"][ablation]
+
+	def data_file(name):
+		return os.path.join(data_dir, spec[name].format(cancer = cancer))
+
+	return {
+		"seed_file_path": data_file("seed_set"),
+		"ppi_file_path": data_file("ppi"),
+		"co_expression_file_path": data_file("co_expression") if cfg["use_c"] else None,
+		"secondary_seed_file_path": data_file("de_genes") if cfg["use_de"] else None,
+		"disease_ontology_file_path": data_file("disease_ontology") if cfg["use_onto"] else None,
+		"map__gene__ontologies_file_path": data_file("ontology") if cfg["use_onto"] else None,
+		}
+
+def expand_experiment_spec(spec):
+
+	""" One point per (cancer, experiment, ablation, alpha, beta), in the
+	order of the spec: a dict with type, cancer, ablation, tag, alpha, beta
+	and run (the inputs, alpha, beta and output_file_path of the run).
+	"""
+
+	output_dir = spec.get("output_dir", "outputs")
+	points = []
+
+	for cancer in spec["cancers"]:
+		for experiment in spec["experiments"]:
+			for ablation in experiment["ablations"]:
+				for alpha, beta in experiment["alpha_beta"]:
+
+					tag = experiment["tag"].format(ablation = ablation, alpha = alpha, beta = beta, cancer = cancer)
+
+					run = get_input_file_paths(spec, cancer, ablation)
+					run.update(alpha = alpha, beta = beta, output_file_path = os.path.join(output_dir, cancer, "results_" + tag + ".txt"))
+
+					points.append({"type": experiment["type"], "cancer": cancer, "ablation": ablation, "tag": tag, "alpha": alpha, "beta": beta, "run": run})
+
+	return points
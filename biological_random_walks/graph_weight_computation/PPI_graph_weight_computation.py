@@ -1,4 +1,9 @@
+import numpy as np
 import networkx as nx
+from scipy import sparse
+
+from biological_random_walks.loader.sparse_graph import SparseGraph
+
 class ComputePPIGraphWeight():
 	
 	def __init__(self, G, disease_ontology = None, map__gene__ontologies = None, c = 1):
@@ -10,52 +15,54 @@ class ComputePPIGraphWeight():
 		self.map__gene__ontologies = map__gene__ontologies
 
 
-	def _get_edge_relevance(self, source, target, database_source, current_disease_ontology):
-
-		if source in self.map__gene__ontologies and target in self.map__gene__ontologies:
-			
-			if database_source in self.map__gene__ontologies[source] and database_source in self.map__gene__ontologies[target]:
+	def _get_edge_weights(self, sources, targets):
 
-				return len(current_disease_ontology
-					.intersection(self.map__gene__ontologies[source][database_source])
-					.intersection(self.map__gene__ontologies[target][database_source]))
+		# c plus, for every DB, the number of disease terms shared by the two ends
+		weights = np.full(len(sources), self.constant)
 
-			else:
-				return 0
+		for shared_terms in self.map__gene__ontologies.count_shared_disease_terms(sources, targets, self.disease_ontology).values():
+			weights = weights + shared_terms
 
-		else:
-			return 0
+		return weights
 
 	def compute_weight_on_graph(self,):
 
 		assert self.disease_ontology != None and self.map__gene__ontologies != None, "Not enough input parameter for computing PPI biological weight"
 
-		weighted_PPI = nx.DiGraph()
-
-		for node in self.PPI:
-			neighbors = self.PPI[node]
+		edges = [(node, neighbor) for node in self.PPI for neighbor in self.PPI[node]]
+		weights = self._get_edge_weights([edge[0] for edge in edges], [edge[1] for edge in edges])
 
-			for neighbor in neighbors:
-				weight = self.constant
-				
-				for database_source, current_disease_ontology in self.disease_ontology.items():
-					weight += self._get_edge_relevance(node, neighbor, database_source, current_disease_ontology)
+		weighted_PPI = nx.DiGraph()
 
-				
-				if weight > 0.0:
-					weighted_PPI.add_edge(node, neighbor, weight = weight)
+		for (node, neighbor), weight in zip(edges, weights.tolist()):
+			if weight > 0.0:
+				weighted_PPI.add_edge(node, neighbor, weight = weight)
 
 		assert len(weighted_PPI.edges()) == len(self.PPI.edges()) and len(weighted_PPI.nodes()) == len(self.PPI.nodes()), "nodes or edges not overlapping between G and weighted G"
 
 		return weighted_PPI
 
+	def compute_sparse_weight_on_graph(self,):
 
+		""" Same weights as compute_weight_on_graph over the CSR edge list,
+		returned as a SparseGraph with the structure of the PPI.
+		"""
 
+		assert self.disease_ontology != None and self.map__gene__ontologies != None, "Not enough input parameter for computing PPI biological weight"
 
+		if isinstance(self.PPI, SparseGraph):
+			PPI = self.PPI
+		else:
+			PPI = SparseGraph.from_networkx(self.PPI)
 
+		adjacency_matrix = PPI.adjacency_matrix
+		sources = np.repeat(np.arange(adjacency_matrix.shape[0]), np.diff(adjacency_matrix.indptr))
+		targets = adjacency_matrix.indices
 
+		weights = self._get_edge_weights(PPI.node_ids[sources], PPI.node_ids[targets]).astype(np.float64)
 
+		assert np.all(weights > 0.0), "nodes or edges not overlapping between G and weighted G"
 
+		weighted_adjacency_matrix = sparse.csr_matrix((weights, adjacency_matrix.indices, adjacency_matrix.indptr), shape = adjacency_matrix.shape)
 
-
-
+		return SparseGraph(weighted_adjacency_matrix, PPI.node_ids, PPI.vocabulary)
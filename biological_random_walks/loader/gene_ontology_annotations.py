@@ -0,0 +1,186 @@
+import numpy as np
+from scipy import sparse
+
+from biological_random_walks.loader.gene_vocabulary import GeneVocabulary
+
+# number of set bits of every byte value
+POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype = np.uint8)
+
+class GeneOntologyAnnotations():
+
+	""" gene -> DB -> terms annotations with int term ids. For every DB the
+	terms of a gene are a sorted int array (one CSR row per annotated gene);
+	restricted to the terms of a disease ontology they become packed bitsets,
+	so intersections are a bitwise and and counts a popcount.
+
+	It still reads like the former dict[gene][db] -> set[term].
+	"""
+
+	def __init__(self, gene_ids, db_codes, term_codes, dbs, terms):
+
+		# one (gene, db, term) per annotation; gene_ids are vocabulary ids
+		gene_ids = np.asarray(gene_ids, dtype = np.int64)
+		db_codes = np.asarray(db_codes, dtype = np.int64)
+		term_codes = np.asarray(term_codes, dtype = np.int64)
+
+		self.dbs = GeneVocabulary(dbs)
+		self.terms = GeneVocabulary(terms)
+
+		self.genes, rows = np.unique(gene_ids, return_inverse = True)
+		rows = rows.ravel()
+
+		self.map__db__matrix = {}
+		for db_code, db in enumerate(self.dbs.names):
+			in_db = db_codes == db_code
+
+			matrix = sparse.csr_matrix((np.ones(int(in_db.sum()), dtype = bool), (rows[in_db], term_codes[in_db])), shape = (len(self.genes), len(self.terms)))
+			matrix.sum_duplicates()
+
+			self.map__db__matrix[db] = matrix
+
+		# packed disease bitsets by disease ontology (see get_disease_bitsets)
+		self.disease_bitsets = {}
+
+
+	@classmethod
+	def from_arrays(cls, arrays, vocabulary):
+
+		# gene names are interned in the given vocabulary
+		genes = np.array([vocabulary.add(gene) for gene in arrays["genes"].tolist()], dtype = np.int64)
+
+		return cls(genes[np.asarray(arrays["gene_codes"])], arrays["db_codes"], arrays["term_codes"], arrays["dbs"].tolist(), arrays["terms"].tolist())
+
+	def to_arrays(self, vocabulary):
+
+		gene_codes, db_codes, term_codes = [], [], []
+
+		for db_code, db in enumerate(self.dbs.names):
+			matrix = self.map__db__matrix[db].tocoo()
+
+			gene_codes.append(matrix.row)
+			db_codes.append(np.full(matrix.nnz, db_code))
+			term_codes.append(matrix.col)
+
+		return {
+			"genes": np.array(vocabulary.decode(self.genes.tolist()), dtype = str),
+			"dbs": np.array(self.dbs.names, dtype = str),
+			"terms": np.array(self.terms.names, dtype = str),
+			"gene_codes": np.concatenate(gene_codes + [np.zeros(0)]).astype(np.int32),
+			"db_codes": np.concatenate(db_codes + [np.zeros(0)]).astype(np.int32),
+			"term_codes": np.concatenate(term_codes + [np.zeros(0)]).astype(np.int32),
+			}
+
+
+	def get_rows(self, gene_ids):
+
+		# row of every gene, -1 when it has no annotation
+		gene_ids = np.asarray(gene_ids, dtype = np.int64)
+
+		if len(self.genes) == 0:
+			return np.full(len(gene_ids), -1)
+
+		rows = np.minimum(np.searchsorted(self.genes, gene_ids), len(self.genes) - 1)
+
+		return np.where(self.genes[rows] == gene_ids, rows, -1)
+
+	def get_disease_bitsets(self, disease_ontology):
+
+		""" For every DB of the disease ontology, the packed bitset of the
+		disease terms of each annotated gene, plus an all-zero last row so
+		that row -1 (no annotation) counts nothing. Built once per disease
+		ontology: the weighting calls it for every batch of edges.
+		"""
+
+		key = tuple((db, frozenset(disease_terms)) for db, disease_terms in disease_ontology.items())
+
+		if key in self.disease_bitsets:
+			return self.disease_bitsets[key]
+
+		bitsets = {}
+
+		for db, disease_terms in disease_ontology.items():
+
+			term_ids = [self.terms.get(term) for term in disease_terms]
+			term_ids = [term_id for term_id in term_ids if term_id is not None]
+
+			if db in self.map__db__matrix:
+				incidence = self.map__db__matrix[db][:, term_ids].toarray()
+			else:
+				incidence = np.zeros((len(self.genes), len(term_ids)), dtype = bool)
+
+			incidence = np.vstack((incidence, np.zeros((1, len(term_ids)), dtype = bool)))
+			bitsets[db] = np.packbits(incidence, axis = 1)
+
+		self.disease_bitsets[key] = bitsets
+
+		return bitsets
+
+	def get_disease_incidence(self, gene_ids, disease_ontology):
+
+		""" Sparse genes x disease terms incidence (the terms of every DB side
+		by side, rows in the order of gene_ids) and, for every column, one
+		over the number of disease terms of its DB.
+		"""
+
+		rows = self.get_rows(gene_ids)
+		blocks = []
+		weights = []
+
+		for db, disease_terms in disease_ontology.items():
+
+			term_ids = [self.terms.get(term) for term in disease_terms]
+			term_ids = [term_id for term_id in term_ids if term_id is not None]
+
+			if db in self.map__db__matrix:
+				# a last empty row for the genes without annotation (row -1)
+				matrix = self.map__db__matrix[db][:, term_ids]
+				block = sparse.vstack((matrix, sparse.csr_matrix((1, len(term_ids)), dtype = bool)), format = "csr")[rows]
+			else:
+				block = sparse.csr_matrix((len(rows), len(term_ids)), dtype = bool)
+
+			blocks.append(block)
+			weights.append(np.full(len(term_ids), 1.0 / len(disease_terms)))
+
+		if len(blocks) == 0:
+			return sparse.csr_matrix((len(rows), 0)), np.zeros(0)
+
+		return sparse.hstack(blocks, format = "csr").astype(np.float64), np.concatenate(weights)
+
+	def count_disease_terms(self, gene_ids, disease_ontology):
+
+		# {db: |disease terms of db annotated to gene|} for each gene
+		rows = self.get_rows(gene_ids)
+
+		return {db: POPCOUNT[bitset[rows]].sum(axis = 1, dtype = np.int64) for db, bitset in self.get_disease_bitsets(disease_ontology).items()}
+
+	def count_shared_disease_terms(self, source_ids, target_ids, disease_ontology):
+
+		# {db: |disease terms of db annotated to both source and target|} for each pair
+		source_rows = self.get_rows(source_ids)
+		target_rows = self.get_rows(target_ids)
+
+		return {db: POPCOUNT[bitset[source_rows] & bitset[target_rows]].sum(axis = 1, dtype = np.int64) for db, bitset in self.get_disease_bitsets(disease_ontology).items()}
+
+
+	def __contains__(self, gene):
+		return self.get_rows([gene])[0] >= 0
+
+	def __getitem__(self, gene):
+
+		row = self.get_rows([gene])[0]
+		assert row >= 0, "No annotation for gene " + str(gene)
+
+		map__db__terms = {}
+		for db, matrix in self.map__db__matrix.items():
+			term_ids = matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]]
+
+			if len(term_ids) > 0:
+				map__db__terms[db] = set(self.terms.decode(term_ids.tolist()))
+
+		return map__db__terms
+
+	def __len__(self,):
+		return len(self.genes)
+
+	def items(self,):
+		return ((gene, self[gene]) for gene in self.genes.tolist())
@@ -0,0 +1,91 @@
+import numpy as np
+
+from biological_random_walks.loader.network_cache import NetworkCache
+
+class GeneSymbolIndex():
+
+	""" Offline Ensembl gene ID -> symbol lookup built from a tab separated
+	mapping file such as a BioMart export (first column the gene ID, the
+	other columns its names; a gene may span several rows). The first name
+	of a gene is its symbol, the others its aliases.
+	IDs are kept sorted next to a CSR-like list of symbols, so a bulk lookup
+	is one searchsorted; with a cache_dir the arrays are a NetworkCache
+	entry and are memory mapped instead of parsed again.
+	"""
+
+	def __init__(self, mapping_file_path, cache_dir = None):
+
+		cache = NetworkCache(cache_dir) if cache_dir != None else None
+		key = cache.key(mapping_file_path, "gene_symbol_index") if cache != None else None
+
+		arrays = cache.load(key) if cache != None else None
+
+		if arrays == None:
+			arrays = self.build(mapping_file_path)
+
+			if cache != None:
+				cache.save(key, arrays)
+
+		self.ids = arrays["ids"]
+		self.indptr = arrays["indptr"]
+		self.symbols = arrays["symbols"]
+
+
+	@staticmethod
+	def build(mapping_file_path):
+
+		map__id__symbols = {}
+
+		with open(mapping_file_path, 'r') as fp:
+			# header
+			fp.readline()
+
+			for line in fp:
+				fields = line.rstrip("\n").split("\t")
+
+				symbols = map__id__symbols.setdefault(fields[0].strip(), [])
+				for symbol in fields[1:]:
+					symbol = symbol.strip()
+
+					if symbol != "" and symbol not in symbols:
+						symbols.append(symbol)
+
+		ids = sorted(map__id__symbols)
+		counts = [len(map__id__symbols[gene_id]) for gene_id in ids]
+
+		return {
+			"ids": np.array(ids, dtype = str),
+			"indptr": np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+			"symbols": np.array([symbol for gene_id in ids for symbol in map__id__symbols[gene_id]], dtype = str),
+			}
+
+
+	def __len__(self,):
+		return len(self.ids)
+
+	def __find__(self, ensembl_ids):
+
+		# (ID, row) of the IDs found in the index, one searchsorted for all
+		ensembl_ids = list(dict.fromkeys(ensembl_ids))
+
+		if len(ensembl_ids) == 0 or len(self.ids) == 0:
+			return []
+
+		queries = np.array(ensembl_ids, dtype = str)
+		positions = np.minimum(np.searchsorted(self.ids, queries), len(self.ids) - 1)
+		found = self.ids[positions] == queries
+
+		return [(ensembl_id, position) for ensembl_id, position, is_found in zip(ensembl_ids, positions.tolist(), found.tolist()) if is_found]
+
+	def lookup(self, ensembl_ids):
+
+		""" {ID: [symbol]} for the IDs the mapping file names; IDs it does not
+		know, or lists without a name, are left out.
+		"""
+
+		return {ensembl_id: [str(self.symbols[self.indptr[position]])] for ensembl_id, position in self.__find__(ensembl_ids) if self.indptr[position + 1] > self.indptr[position]}
+
+	def lookup_aliases(self, ensembl_ids):
+
+		# {ID: [alias, ...]} for the IDs with more than one name
+		return {ensembl_id: self.symbols[self.indptr[position] + 1:self.indptr[position + 1]].tolist() for ensembl_id, position in self.__find__(ensembl_ids) if self.indptr[position + 1] - self.indptr[position] > 1}
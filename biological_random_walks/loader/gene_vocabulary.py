@@ -0,0 +1,47 @@
+import numpy as np
+
+class GeneVocabulary():
+
+	def __init__(self, names = None):
+
+		self.names = []
+		self.map__name__index = {}
+
+		if names != None:
+			for name in names:
+				self.add(name)
+
+
+	def add(self, name):
+
+		index = self.map__name__index.get(name)
+
+		if index is None:
+			index = len(self.names)
+			self.map__name__index[name] = index
+			self.names.append(name)
+
+		return index
+
+	def index(self, name):
+		return self.map__name__index[name]
+
+	def get(self, name, default = None):
+		return self.map__name__index.get(name, default)
+
+	def name(self, index):
+		return self.names[index]
+
+
+	def encode(self, names):
+		return np.fromiter((self.map__name__index[name] for name in names), dtype = np.int32)
+
+	def decode(self, indices):
+		return [self.names[index] for index in indices]
+
+
+	def __contains__(self, name):
+		return name in self.map__name__index
+
+	def __len__(self,):
+		return len(self.names)
@@ -1,5 +1,13 @@
 import csv
+import os
+import numpy as np
 import networkx as nx
+from scipy import sparse
+
+from biological_random_walks.loader.gene_vocabulary import GeneVocabulary
+from biological_random_walks.loader.gene_ontology_annotations import GeneOntologyAnnotations
+from biological_random_walks.loader.sparse_graph import SparseGraph
+from biological_random_walks.loader.network_cache import NetworkCache
 
 class Loader():
 	def __init__(self, 
@@ -13,6 +21,11 @@ class Loader():
 		disease_ontology_file_path = None,
 		map_gene_ontologies_file_path = None,
 
+		vocabulary = None,
+		sparse_graphs = False,
+		cache_dir = None,
+		network_store = None,
+		loaded_inputs = None,
 
 		):
 		if ppi_file_path != None:
@@ -46,6 +59,29 @@ class Loader():
 		else:
 			self.map_gene_ontologies_file_path = None
 
+		# every gene identifier is interned once here: the rest of the
+		# pipeline works on int indices and names come back only at output
+		if vocabulary != None:
+			self.vocabulary = vocabulary
+		elif network_store != None:
+			# the ids stored with the shared networks
+			self.vocabulary = network_store.get_vocabulary()
+		else:
+			self.vocabulary = GeneVocabulary()
+
+		# networks as SparseGraph (CSR) instead of networkx DiGraph
+		self.sparse_graphs = sparse_graphs
+
+		# parsed networks and annotations are reused across runs
+		if cache_dir != None:
+			self.cache = NetworkCache(cache_dir)
+		else:
+			self.cache = None
+
+		self.network_store = network_store
+
+		# parsed inputs shared by the runs of one process (same vocabulary)
+		self.loaded_inputs = loaded_inputs
 
 
 	def run(self,):
@@ -54,30 +90,30 @@ class Loader():
 		assert self.seed_file_path != None, "No Seed as input of Random Walks"
 
 		if self.ppi_file_path != None:
-			PPI = self.load_graph(self.ppi_file_path)
+			PPI = self.load_once("network", self.ppi_file_path, lambda: self.load_network(self.ppi_file_path))
 		else:
 			PPI = None
 
 		if self.co_expression_file_path:
-			CO_expression = self.load_graph(self.co_expression_file_path)
+			CO_expression = self.load_once("network", self.co_expression_file_path, lambda: self.load_network(self.co_expression_file_path))
 		else:
 			CO_expression = None
 		
 		if self.seed_file_path != None:
-			seed_set = self.load_seed_set(self.seed_file_path)
+			seed_set = self.load_once("seed_set", self.seed_file_path, lambda: self.load_seed_set(self.seed_file_path))
 
 		if self.map_gene_ontologies_file_path != None:
-			map__gene__ontologies = self.load_map__gene__ontologies()
+			map__gene__ontologies = self.load_once("gene_ontologies", self.map_gene_ontologies_file_path, self.load_map__gene__ontologies)
 		else:
 			map__gene__ontologies = None
 
 		if self.disease_ontology_file_path != None:
-			disease_ontology = self.load_disease_ontology()
+			disease_ontology = self.load_once("disease_ontology", self.disease_ontology_file_path, self.load_disease_ontology)
 		else:
 			disease_ontology = None
 
 		if self.secondary_seed_file_path != None:
-			secondary_seed_set = self.load_seed_set(self.secondary_seed_file_path)
+			secondary_seed_set = self.load_once("seed_set", self.secondary_seed_file_path, lambda: self.load_seed_set(self.secondary_seed_file_path))
 		else:
 			secondary_seed_set = None
 
@@ -85,9 +121,64 @@ class Loader():
 		return PPI, CO_expression, seed_set, secondary_seed_set, map__gene__ontologies, disease_ontology
 
 
+	def load_once(self, kind, file_path, load):
+
+		if self.loaded_inputs == None:
+			return load()
+
+		key = (kind, os.path.abspath(str(file_path)), self.sparse_graphs)
+
+		if key not in self.loaded_inputs:
+			self.loaded_inputs[key] = load()
+
+		return self.loaded_inputs[key]
+
+	def load_network(self, file_path):
+
+		if self.network_store != None:
+			G = self.network_store.get_graph(file_path, self.vocabulary)
+
+			if G != None:
+				return G if self.sparse_graphs else G.to_networkx()
+
+		if self.cache != None:
+			return self.load_cached_graph(file_path)
+
+		if self.sparse_graphs:
+			return self.load_sparse_graph(file_path)
+
+		return self.load_graph(file_path)
+
 	def load_map__gene__ontologies(self):
-		
-		map_gene_ontologies = {}
+
+		if self.network_store != None:
+			arrays = self.network_store.get_map__gene__ontologies_arrays(self.map_gene_ontologies_file_path)
+
+			if arrays != None:
+				return GeneOntologyAnnotations.from_arrays(arrays, self.vocabulary)
+
+		if self.cache == None:
+			return self.parse_map__gene__ontologies()
+
+		key = self.cache.key(self.map_gene_ontologies_file_path, "gene_ontologies")
+		entry = self.cache.load(key)
+
+		if entry != None:
+			return GeneOntologyAnnotations.from_arrays(entry, self.vocabulary)
+
+		map_gene_ontologies = self.parse_map__gene__ontologies()
+		self.cache.save(key, map_gene_ontologies.to_arrays(self.vocabulary))
+
+		return map_gene_ontologies
+
+	def parse_map__gene__ontologies(self):
+
+		dbs = GeneVocabulary()
+		terms = GeneVocabulary()
+
+		gene_ids = []
+		db_codes = []
+		term_codes = []
 		
 		with open(self.map_gene_ontologies_file_path,"r") as fp:
 			csv_reader = csv.reader(fp, delimiter = "\t")
@@ -96,26 +187,14 @@ class Loader():
 				if index == 0:
 					continue
  
-				if not row or len(row) < 2:
+				if not row or len(row) < 3:
 					continue
  
-				gene_name = row[0]
-				term_id = row[1]
-				db = row[2]
+				gene_ids.append(self.vocabulary.add(row[0]))
+				term_codes.append(terms.add(row[1]))
+				db_codes.append(dbs.add(row[2]))
 
-				if gene_name in map_gene_ontologies:
-					
-					if db in map_gene_ontologies[gene_name]:
-						map_gene_ontologies[gene_name][db].add(term_id)
-					else:
-						map_gene_ontologies[gene_name][db] = {term_id}
-				
-				else:
-					map_gene_ontologies[gene_name] = {}
-					map_gene_ontologies[gene_name][db] = {term_id}
-
-		
-		return map_gene_ontologies
+		return GeneOntologyAnnotations(gene_ids, db_codes, term_codes, dbs.names, terms.names)
 
 	def load_disease_ontology(self,):
 		disease_ontology = {}
@@ -153,8 +232,8 @@ class Loader():
 
 				if len(row) == 3:
 
-					node_1 = row[0]
-					node_2 = row[1]
+					node_1 = self.vocabulary.add(row[0])
+					node_2 = self.vocabulary.add(row[1])
 
 					try:
 						score = float(row[2])
@@ -172,8 +251,8 @@ class Loader():
 
 				elif len(row) == 2:
 					
-					node_1 = row[0]
-					node_2 = row[1]
+					node_1 = self.vocabulary.add(row[0])
+					node_2 = self.vocabulary.add(row[1])
 
 					if not G.has_edge(node_1,node_2) and not G.has_edge(node_2,node_1):
 						
@@ -182,6 +261,133 @@ class Loader():
 		return G
 
 
+	def load_sparse_graph(self,file_path, has_header = True, absolute_policy = True):
+
+		""" Same graph as load_graph (first occurrence of an undirected pair
+		wins, both directions get its score, nodes in order of first
+		appearance) but parsed in bulk and deduplicated with array ops.
+		"""
+
+		sources, targets, scores = self.__read_edge_list__(file_path, has_header)
+
+		endpoints = np.empty(2 * len(sources), dtype = sources.dtype)
+		endpoints[0::2] = sources
+		endpoints[1::2] = targets
+
+		names, first_position, inverse = np.unique(endpoints, return_index = True, return_inverse = True)
+
+		# local index of a node = rank of its first appearance in the file
+		order = np.argsort(first_position, kind = "stable")
+		rank = np.empty(len(order), dtype = np.int64)
+		rank[order] = np.arange(len(order))
+
+		local = rank[inverse.ravel()]
+		node_1 = local[0::2]
+		node_2 = local[1::2]
+
+		node_ids = [self.vocabulary.add(name) for name in names[order].tolist()]
+		n = len(node_ids)
+
+		# keep the first row of every unordered pair
+		key = np.minimum(node_1, node_2) * n + np.maximum(node_1, node_2)
+		_, first_edge = np.unique(key, return_index = True)
+		first_edge.sort()
+
+		node_1 = node_1[first_edge]
+		node_2 = node_2[first_edge]
+		scores = scores[first_edge]
+
+		if absolute_policy:
+			scores = np.abs(scores)
+
+		# symmetrize, a self loop is a single entry
+		not_loop = node_1 != node_2
+		rows = np.concatenate((node_1, node_2[not_loop]))
+		cols = np.concatenate((node_2, node_1[not_loop]))
+		data = np.concatenate((scores, scores[not_loop]))
+
+		adjacency_matrix = sparse.coo_matrix((data, (rows, cols)), shape = (n, n)).tocsr()
+
+		return SparseGraph(adjacency_matrix, node_ids, self.vocabulary)
+
+	def load_cached_graph(self,file_path, has_header = True, absolute_policy = True):
+
+		key = self.cache.key(file_path, "graph", has_header = has_header, absolute_policy = absolute_policy)
+		entry = self.cache.load(key)
+
+		if entry != None:
+			# names are interned again: ids depend on what this loader has already seen
+			node_ids = [self.vocabulary.add(name) for name in entry["names"].tolist()]
+			n = len(node_ids)
+
+			adjacency_matrix = sparse.csr_matrix((entry["data"], entry["indices"], entry["indptr"]), shape = (n, n))
+			G = SparseGraph(adjacency_matrix, node_ids, self.vocabulary)
+
+		else:
+			G = self.load_sparse_graph(file_path, has_header, absolute_policy)
+
+			self.cache.save(key, {
+				"names": np.array(self.vocabulary.decode(G.nodes()), dtype = str),
+				"indptr": G.adjacency_matrix.indptr,
+				"indices": G.adjacency_matrix.indices,
+				"data": G.adjacency_matrix.data,
+				})
+
+		if self.sparse_graphs:
+			return G
+
+		return G.to_networkx()
+
+	def __read_edge_list__(self, file_path, has_header = True):
+
+		with open(file_path, 'r') as fp:
+			lines = fp.read().split("\n")[1 if has_header else 0:]
+
+		# a blank line is no row for csv.reader either; loadtxt warns on
+		# blank lines and on input without data, so it never sees them
+		lines = [line for line in lines if line != ""]
+
+		if len(lines) == 0:
+			return np.empty(0, dtype = str), np.empty(0, dtype = str), np.empty(0, dtype = np.float64)
+
+		try:
+			table = np.loadtxt(lines, dtype = str, delimiter = "\t", ndmin = 2, comments = None, quotechar = '"')
+			rows = None
+		except ValueError:
+			# rows with a different number of columns: keep the ones load_graph keeps
+			rows = [row for row in csv.reader(lines, delimiter = "\t") if len(row) in (2, 3)]
+
+		if rows != None:
+			sources = np.array([row[0] for row in rows], dtype = str)
+			targets = np.array([row[1] for row in rows], dtype = str)
+			scores = np.array([self.__parse_score__(row[2]) if len(row) == 3 else 1.0 for row in rows], dtype = np.float64)
+
+			return sources, targets, scores
+
+		if table.shape[1] not in (2, 3):
+			table = np.empty((0, 2), dtype = str)
+
+		sources = table[:, 0]
+		targets = table[:, 1]
+
+		if table.shape[1] == 3:
+			try:
+				scores = table[:, 2].astype(np.float64)
+			except ValueError:
+				scores = np.array([self.__parse_score__(score) for score in table[:, 2].tolist()], dtype = np.float64)
+		else:
+			scores = np.ones(len(table))
+
+		return sources, targets, scores
+
+	def __parse_score__(self, score):
+
+		try:
+			return float(score)
+		except ValueError:
+			return 0.0
+
+
 	def load_seed_set(self,file_path):
 		
 		seed_set = set()
@@ -199,11 +405,11 @@ class Loader():
 
 				if column_size == 1:
 
-					seed = row[0]
+					seed = self.vocabulary.add(row[0])
 					seed_set.add(seed)
 
 				elif column_size == 2:
-					seed = row[0]
+					seed = self.vocabulary.add(row[0])
 					score = float(row[1])
 
 					seed_dict[seed] = score
@@ -215,3 +421,27 @@ class Loader():
 		if column_size == 2:
 			return seed_dict
 
+	def load_ranked_list(self,file_path, has_header = True):
+
+		ranked_list = {}
+
+		with open(file_path, 'r') as fp:
+			csv_reader = csv.reader(fp,delimiter = "\t")
+
+			for index,row in enumerate(csv_reader):
+
+				if has_header:
+					if index == 0:
+						continue
+
+				if len(row) < 2:
+					continue
+
+				# genes that are not in the loaded networks are of no use here
+				gene = self.vocabulary.get(row[0])
+				if gene is None:
+					continue
+
+				ranked_list[gene] = float(row[1])
+
+		return ranked_list
@@ -0,0 +1,72 @@
+import hashlib
+import os
+import shutil
+
+import numpy as np
+
+# bump when the layout of an entry changes, old entries are then never read
+CACHE_VERSION = 1
+
+# content hashes of the files read by this process, valid while their size
+# and modification time do not change
+map__file__hash = {}
+
+def get_file_hash(file_path):
+
+	stat = os.stat(file_path)
+	file_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+
+	if file_key not in map__file__hash:
+		file_hash = hashlib.sha1()
+
+		with open(file_path, 'rb') as fp:
+			for chunk in iter(lambda: fp.read(1 << 20), b""):
+				file_hash.update(chunk)
+
+		map__file__hash[file_key] = file_hash.hexdigest()
+
+	return map__file__hash[file_key]
+
+class NetworkCache():
+
+	""" Parsed inputs stored as plain .npy arrays, one directory per entry.
+	The entry key hashes the content of the source file together with the
+	parse options, so an edited file simply maps to a new entry; arrays
+	are opened with memory mapping.
+	"""
+
+	def __init__(self, cache_dir):
+
+		self.cache_dir = cache_dir
+		os.makedirs(self.cache_dir, exist_ok = True)
+
+
+	def key(self, file_path, kind, **options):
+
+		description = repr((CACHE_VERSION, kind, sorted(options.items()), get_file_hash(file_path)))
+
+		return kind + "-" + hashlib.sha1(description.encode()).hexdigest()
+
+	def load(self, key):
+
+		entry_dir = os.path.join(self.cache_dir, key)
+
+		if not os.path.isdir(entry_dir):
+			return None
+
+		return {file_name[:-4]: np.load(os.path.join(entry_dir, file_name), mmap_mode = "r") for file_name in os.listdir(entry_dir) if file_name.endswith(".npy")}
+
+	def save(self, key, arrays):
+
+		entry_dir = os.path.join(self.cache_dir, key)
+		tmp_dir = entry_dir + ".tmp-" + str(os.getpid())
+
+		os.makedirs(tmp_dir, exist_ok = True)
+		for name, array in arrays.items():
+			np.save(os.path.join(tmp_dir, name + ".npy"), np.asarray(array))
+
+		# the rename makes the entry visible at once to concurrent runs
+		try:
+			os.rename(tmp_dir, entry_dir)
+		except OSError:
+			shutil.rmtree(tmp_dir, ignore_errors = True)
@@ -0,0 +1,106 @@
+import hashlib
+import os
+
+import numpy as np
+from scipy import sparse
+
+from biological_random_walks.loader.loader import Loader
+from biological_random_walks.loader.gene_vocabulary import GeneVocabulary
+from biological_random_walks.loader.network_cache import NetworkCache
+from biological_random_walks.loader.sparse_graph import SparseGraph
+
+class SharedNetworkStore():
+
+	""" Networks and gene annotations loaded once and shared by every worker.
+	The store is a directory of .npy arrays (CSR arrays, node ids and one
+	gene vocabulary for all of them) that each process opens with memory
+	mapping: the pages live once in the page cache whatever the number of
+	workers. Put it on a tmpfs such as /dev/shm to keep it off the disk.
+
+	Inputs are looked up by source file path, so a Loader given the store
+	takes them from it instead of parsing the file.
+	"""
+
+	def __init__(self, store_dir):
+
+		self.store_dir = store_dir
+		self.entries = NetworkCache(store_dir)
+
+		names = self.entries.load("vocabulary")
+		assert names != None, "No network store in " + str(store_dir)
+
+		self.names = names["names"]
+
+
+	@classmethod
+	def create(cls, store_dir, graph_file_paths = (), map_gene_ontologies_file_path = None, cache_dir = None):
+
+		""" Fills an empty (or new) store_dir, or opens it when it already
+		holds these inputs. A store is never deleted here: other processes
+		may still map its files; the caller removes it when done.
+		"""
+
+		keys = [cls.entry_key("graph", file_path) for file_path in graph_file_paths]
+		if map_gene_ontologies_file_path != None:
+			keys.append(cls.entry_key("gene_ontologies", map_gene_ontologies_file_path))
+
+		if os.path.isdir(store_dir) and len(os.listdir(store_dir)) > 0:
+			# the vocabulary is saved last, so a store that has it is complete
+			assert all(os.path.isdir(os.path.join(store_dir, key)) for key in keys + ["vocabulary"]), str(store_dir) + " holds another or an unfinished store, choose an empty directory"
+			return cls(store_dir)
+
+		loader = Loader(map_gene_ontologies_file_path = map_gene_ontologies_file_path, sparse_graphs = True, cache_dir = cache_dir)
+		entries = {}
+
+		for file_path in graph_file_paths:
+			G = loader.load_network(file_path)
+
+			entries[cls.entry_key("graph", file_path)] = {
+				"node_ids": G.node_ids,
+				"indptr": G.adjacency_matrix.indptr,
+				"indices": G.adjacency_matrix.indices,
+				"data": G.adjacency_matrix.data,
+				}
+
+		if map_gene_ontologies_file_path != None:
+			entries[cls.entry_key("gene_ontologies", map_gene_ontologies_file_path)] = loader.load_map__gene__ontologies().to_arrays(loader.vocabulary)
+
+		entries["vocabulary"] = {"names": np.array(loader.vocabulary.names, dtype = str)}
+
+		store = NetworkCache(store_dir)
+
+		for key, arrays in entries.items():
+			store.save(key, arrays)
+
+		return cls(store_dir)
+
+	@staticmethod
+	def entry_key(kind, file_path):
+
+		# size and modification time are enough to notice an edited source
+		stat = os.stat(file_path)
+		description = repr((os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns))
+
+		return kind + "-" + hashlib.sha1(description.encode()).hexdigest()
+
+
+	def get_vocabulary(self,):
+
+		# every Loader gets its own copy: genes met later (e.g. seeds that
+		# are in no network) must not leak into the other workers
+		return GeneVocabulary(self.names.tolist())
+
+	def get_graph(self, file_path, vocabulary = None):
+
+		entry = self.entries.load(self.entry_key("graph", file_path))
+
+		if entry == None:
+			return None
+
+		n = len(entry["node_ids"])
+		adjacency_matrix = sparse.csr_matrix((entry["data"], entry["indices"], entry["indptr"]), shape = (n, n))
+
+		return SparseGraph(adjacency_matrix, entry["node_ids"], vocabulary)
+
+	def get_map__gene__ontologies_arrays(self, file_path):
+		return self.entries.load(self.entry_key("gene_ontologies", file_path))
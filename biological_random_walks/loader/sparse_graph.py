@@ -0,0 +1,72 @@
+import numpy as np
+import networkx as nx
+from scipy import sparse
+
+class SparseGraph():
+
+	""" Weighted directed graph stored as a CSR adjacency matrix.
+	Row/column i is the node whose vocabulary index is node_ids[i]; the
+	entry (i, j) is the weight of the edge i -> j.
+	"""
+
+	def __init__(self, adjacency_matrix, node_ids, vocabulary = None):
+
+		self.adjacency_matrix = sparse.csr_matrix(adjacency_matrix, dtype = np.float64)
+		self.node_ids = np.asarray(node_ids, dtype = np.int32)
+		self.vocabulary = vocabulary
+
+		assert self.adjacency_matrix.shape == (len(self.node_ids), len(self.node_ids)), "adjacency matrix and node list do not match"
+
+		self.node_index = None
+
+
+	@classmethod
+	def from_networkx(cls, G, vocabulary = None):
+
+		nodes = list(G.nodes())
+		return cls(nx.adjacency_matrix(G, nodelist = nodes, weight = "weight"), nodes, vocabulary)
+
+	def to_networkx(self,):
+
+		G = nx.DiGraph()
+		G.add_nodes_from(self.node_ids.tolist())
+
+		adjacency_matrix = self.adjacency_matrix.tocoo()
+		G.add_weighted_edges_from(zip(self.node_ids[adjacency_matrix.row].tolist(), self.node_ids[adjacency_matrix.col].tolist(), adjacency_matrix.data.tolist()))
+
+		return G
+
+
+	def get_node_index(self,):
+
+		if self.node_index is None:
+			self.node_index = {node: index for index, node in enumerate(self.node_ids.tolist())}
+
+		return self.node_index
+
+	def nodes(self,):
+		return self.node_ids.tolist()
+
+	def number_of_nodes(self,):
+		return len(self.node_ids)
+
+	def number_of_edges(self,):
+		return self.adjacency_matrix.nnz
+
+
+	def __iter__(self,):
+		return iter(self.node_ids.tolist())
+
+	def __len__(self,):
+		return len(self.node_ids)
+
+	def __contains__(self, node):
+		return node in self.get_node_index()
+
+	def __getitem__(self, node):
+
+		# successors of node, as G[node] of a networkx graph
+		index = self.get_node_index()[node]
+		start, end = self.adjacency_matrix.indptr[index], self.adjacency_matrix.indptr[index + 1]
+
+		return self.node_ids[self.adjacency_matrix.indices[start:end]].tolist()
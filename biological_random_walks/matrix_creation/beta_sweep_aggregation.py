@@ -0,0 +1,61 @@
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import LinearOperator
+
+from biological_random_walks.matrix_creation.convex_combination_aggregation_matrix_creation import ConvexCombinationMatrixAggregationCreation
+from biological_random_walks.loader.sparse_graph import SparseGraph
+
+class BetaSweepAggregation():
+
+	""" Convex combination of PPI and CO-expression for many values of beta.
+	Alignment, normalization and the choice of the edges do not depend on
+	beta, so they are done once; the aggregated graph of a given beta is
+	then built on demand, or its RWR transition operator is applied as two
+	matvecs without building it:
+
+		W x = beta * A^T (D^-1 x) + (1 - beta) * B^T (D^-1 x),
+		D = diag(beta * A 1 + (1 - beta) * B 1)
+
+	with A, B the normalized PPI and CO-expression layers (D is the row
+	normalization the core applies to the aggregated graph).
+	"""
+
+	def __init__(self, PPI_network, CO_expression_network, chosen_policy = "PPI_network"):
+
+		aggregation = ConvexCombinationMatrixAggregationCreation(PPI_network, CO_expression_network, None)
+		self.node_ids, self.PPI_layer, self.CO_expression_layer, self.vocabulary = aggregation._get_sparse_layers(chosen_policy)
+
+		self.aggregation = aggregation
+		self.graphs = {}
+
+		self.PPI_out_weight = np.asarray(self.PPI_layer.sum(axis = 1)).ravel()
+		self.CO_expression_out_weight = np.asarray(self.CO_expression_layer.sum(axis = 1)).ravel()
+
+		# the CSR arrays of a layer read as CSC are its transpose
+		n = len(self.node_ids)
+		self.PPI_transposed = sparse.csc_matrix((self.PPI_layer.data, self.PPI_layer.indices, self.PPI_layer.indptr), shape = (n, n))
+		self.CO_expression_transposed = sparse.csc_matrix((self.CO_expression_layer.data, self.CO_expression_layer.indices, self.CO_expression_layer.indptr), shape = (n, n))
+
+
+	def get_graph(self, beta):
+
+		if beta not in self.graphs:
+			self.graphs[beta] = SparseGraph(self.aggregation._combine_sparse_layers(self.PPI_layer, self.CO_expression_layer, beta), self.node_ids, self.vocabulary)
+
+		return self.graphs[beta]
+
+	def get_transition_operator(self, beta):
+
+		total_weight = beta * self.PPI_out_weight + (1 - beta) * self.CO_expression_out_weight
+		scale = np.divide(1.0, total_weight, out = np.zeros_like(total_weight), where = total_weight != 0.0)
+
+		def matmat(X):
+			Y = scale[:, None] * X
+			return beta * self.PPI_transposed.dot(Y) + (1 - beta) * self.CO_expression_transposed.dot(Y)
+
+		def matvec(x):
+			return matmat(np.asarray(x).reshape(-1, 1)).ravel()
+
+		n = len(self.node_ids)
+
+		return LinearOperator((n, n), matvec = matvec, matmat = matmat, dtype = np.float64)
@@ -1,5 +1,9 @@
+import numpy as np
 import networkx as nx
+from scipy import sparse
+
 from biological_random_walks.matrix_creation.matrix_aggregation import MatrixAggregation
+from biological_random_walks.loader.sparse_graph import SparseGraph
 
 class ConvexCombinationMatrixAggregationCreation(MatrixAggregation):
 	
@@ -48,6 +52,107 @@ class ConvexCombinationMatrixAggregationCreation(MatrixAggregation):
 
 
 
+	def run_sparse(self, chosen_policy):
+
+		""" Same aggregation as run on CSR matrices aligned on one node list:
+		beta * PPI + (1 - beta) * CO-expression after row normalization.
+		Nodes follow the PPI order; an edge kept with a zero weight still
+		keeps its nodes, as in the networkx graph.
+		"""
+
+		node_ids, PPI_layer, CO_expression_layer, vocabulary = self._get_sparse_layers(chosen_policy)
+
+		aggregated_graph = SparseGraph(self._combine_sparse_layers(PPI_layer, CO_expression_layer, self.beta), node_ids, vocabulary)
+
+		V = set(aggregated_graph.nodes())
+
+		return aggregated_graph, V
+
+	def _get_sparse_layers(self, chosen_policy):
+
+		# the row-normalized PPI and CO-expression edges that enter the
+		# aggregation whatever beta is, aligned on the nodes of the result
+
+		PPI = self.PPI if isinstance(self.PPI, SparseGraph) else SparseGraph.from_networkx(self.PPI)
+		CO_expression_network = self.CO_expression_network if isinstance(self.CO_expression_network, SparseGraph) else SparseGraph.from_networkx(self.CO_expression_network)
+
+		nodes_from_given_policy = self.choose_policy(set(PPI.nodes()), set(CO_expression_network.nodes()), chosen_policy = chosen_policy)
+
+		node_ids = np.array([node for node in PPI.nodes() if node in nodes_from_given_policy], dtype = np.int32)
+		n = len(node_ids)
+
+		PPI_sub_network = self._align_adjacency_matrix(PPI, node_ids)
+		CO_expression_sub_network = self._align_adjacency_matrix(CO_expression_network, node_ids)
+
+		PPI_sub_normalized_sub_network = self._normalize_adjacency_matrix(PPI_sub_network)
+		CO_expression_normalized_sub_network = self._normalize_adjacency_matrix(CO_expression_sub_network)
+
+		# PPI edges with a positive weight, then co-expression edges that are
+		# either positive or on top of a kept PPI edge
+		ppi_kept = PPI_sub_normalized_sub_network.data > 0.0
+		ppi_rows = np.repeat(np.arange(n), np.diff(PPI_sub_normalized_sub_network.indptr))[ppi_kept]
+		ppi_cols = PPI_sub_normalized_sub_network.indices[ppi_kept]
+		ppi_weights = PPI_sub_normalized_sub_network.data[ppi_kept]
+
+		ppi_edges = sparse.csr_matrix((np.ones(len(ppi_rows), dtype = bool), (ppi_rows, ppi_cols)), shape = (n, n))
+
+		co_rows = np.repeat(np.arange(n), np.diff(CO_expression_normalized_sub_network.indptr))
+		co_cols = CO_expression_normalized_sub_network.indices
+		co_weights = CO_expression_normalized_sub_network.data
+
+		co_kept = (co_weights > 0.0) | np.asarray(ppi_edges[co_rows, co_cols]).ravel()
+		co_rows, co_cols, co_weights = co_rows[co_kept], co_cols[co_kept], co_weights[co_kept]
+
+		# nodes left without any edge are not part of the aggregated graph
+		has_edge = np.zeros(n, dtype = bool)
+		for edge_ends in (ppi_rows, ppi_cols, co_rows, co_cols):
+			has_edge[edge_ends] = True
+
+		position = np.cumsum(has_edge) - 1
+		m = int(has_edge.sum())
+
+		# explicit zeros are kept: duplicates are summed, nothing is dropped
+		PPI_layer = sparse.coo_matrix((ppi_weights, (position[ppi_rows], position[ppi_cols])), shape = (m, m)).tocsr()
+		CO_expression_layer = sparse.coo_matrix((co_weights, (position[co_rows], position[co_cols])), shape = (m, m)).tocsr()
+
+		return node_ids[has_edge], PPI_layer, CO_expression_layer, PPI.vocabulary
+
+	def _combine_sparse_layers(self, PPI_layer, CO_expression_layer, beta):
+
+		# beta * PPI + (1 - beta) * CO-expression on the union of the two
+		# structures, a zero weight staying an edge
+		PPI_layer = PPI_layer.tocoo()
+		CO_expression_layer = CO_expression_layer.tocoo()
+
+		rows = np.concatenate((PPI_layer.row, CO_expression_layer.row))
+		cols = np.concatenate((PPI_layer.col, CO_expression_layer.col))
+		data = np.concatenate((beta * PPI_layer.data, (1 - beta) * CO_expression_layer.data))
+
+		return sparse.coo_matrix((data, (rows, cols)), shape = PPI_layer.shape).tocsr()
+
+	def _align_adjacency_matrix(self, G, node_ids):
+
+		# adjacency of G on node_ids, in that order; missing nodes have no edge
+		position = np.full(int(max(G.node_ids.max(initial = -1), node_ids.max(initial = -1))) + 1, -1)
+		position[node_ids] = np.arange(len(node_ids))
+
+		adjacency_matrix = G.adjacency_matrix.tocoo()
+		rows = position[G.node_ids[adjacency_matrix.row]]
+		cols = position[G.node_ids[adjacency_matrix.col]]
+
+		inside = (rows >= 0) & (cols >= 0)
+
+		return sparse.coo_matrix((adjacency_matrix.data[inside], (rows[inside], cols[inside])), shape = (len(node_ids), len(node_ids))).tocsr()
+
+	def _normalize_adjacency_matrix(self, adjacency_matrix):
+
+		# a row without weight keeps its edges with weight 0.0
+		total_weight = np.repeat(np.asarray(adjacency_matrix.sum(axis = 1)).ravel(), np.diff(adjacency_matrix.indptr))
+		data = np.divide(adjacency_matrix.data, total_weight, out = np.zeros_like(adjacency_matrix.data), where = total_weight != 0.0)
+
+		return sparse.csr_matrix((data, adjacency_matrix.indices, adjacency_matrix.indptr), shape = adjacency_matrix.shape)
+
+
 	def _aggregate_adjacency_matrix(self,PPI_network,CO_expression_network, V):
 		
 		final_graph = nx.DiGraph()
@@ -0,0 +1,96 @@
+import numpy as np
+from scipy import sparse
+
+from biological_random_walks.matrix_creation.matrix_aggregation import MatrixAggregation
+from biological_random_walks.loader.sparse_graph import SparseGraph
+
+class MultiplexMatrixAggregationCreation(MatrixAggregation):
+
+	""" Weighted sum of any number of row-normalized layers (PPI,
+	co-expression, signalling, pathway co-membership, ...) loaded with the
+	same vocabulary. All layers go through one concatenated edge list:
+	alignment, normalization and sum are array ops, linear in the edges.
+	With two layers and the First_layer policy it gives the convex
+	combination of ConvexCombinationMatrixAggregationCreation.
+	"""
+
+	def __init__(self, layers, weights):
+
+		assert len(layers) > 0 and len(layers) == len(weights), "One weight per layer is needed"
+		assert all(weight >= 0.0 for weight in weights) and abs(sum(weights) - 1.0) < 1e-9, "Layer weights must be non negative and sum to 1"
+
+		self.layers = [layer if isinstance(layer, SparseGraph) else SparseGraph.from_networkx(layer) for layer in layers]
+		self.weights = weights
+
+		self.choose_policy_exit = 1
+
+
+	def choose_policy(self, node_ids, in_layers, chosen_policy = "First_layer"):
+
+		if chosen_policy == "Union":
+			return np.ones(len(node_ids), dtype = bool)
+		elif chosen_policy == "Intersection":
+			return in_layers.all(axis = 0)
+		elif chosen_policy == "First_layer":
+			return in_layers[0]
+		else:
+			print("No corrected choosen policy", chosen_policy)
+			exit(self.choose_policy_exit)
+
+
+	def run(self, chosen_policy = "First_layer"):
+
+		# nodes in order of first appearance over the layers, in layer order
+		all_node_ids = np.concatenate([layer.node_ids for layer in self.layers])
+		_, first_position = np.unique(all_node_ids, return_index = True)
+		node_ids = all_node_ids[np.sort(first_position)]
+
+		position = np.full(int(node_ids.max(initial = -1)) + 1, -1)
+		position[node_ids] = np.arange(len(node_ids))
+
+		in_layers = np.zeros((len(self.layers), len(node_ids)), dtype = bool)
+		for index, layer in enumerate(self.layers):
+			in_layers[index, position[layer.node_ids]] = True
+
+		selected = self.choose_policy(node_ids, in_layers, chosen_policy = chosen_policy)
+		position[node_ids[~selected]] = -1
+
+		# one edge list for all layers
+		rows, cols, data, layer_index = [], [], [], []
+		for index, layer in enumerate(self.layers):
+			adjacency_matrix = layer.adjacency_matrix.tocoo()
+
+			rows.append(position[layer.node_ids[adjacency_matrix.row]])
+			cols.append(position[layer.node_ids[adjacency_matrix.col]])
+			data.append(adjacency_matrix.data)
+			layer_index.append(np.full(adjacency_matrix.nnz, index))
+
+		rows, cols, data, layer_index = (np.concatenate(array) for array in (rows, cols, data, layer_index))
+
+		inside = (rows >= 0) & (cols >= 0)
+		rows, cols, data, layer_index = rows[inside], cols[inside], data[inside], layer_index[inside]
+
+		# row normalization of every layer on the selected nodes, then its weight
+		n = len(node_ids)
+		total_weight = np.bincount(layer_index * n + rows, weights = data, minlength = len(self.layers) * n)[layer_index * n + rows]
+		data = np.divide(data, total_weight, out = np.zeros_like(data), where = total_weight != 0.0)
+
+		kept = data > 0.0
+		rows, cols = rows[kept], cols[kept]
+		data = np.asarray(self.weights, dtype = np.float64)[layer_index[kept]] * data[kept]
+
+		# nodes left without any edge are not part of the aggregated graph;
+		# an edge of a zero-weight layer still counts
+		has_edge = np.zeros(n, dtype = bool)
+		has_edge[rows] = True
+		has_edge[cols] = True
+
+		new_position = np.cumsum(has_edge) - 1
+		m = int(has_edge.sum())
+
+		aggregated_matrix = sparse.coo_matrix((data, (new_position[rows], new_position[cols])), shape = (m, m)).tocsr()
+		aggregated_graph = SparseGraph(aggregated_matrix, node_ids[has_edge], self.layers[0].vocabulary)
+
+		V = set(aggregated_graph.nodes())
+
+		return aggregated_graph, V
@@ -1,3 +1,5 @@
+import numpy as np
+
 class PersonalizationVectorAggregation():
 	
 	def __init__(self, personalization_vectors,universe,alpha):
@@ -8,6 +10,9 @@ class PersonalizationVectorAggregation():
 		
 
 	def run(self,chosen_policy = "Sum"):
+
+		if all(isinstance(p_v, np.ndarray) for p_v in self.map__index__p_vs.values()):
+			return self.run_vector(chosen_policy)
 		
 		aggregated_personalization_vector = {}
 	
@@ -32,12 +37,20 @@ class PersonalizationVectorAggregation():
 
 		return personalization_vectors
 
+	def run_vector(self, chosen_policy = "Sum"):
 
+		# the same aggregation on dense vectors aligned with the graph nodes
+		aggregated_personalization_vector = None
 
+		for i, p_v in self.map__index__p_vs.items():
 
+			if i == 0:
+				aggregated_personalization_vector = self.alpha * p_v
 
+			elif chosen_policy == "Sum":
+				aggregated_personalization_vector = aggregated_personalization_vector + (1 - self.alpha) * p_v
 
+			elif chosen_policy == "Product":
+				aggregated_personalization_vector = aggregated_personalization_vector * p_v
 
-
-
-
+		return aggregated_personalization_vector / aggregated_personalization_vector.sum()
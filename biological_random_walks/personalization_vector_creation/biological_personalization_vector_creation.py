@@ -1,3 +1,5 @@
+import numpy as np
+
 from biological_random_walks.personalization_vector_creation.pv_creation import PersonalizationVectorCreation
 
 
@@ -18,32 +20,44 @@ class BiologicalPersonalizationVectorCreation(PersonalizationVectorCreation):
 	def run(self, ):
 		return self._set_up_biological_personalization_vector()
 
+	def run_vector(self, nodes, discriminant = True):
+
+		assert self.map__gene_name__ontologies != None and self.disease_ontology != None, "Not enough input parameters for biological teleporting probability"
+		assert len(self.selected_seed_set) != 0, "No source gene in PPI network"
+
+		# node relevance: sum over the DBs of the share of disease terms it is annotated with
+		incidence_matrix, term_weights = self.map__gene_name__ontologies.get_disease_incidence(nodes, self.disease_ontology)
+		personalization_vector = incidence_matrix.dot(term_weights)
+
+		if discriminant:
+			personalization_vector[np.isin(np.asarray(nodes), list(self.selected_seed_set))] = len(self.disease_ontology)
+
+		l_1_norm = personalization_vector.sum()
+		assert l_1_norm > 0.0, "personalization vector is the null vector"
+
+		return personalization_vector / l_1_norm
+
 
 	def _set_up_biological_personalization_vector(self,discriminant = True):
 		
 		assert self.map__gene_name__ontologies != None and self.disease_ontology != None, "Not enough input parameters for biological teleporting probability"
 		
 		assert len(self.selected_seed_set) != 0, "No source gene in PPI network"
+
+		nodes = list(self.universe)
+
+		# node relevance contribution over a set of different biological information
+		node_relevance = np.zeros(len(nodes))
+		for k, disease_terms_count in self.map__gene_name__ontologies.count_disease_terms(nodes, self.disease_ontology).items():
+			node_relevance += disease_terms_count / len(self.disease_ontology[k])
+
 		personalization_vector = {}
-		for node in self.universe:
+		for node, relevance in zip(nodes, node_relevance.tolist()):
 
 			if node in self.selected_seed_set and discriminant:
 				personalization_vector[node] = len(self.disease_ontology)
-				continue
-
-			if node in self.map__gene_name__ontologies:
-				node_relevance = 0.0
-				node_ontologies = self.map__gene_name__ontologies[node]
-					
-				#node relevance contribution over a set of different biological information
-				for k,v in self.disease_ontology.items():
-					#node relevance
-					if k in node_ontologies:
-						node_relevance += len(v.intersection(node_ontologies[k]))/len(v)
-
-				personalization_vector[node] = node_relevance
 			else:
-				personalization_vector[node] = 0.0
+				personalization_vector[node] = relevance
 	
 		l_1_norm = sum(personalization_vector.values())
 		assert l_1_norm > 0.0, "personalization vector is the null vector"
@@ -1,3 +1,5 @@
+import numpy as np
+
 from biological_random_walks.personalization_vector_creation.pv_creation import PersonalizationVectorCreation
 
 class DefaultPersonalizationVectorCreation(PersonalizationVectorCreation):
@@ -13,6 +15,13 @@ class DefaultPersonalizationVectorCreation(PersonalizationVectorCreation):
 	def run(self, ):
 		return self._set_up_default_personalization_vactor()
 
+	def run_vector(self, nodes):
+
+		size = len(self.selected_seed_set)
+		assert size != 0, ",".join(map(str, self.source_not_in_G)) + " are not in G"
+
+		return np.isin(np.asarray(nodes), list(self.selected_seed_set)) / size
+
 	
 	def _set_up_default_personalization_vactor(self,):
 		
@@ -20,7 +29,7 @@ class DefaultPersonalizationVectorCreation(PersonalizationVectorCreation):
 		size = len(self.selected_seed_set)
 
 		# seed set different from empty set
-		assert size != 0, ",".join(list(self.source_not_in_G)) + " are not in G"
+		assert size != 0, ",".join(map(str, self.source_not_in_G)) + " are not in G"
 		
 		for node in self.universe:
 			
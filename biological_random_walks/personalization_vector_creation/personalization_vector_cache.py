@@ -0,0 +1,84 @@
+import collections
+import hashlib
+
+import numpy as np
+import networkx as nx
+from scipy import sparse
+
+from biological_random_walks.loader.network_cache import NetworkCache, CACHE_VERSION, get_file_hash
+from biological_random_walks.loader.sparse_graph import SparseGraph
+
+class PersonalizationVectorCache():
+
+	""" Computed personalization vectors, in memory with LRU eviction and,
+	with a cache_dir, on disk as NetworkCache entries. The key hashes the
+	content of the input files, the names of the nodes in order (vectors
+	are aligned with them) and, for the policies that read the network,
+	its structure; so alpha/beta points of the same cancer share them.
+	"""
+
+	def __init__(self, max_size = 64, cache_dir = None):
+
+		self.max_size = max_size
+		self.map__key__vector = collections.OrderedDict()
+
+		self.disk_cache = NetworkCache(cache_dir) if cache_dir != None else None
+
+
+	def key(self, policy, file_paths, node_names, G = None):
+
+		description = hashlib.sha1()
+		description.update(repr((CACHE_VERSION, policy, [get_file_hash(file_path) if file_path != None else None for file_path in file_paths])).encode())
+		description.update("\n".join(map(str, node_names)).encode())
+
+		if G != None:
+			# edge pattern in the order of the nodes (weights do not matter)
+			if isinstance(G, SparseGraph):
+				pattern = G.adjacency_matrix.copy()
+			else:
+				pattern = sparse.csr_matrix(nx.adjacency_matrix(G, nodelist = list(G.nodes()), weight = None))
+
+			pattern.sort_indices()
+			description.update(np.ascontiguousarray(pattern.indptr, dtype = np.int64).tobytes())
+			description.update(np.ascontiguousarray(pattern.indices, dtype = np.int64).tobytes())
+
+		return "personalization_vector-" + description.hexdigest()
+
+
+	def get(self, key):
+
+		if key in self.map__key__vector:
+			self.map__key__vector.move_to_end(key)
+			return self.map__key__vector[key]
+
+		if self.disk_cache != None:
+			arrays = self.disk_cache.load(key)
+
+			if arrays != None:
+				vector = np.array(arrays["vector"])
+				self.__remember__(key, vector)
+
+				return vector
+
+		return None
+
+	def put(self, key, vector):
+
+		self.__remember__(key, vector)
+
+		if self.disk_cache != None:
+			self.disk_cache.save(key, {"vector": vector})
+
+	def __remember__(self, key, vector):
+
+		# shared between runs: nobody may change it in place
+		vector.setflags(write = False)
+
+		self.map__key__vector[key] = vector
+		self.map__key__vector.move_to_end(key)
+
+		while len(self.map__key__vector) > self.max_size:
+			self.map__key__vector.popitem(last = False)
+
+	def __len__(self,):
+		return len(self.map__key__vector)
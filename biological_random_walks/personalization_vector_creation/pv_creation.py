@@ -1,7 +1,15 @@
 import abc
 
+import numpy as np
+
 class PersonalizationVectorCreation(metaclass=abc.ABCMeta):
 	
 	@abc.abstractmethod
 	def run(self):
-		print("abstract methods")
\ No newline at end of file
+		print("abstract methods")
+
+	def run_vector(self, nodes):
+
+		# dense vector aligned with nodes (the order of the graph)
+		personalization_vector = self.run()
+		return np.array([personalization_vector[node] for node in nodes], dtype = np.float64)
\ No newline at end of file
@@ -1,3 +1,8 @@
+import numpy as np
+import networkx as nx
+from scipy import sparse
+
+from biological_random_walks.loader.sparse_graph import SparseGraph
 from biological_random_walks.personalization_vector_creation.pv_creation import PersonalizationVectorCreation
 
 
@@ -15,33 +20,63 @@ class TopologicalPersonalizationVectorCreation(PersonalizationVectorCreation):
 	def run(self, ):
 		return self._set_up_topological_personalization_vector()
 
+	def run_vector(self, nodes):
 
-	def _get_radius_2_neighbors(self,node):
-		
-		neighbors = set(self.G[node])
-		neighbors_radius_2_set = set()
+		assert type(self.secondary_seed_set) == dict, "Secondary seed set is not a dictionaty with Key (string) and value (float)" 
+		assert self.G != None and self.secondary_seed_set != None, "Not enough input parameters to compute topological personalization vector" 
 
-		for neighbor in neighbors:
-			neighbors_radius_2 =self.G[neighbor]
+		# only the secondary seeds have a non zero score
+		personalization_vector = np.zeros(len(nodes))
 
-			for neighbor_radius_2 in neighbors_radius_2:
-				neighbors_radius_2_set.add(neighbor_radius_2)
+		in_secondary_seed_set = np.array([node in self.secondary_seed_set for node in nodes], dtype = bool)
+		personalization_vector[in_secondary_seed_set] = self._compute_topological_probabilities([node for node in nodes if node in self.secondary_seed_set])
 
-		neighbors_radius_2_set = neighbors_radius_2_set.difference(node)
-		neighbors_radius_2_set = neighbors_radius_2_set.difference(neighbors)
+		return personalization_vector / personalization_vector.sum()
 
-		return neighbors_radius_2_set
 
+	def _get_adjacency_pattern(self,):
 
-	def _compute_topological_node_probability(self, node, phi):
-		
-		node_degree = len(self.G[node])
-		neighbors = set(self.G[node])
+		# A[u, v] = 1 for every edge u -> v of G (zero weight edges included)
+		if isinstance(self.G, SparseGraph):
+			adjacency_matrix = self.G.adjacency_matrix
+			pattern = sparse.csr_matrix((np.ones(adjacency_matrix.nnz), adjacency_matrix.indices, adjacency_matrix.indptr), shape = adjacency_matrix.shape)
 
-		neighbors_radius_2 = self._get_radius_2_neighbors(node)
-		
-		proportion_of_disease_neighbors_radius_1 = len(neighbors.intersection(self.selected_seed_set))/node_degree
-		proportion_of_disease_neighbors_radius_2 = len(neighbors_radius_2.intersection(self.selected_seed_set))/len(neighbors_radius_2)
+			return pattern, self.G.node_ids, self.G.get_node_index()
+
+		node_ids = list(self.G.nodes())
+		pattern = sparse.csr_matrix(nx.adjacency_matrix(self.G, nodelist = node_ids, weight = None), dtype = np.float64)
+
+		return pattern, np.asarray(node_ids), {node: index for index, node in enumerate(node_ids)}
+
+
+	def _compute_topological_probabilities(self, nodes):
+
+		""" For every node u, the share of seeds among its neighbors N(u)
+		plus the share of seeds among the nodes two hops away that are not
+		neighbors, R(u) = N(N(u)) - N(u) (u itself is in it when reached back
+		through a neighbor). With A the
+		adjacency pattern, s the seed indicator and A_u the rows of the
+		nodes, N(N(u)) is the pattern of A_u A.
+		"""
+
+		pattern, node_ids, node_index = self._get_adjacency_pattern()
+
+		seed_indicator = np.isin(node_ids, list(self.selected_seed_set)).astype(np.float64)
+		rows = pattern[[node_index[node] for node in nodes]]
+
+		radius_2 = rows.dot(pattern)
+		radius_2.data[:] = 1.0
+
+		# the neighbors reached again in two hops are left out
+		radius_2_neighbors = radius_2.multiply(rows).tocsr()
+
+		node_degree = np.diff(rows.indptr)
+		radius_2_size = np.diff(radius_2.indptr) - np.diff(radius_2_neighbors.indptr)
+
+		assert np.all(node_degree > 0) and np.all(radius_2_size > 0), "Secondary seeds need neighbors at radius 1 and 2"
+
+		proportion_of_disease_neighbors_radius_1 = rows.dot(seed_indicator) / node_degree
+		proportion_of_disease_neighbors_radius_2 = (radius_2.dot(seed_indicator) - radius_2_neighbors.dot(seed_indicator)) / radius_2_size
 
 		return proportion_of_disease_neighbors_radius_1 + proportion_of_disease_neighbors_radius_2
 
@@ -53,16 +88,11 @@ class TopologicalPersonalizationVectorCreation(PersonalizationVectorCreation):
 
 		personalization_vector = {}
 
-		for node in self.universe:
-			
-			if node in self.secondary_seed_set:
+		secondary_seeds = [node for node in self.universe if node in self.secondary_seed_set]
+		map__node__score = dict(zip(secondary_seeds, self._compute_topological_probabilities(secondary_seeds).tolist()))
 
-				phi = self.secondary_seed_set[node]
-				score = self._compute_topological_node_probability(node, phi)
-				personalization_vector[node] = score
-
-			else:
-				personalization_vector[node] = 0.0
+		for node in self.universe:
+			personalization_vector[node] = map__node__score.get(node, 0.0)
 
 		l_1_personalization_vector = sum(personalization_vector.values())
 
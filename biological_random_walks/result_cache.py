@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from biological_random_walks.loader.network_cache import NetworkCache, CACHE_VERSION, get_file_hash
+
+class ResultCache():
+
+	""" Ranked lists of finished runs and their evaluations, keyed by the
+	content of the input files and every parameter of the run, so a
+	stopped or extended sweep only computes the runs it has not seen.
+	Ranked lists are NetworkCache entries, evaluations a small JSON file
+	next to them (name -> value).
+	"""
+
+	def __init__(self, cache_dir):
+
+		self.cache_dir = cache_dir
+		self.ranked_lists = NetworkCache(cache_dir)
+
+
+	def key(self, file_paths, **parameters):
+
+		# file_paths: {input name: path or None}
+		file_hashes = sorted((name, get_file_hash(file_path) if file_path != None else None) for name, file_path in file_paths.items())
+		description = repr((CACHE_VERSION, file_hashes, sorted(parameters.items())))
+
+		return "result-" + hashlib.sha1(description.encode()).hexdigest()
+
+
+	def load_ranked_list(self, key):
+
+		arrays = self.ranked_lists.load(key)
+
+		if arrays == None:
+			return None
+
+		return [[gene, score] for gene, score in zip(arrays["genes"].tolist(), arrays["scores"].tolist())]
+
+	def save_ranked_list(self, key, ranked_list):
+
+		self.ranked_lists.save(key, {
+			"genes": np.array([item[0] for item in ranked_list], dtype = str),
+			"scores": np.array([item[1] for item in ranked_list], dtype = np.float64),
+			})
+
+
+	def load_evaluations(self, key):
+
+		file_path = os.path.join(self.cache_dir, key + ".evaluation.json")
+
+		if not os.path.isfile(file_path):
+			return {}
+
+		with open(file_path, 'r') as fp:
+			return json.load(fp)
+
+	def load_evaluation(self, key, name):
+		return self.load_evaluations(key).get(name)
+
+	def save_evaluation(self, key, name, value):
+
+		evaluations = self.load_evaluations(key)
+		evaluations[name] = value
+
+		file_path = os.path.join(self.cache_dir, key + ".evaluation.json")
+		tmp_file_path = file_path + ".tmp-" + str(os.getpid())
+
+		with open(tmp_file_path, 'w') as fp:
+			json.dump(evaluations, fp)
+
+		# readers see either the old or the new file
+		os.replace(tmp_file_path, file_path)
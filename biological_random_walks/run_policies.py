@@ -0,0 +1,52 @@
+# the inputs of a run (main.py options); runs with the same inputs share
+# networks, weights and personalization vectors
+INPUT_KEYS = [
+	"seed_file_path",
+	"secondary_seed_file_path",
+	"ppi_file_path",
+	"co_expression_file_path",
+	"disease_ontology_file_path",
+	"map__gene__ontologies_file_path",
+	]
+
+def get_policies(inputs):
+
+	# the same choices as main.py
+	if inputs["ppi_file_path"] != None and inputs["co_expression_file_path"] != None:
+		matrix_aggregation_policy = "convex_combination"
+	elif inputs["ppi_file_path"] != None:
+		matrix_aggregation_policy = "only_ppi_network"
+	else:
+		matrix_aggregation_policy = "only_co_expression_network"
+
+	personalization_vector_creation_policies = []
+
+	if inputs["secondary_seed_file_path"] != None:
+		personalization_vector_creation_policies.append("topological")
+
+	network_weight_flag = inputs["disease_ontology_file_path"] != None and inputs["map__gene__ontologies_file_path"] != None
+	if network_weight_flag:
+		personalization_vector_creation_policies.append("biological")
+
+	if len(personalization_vector_creation_policies) == 0:
+		personalization_vector_creation_policies.append("default")
+
+	return matrix_aggregation_policy, personalization_vector_creation_policies, network_weight_flag
+
+def get_result_parameters(run, restart_prob, solver, top_k):
+
+	# inputs and parameters that identify the result of a run (ResultCache.key)
+	inputs = {key: run.get(key) for key in INPUT_KEYS}
+	matrix_aggregation_policy, personalization_vector_creation_policies, network_weight_flag = get_policies(inputs)
+
+	return inputs, {
+		"alpha": run["alpha"],
+		"beta": run["beta"],
+		"restart_prob": restart_prob,
+		"solver": solver,
+		"top_k": top_k,
+		"matrix_aggregation_policy": matrix_aggregation_policy,
+		"personalization_vector_creation_policies": tuple(personalization_vector_creation_policies),
+		"personalization_vector_aggregation_policy": "Sum",
+		"network_weight_flag": network_weight_flag,
+		}
@@ -0,0 +1,462 @@
+import collections
+import concurrent.futures
+import csv
+import functools
+import threading
+import time
+
+from biological_random_walks.run_policies import INPUT_KEYS, get_policies, get_result_parameters
+from biological_random_walks.loader.loader import Loader
+from biological_random_walks.loader.gene_vocabulary import GeneVocabulary
+from biological_random_walks.loader.shared_network_store import SharedNetworkStore
+from biological_random_walks.graph_weight_computation.PPI_graph_weight_computation import ComputePPIGraphWeight
+from biological_random_walks.matrix_creation.beta_sweep_aggregation import BetaSweepAggregation
+from biological_random_walks.personalization_vector_creation.default_personalization_vector_creation import DefaultPersonalizationVectorCreation
+from biological_random_walks.personalization_vector_creation.biological_personalization_vector_creation import BiologicalPersonalizationVectorCreation
+from biological_random_walks.personalization_vector_creation.topological_personalization_vector_creation import TopologicalPersonalizationVectorCreation
+from biological_random_walks.personalization_vector_creation.personalization_vector_cache import PersonalizationVectorCache
+from biological_random_walks.core.page_rank_core import MATRIX_FREE_SOLVERS
+from biological_random_walks.core.alpha_free_core import AlphaFreeRandomWalkWithRestartCore
+from biological_random_walks.result_cache import ResultCache
+
+STAGES = ["load", "weight", "aggregate", "personalize", "solve", "evaluate"]
+
+# how each input of a run is loaded
+LOAD_KINDS = [
+	("ppi_file_path", "network"),
+	("co_expression_file_path", "network"),
+	("seed_file_path", "seed_set"),
+	("secondary_seed_file_path", "seed_set"),
+	("map__gene__ontologies_file_path", "gene_ontologies"),
+	("disease_ontology_file_path", "disease_ontology"),
+	]
+
+# the options, shared network store, vocabulary, loaded inputs and
+# personalization vectors of a worker process, kept across its jobs
+worker_state = None
+
+def init_worker(options, network_store_dir):
+
+	global worker_state
+
+	network_store = SharedNetworkStore(network_store_dir) if network_store_dir != None else None
+	vocabulary = network_store.get_vocabulary() if network_store != None else GeneVocabulary()
+
+	worker_state = (options, network_store, vocabulary, {}, PersonalizationVectorCache(cache_dir = options["cache_dir"]))
+
+def run_job(job):
+
+	# the runs of a job, scheduled in the worker: (their indices, their result keys)
+	indices, runs = job
+	options, network_store, vocabulary, loaded_inputs, personalization_vector_cache = worker_state
+
+	# files met by an earlier job of the worker (the PPI, the gene ontologies) are not loaded again
+	scheduler = StageScheduler(network_store = network_store, vocabulary = vocabulary, loaded_inputs = loaded_inputs,
+		personalization_vector_cache = personalization_vector_cache, evaluate = lambda index, run, key: key, **options)
+	scheduler.plan(runs)
+
+	return indices, scheduler.execute()
+
+
+class StageNode():
+
+	def __init__(self, stage, function, dependencies):
+
+		self.stage = stage
+		self.function = function
+		self.dependencies = dependencies
+
+		# evaluate nodes: the (index, result key) of the runs they finish
+		self.runs = []
+		self.result = None
+
+
+class StageScheduler():
+
+	""" The runs of an experiment (see expand_experiment_spec) as a DAG of
+	pipeline stages:
+
+		load -> weight -> aggregate -> personalize -> solve -> evaluate
+
+	A node is identified by its stage and everything its result depends
+	on, so identical nodes of different runs are planned once: one loaded
+	file, one weighted PPI per cancer, one normalized PPI/CO-expression
+	pair for all betas, one solve per beta for all alphas (a mix of the
+	per personalization vector solutions, started from those of the
+	nearest beta), one evaluation per alpha. Nodes
+	whose dependencies are done run in parallel on a thread pool (NumPy and
+	SciPy release the GIL in the heavy loops).
+
+	With processes > 1 the runs are grouped into jobs by group_keys (by
+	default the seed file, i.e. the runs of one cancer, which share its
+	networks, weights and personalization vectors) and the jobs are spread
+	over a process pool, largest first. Every worker schedules the stages
+	of its jobs as above, on workers threads, attached to the network
+	store. The plan of this scheduler then only gives the stage counts.
+
+	evaluate(index, run, key) is called for every run once its ranked list
+	is saved; key is its ResultCache key (None without result cache).
+	"""
+
+	def __init__(self,
+		restart_prob = 0.9,
+		solver = "power",
+		workers = None,
+		processes = None,
+		group_keys = ("seed_file_path",),
+		cache_dir = None,
+		network_store = None,
+		result_cache_dir = None,
+		vocabulary = None,
+		loaded_inputs = None,
+		personalization_vector_cache = None,
+		evaluate = None):
+
+		self.restart_prob = restart_prob
+		self.solver = solver
+		self.workers = workers
+		self.processes = processes
+		self.group_keys = group_keys
+		self.evaluate = evaluate
+
+		self.cache_dir = cache_dir
+		self.network_store = network_store
+		self.result_cache_dir = result_cache_dir
+		self.result_cache = ResultCache(result_cache_dir) if result_cache_dir != None else None
+
+		if vocabulary != None:
+			self.vocabulary = vocabulary
+		else:
+			self.vocabulary = network_store.get_vocabulary() if network_store != None else GeneVocabulary()
+
+		# parsed inputs by file (Loader.load_once), shared with later schedulers of the same vocabulary
+		self.loaded_inputs = loaded_inputs if loaded_inputs != None else {}
+
+		# the keys of BiologicalRandomWalks: main.py --cache and the batch share the disk entries
+		if personalization_vector_cache == None:
+			personalization_vector_cache = PersonalizationVectorCache(cache_dir = cache_dir)
+		self.personalization_vector_cache = personalization_vector_cache
+		self.personalization_vector_lock = threading.Lock()
+		# loads intern gene names in the shared vocabulary: one at a time
+		self.load_lock = threading.Lock()
+
+		self.nodes = {}
+		self.planned = collections.Counter()
+		# solve nodes by beta, for each set of networks and personalization vectors
+		self.solved_betas = {}
+		self.runs = []
+		self.evaluations = []
+
+
+	def add(self, stage, key, function, dependencies = ()):
+
+		self.planned[stage] += 1
+
+		if key not in self.nodes:
+			self.nodes[key] = StageNode(stage, function, list(dependencies))
+
+		return key
+
+	def get_loader(self, **file_paths):
+		return Loader(vocabulary = self.vocabulary, sparse_graphs = True, cache_dir = self.cache_dir, network_store = self.network_store, loaded_inputs = self.loaded_inputs, **file_paths)
+
+	def add_load(self, kind, file_path):
+
+		if kind == "network":
+			loader = self.get_loader()
+			load = lambda: loader.load_network(file_path)
+		elif kind == "seed_set":
+			loader = self.get_loader()
+			load = lambda: loader.load_seed_set(file_path)
+		elif kind == "gene_ontologies":
+			loader = self.get_loader(map_gene_ontologies_file_path = file_path)
+			load = loader.load_map__gene__ontologies
+		elif kind == "disease_ontology":
+			loader = self.get_loader(disease_ontology_file_path = file_path)
+			load = loader.load_disease_ontology
+
+		def locked_load():
+			with self.load_lock:
+				return loader.load_once(kind, file_path, load)
+
+		return self.add("load", ("load", kind, file_path), locked_load)
+
+
+	def plan(self, runs):
+
+		for run in runs:
+			self.plan_run(run)
+
+	def plan_run(self, run):
+
+		index = len(self.runs)
+		self.runs.append(run)
+		self.evaluations.append(None)
+
+		inputs = {key: run.get(key) for key in INPUT_KEYS}
+		matrix_aggregation_policy, personalization_vector_creation_policies, network_weight_flag = get_policies(inputs)
+
+		if self.result_cache != None:
+			file_paths, parameters = get_result_parameters(run, self.restart_prob, self.solver, None)
+			result_key = self.result_cache.key(file_paths, **parameters)
+
+			# a finished run is only evaluated again
+			if self.result_cache.load_ranked_list(result_key) != None:
+				evaluate = ("evaluate", "cached", result_key)
+				self.add("evaluate", evaluate, functools.partial(self.evaluate_cached, evaluate))
+				self.nodes[evaluate].runs.append((index, result_key))
+				return
+		else:
+			result_key = None
+
+		# every input file of the run, loaded once
+		loads = {key: self.add_load(kind, inputs[key]) for key, kind in LOAD_KINDS if inputs[key] != None}
+
+		# networks: the PPI weighted by the disease ontology, then aggregated
+		networks = [loads[key] for key in ["ppi_file_path", "co_expression_file_path"] if key in loads]
+
+		if network_weight_flag and "ppi_file_path" in loads:
+			dependencies = [loads["ppi_file_path"], loads["map__gene__ontologies_file_path"], loads["disease_ontology_file_path"]]
+			networks[0] = self.add("weight", ("weight",) + tuple(dependencies), self.weight, dependencies)
+
+		if matrix_aggregation_policy == "convex_combination":
+			graph = self.add("aggregate", ("aggregate",) + tuple(networks), BetaSweepAggregation, networks)
+		else:
+			graph = networks[0]
+
+		# personalization vectors, in the order of BiologicalRandomWalks
+		personalization_vectors = []
+
+		if "default" in personalization_vector_creation_policies:
+			dependencies = [graph, loads["seed_file_path"]]
+			file_paths = [inputs["seed_file_path"]]
+			personalization_vectors.append(self.add("personalize", ("personalize", "default") + tuple(dependencies), functools.partial(self.personalize, "default", file_paths, self.create_default), dependencies))
+
+		if "biological" in personalization_vector_creation_policies:
+			dependencies = [graph, loads["seed_file_path"], loads["map__gene__ontologies_file_path"], loads["disease_ontology_file_path"]]
+			file_paths = [inputs["seed_file_path"], inputs["disease_ontology_file_path"], inputs["map__gene__ontologies_file_path"]]
+			personalization_vectors.append(self.add("personalize", ("personalize", "biological") + tuple(dependencies), functools.partial(self.personalize, "biological", file_paths, self.create_biological), dependencies))
+
+		if "topological" in personalization_vector_creation_policies:
+			dependencies = [graph, loads["seed_file_path"], loads["secondary_seed_file_path"]]
+			file_paths = [inputs["seed_file_path"], inputs["secondary_seed_file_path"]]
+			personalization_vectors.append(self.add("personalize", ("personalize", "topological") + tuple(dependencies), functools.partial(self.personalize, "topological", file_paths, self.create_topological), dependencies))
+
+		# one solve per beta, every alpha is then a mix of its solutions
+		beta = run["beta"] if matrix_aggregation_policy == "convex_combination" else None
+		dependencies = [graph] + personalization_vectors
+		solve = ("solve", beta) + tuple(dependencies)
+
+		# an iterative solver starts from the solution of the nearest beta
+		# already planned on the same networks and personalization vectors
+		solved_betas = self.solved_betas.setdefault(tuple(dependencies), {})
+
+		if solve not in self.nodes and beta != None and self.solver != "direct" and len(solved_betas) > 0:
+			nearest = solved_betas[min(solved_betas, key = lambda solved_beta: abs(solved_beta - beta))]
+			self.add("solve", solve, functools.partial(self.solve_from, beta), [nearest] + dependencies)
+		else:
+			self.add("solve", solve, functools.partial(self.solve, beta), dependencies)
+
+		solved_betas[beta] = solve
+
+		evaluate = ("evaluate", run["alpha"], solve)
+		self.add("evaluate", evaluate, functools.partial(self.evaluate_solution, evaluate), [solve])
+		self.nodes[evaluate].runs.append((index, result_key))
+
+
+	def weight(self, PPI, map__gene__ontologies, disease_ontology):
+		return ComputePPIGraphWeight(PPI, map__gene__ontologies = map__gene__ontologies, disease_ontology = disease_ontology).compute_sparse_weight_on_graph()
+
+	def get_graph(self, graph):
+
+		# the structure of the convex combination does not depend on beta
+		return graph.get_graph(0.5) if isinstance(graph, BetaSweepAggregation) else graph
+
+	def personalize(self, policy, file_paths, create, graph, *inputs):
+
+		G = self.get_graph(graph)
+
+		# the vector only depends on the input files, on the nodes and (topological) on G
+		key = self.personalization_vector_cache.key(policy, file_paths, self.vocabulary.decode(G.nodes()), G if policy == "topological" else None)
+
+		with self.personalization_vector_lock:
+			personalization_vector = self.personalization_vector_cache.get(key)
+
+		if personalization_vector is None:
+			personalization_vector = create(G, *inputs).run_vector(G.nodes())
+
+			with self.personalization_vector_lock:
+				self.personalization_vector_cache.put(key, personalization_vector)
+
+		return personalization_vector
+
+	def create_default(self, G, seed_set):
+		return DefaultPersonalizationVectorCreation(seed_set, set(G.nodes()))
+
+	def create_biological(self, G, seed_set, map__gene__ontologies, disease_ontology):
+		return BiologicalPersonalizationVectorCreation(seed_set, set(G.nodes()), disease_ontology = disease_ontology, map__gene_name__ontologies = map__gene__ontologies)
+
+	def create_topological(self, G, seed_set, secondary_seed_set):
+		return TopologicalPersonalizationVectorCreation(seed_set, set(G.nodes()), G = G, secondary_seed_set = secondary_seed_set)
+
+	def solve(self, beta, graph, *personalization_vectors, initial_matrix = None):
+
+		if isinstance(graph, BetaSweepAggregation) and self.solver in MATRIX_FREE_SOLVERS:
+			# W applied as two matvecs, the aggregated matrix is never built
+			G, transition_matrix = self.get_graph(graph), graph.get_transition_operator(beta)
+		elif isinstance(graph, BetaSweepAggregation):
+			G, transition_matrix = graph.get_graph(beta), None
+		else:
+			G, transition_matrix = graph, None
+
+		core = AlphaFreeRandomWalkWithRestartCore(list(personalization_vectors), G, self.restart_prob, solver = self.solver, transition_matrix = transition_matrix, vocabulary = self.vocabulary)
+		core.get_stationary_vectors(initial_matrix)
+
+		return core
+
+	def solve_from(self, beta, nearest_core, graph, *personalization_vectors):
+		return self.solve(beta, graph, *personalization_vectors, initial_matrix = nearest_core.get_stationary_vectors())
+
+	def evaluate_solution(self, key, core):
+
+		alpha = key[1]
+		self.evaluate_runs(self.nodes[key].runs, [[self.vocabulary.name(node), score] for node, score in core.run(alpha)])
+
+	def evaluate_cached(self, key):
+		self.evaluate_runs(self.nodes[key].runs, self.result_cache.load_ranked_list(key[2]), cached = True)
+
+	def evaluate_runs(self, runs, ranked_list, cached = False):
+
+		for index, result_key in runs:
+			run = self.runs[index]
+
+			if self.result_cache != None and not cached:
+				self.result_cache.save_ranked_list(result_key, ranked_list)
+
+			if run.get("output_file_path") != None:
+				self.save_ranked_list(run["output_file_path"], ranked_list)
+
+			if self.evaluate != None:
+				self.evaluations[index] = self.evaluate(index, run, result_key)
+
+	def save_ranked_list(self, file_path, ranked_list):
+
+		# the format of BiologicalRandomWalks.save_ranked_list
+		with open(file_path, 'w', newline = "") as fp:
+			csv_writer = csv.writer(fp, delimiter = "\t")
+			csv_writer.writerow(["GeneNames","Score"])
+			csv_writer.writerows(ranked_list)
+
+
+	def get_stage_counts(self,):
+
+		# {stage: (planned, deduplicated)}
+		deduplicated = collections.Counter(node.stage for node in self.nodes.values())
+		return {stage: (self.planned[stage], deduplicated[stage]) for stage in STAGES}
+
+	def print_stage_counts(self,):
+
+		print("Stage", "Planned", "Deduplicated", sep = "\t")
+		for stage, (planned, deduplicated) in self.get_stage_counts().items():
+			print(stage, planned, deduplicated, sep = "\t")
+
+		print("total", sum(self.planned.values()), len(self.nodes), sep = "\t")
+
+
+	def execute(self,):
+
+		""" Runs every node once its dependencies are done and returns the
+		evaluation of every run, in the order of the runs.
+		"""
+
+		if self.processes != None and self.processes > 1:
+			return self.execute_jobs()
+
+		t0 = time.perf_counter()
+
+		waiting = {key: set(node.dependencies) for key, node in self.nodes.items()}
+		dependents = collections.defaultdict(list)
+
+		for key, node in self.nodes.items():
+			for dependency in node.dependencies:
+				dependents[dependency].append(key)
+
+		ready = [key for key, dependencies in waiting.items() if len(dependencies) == 0]
+		running = {}
+
+		with concurrent.futures.ThreadPoolExecutor(self.workers) as pool:
+
+			while len(ready) > 0 or len(running) > 0:
+
+				for key in ready:
+					running[pool.submit(self.__run_node__, key)] = key
+				ready = []
+
+				done, _ = concurrent.futures.wait(running, return_when = concurrent.futures.FIRST_COMPLETED)
+
+				for future in done:
+					key = running.pop(future)
+					# a failed node stops the whole experiment
+					future.result()
+
+					for dependent in dependents[key]:
+						waiting[dependent].discard(key)
+
+						if len(waiting[dependent]) == 0:
+							ready.append(dependent)
+
+		print("Stages executed:", len(self.nodes), "in", time.perf_counter() - t0)
+
+		return self.evaluations
+
+	def __run_node__(self, key):
+
+		node = self.nodes[key]
+		node.result = node.function(*[self.nodes[dependency].result for dependency in node.dependencies])
+
+
+	def get_jobs(self,):
+
+		map__group__indices = {}
+		for index, run in enumerate(self.runs):
+			map__group__indices.setdefault(tuple(run.get(key) for key in self.group_keys), []).append(index)
+
+		# the largest groups first
+		groups = sorted(map__group__indices.values(), key = len, reverse = True)
+
+		return [(indices, [self.runs[index] for index in indices]) for indices in groups]
+
+	def execute_jobs(self,):
+
+		t0 = time.perf_counter()
+
+		jobs = self.get_jobs()
+		result_keys = [None] * len(self.runs)
+
+		print("Sweep:", len(self.runs), "runs in", len(jobs), "jobs on", self.processes, "processes")
+
+		options = {
+			"restart_prob": self.restart_prob,
+			"solver": self.solver,
+			"workers": self.workers,
+			"cache_dir": self.cache_dir,
+			"result_cache_dir": self.result_cache_dir,
+			}
+		network_store_dir = self.network_store.store_dir if self.network_store != None else None
+
+		with concurrent.futures.ProcessPoolExecutor(self.processes, initializer = init_worker, initargs = (options, network_store_dir)) as pool:
+
+			for future in concurrent.futures.as_completed([pool.submit(run_job, job) for job in jobs]):
+				indices, keys = future.result()
+
+				for index, key in zip(indices, keys):
+					result_keys[index] = key
+
+		# the outputs are saved by the workers: evaluated here, in the order of the runs
+		if self.evaluate != None:
+			for index, run in enumerate(self.runs):
+				self.evaluations[index] = self.evaluate(index, run, result_keys[index])
+
+		print("Sweep time:", time.perf_counter() - t0)
+
+		return self.evaluations
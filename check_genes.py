@@ -3,42 +3,72 @@
 """
 check_genes.py – chuyển ENSG→Symbol và kiểm tra gene có trong OncoKB (DrugTarget = Yes)
 – chấp nhận cả cột Gene Aliases.
+
+Các hàm dùng được trực tiếp (run_brw_batch.py): OncoKB chỉ đọc một lần,
+ENSG→Symbol chỉ tra các ID chưa gặp, trước hết trong chỉ mục offline
+dựng từ file BioMart (data_set/ppi_network/mart_biotool.txt).
 """
 
-import pandas as pd, mygene, argparse, re
-
-# ---------- 1. Tham số dòng lệnh ----------
-parser = argparse.ArgumentParser(description="Check OncoKB (Hugo Symbol + Aliases)")
-parser.add_argument('--input',  required=True, help='File .txt kết quả BRW')
-parser.add_argument('--oncokb', required=True, help='File Excel OncoKB (có cột Gene Aliases)')
-parser.add_argument('--output', default='top100_checked.tsv', help='File TSV đầu ra')
-args = parser.parse_args()
-
-# ---------- 2. Đọc Top-100 ENSG ----------
-df_res = (pd.read_csv(args.input, sep='\t', nrows=100)
-            .rename(columns={'GeneNames': 'Ensembl_ID'}))
-
-# ---------- 3. Tra cứu ENSG → Symbol ----------
-mg = mygene.MyGeneInfo()
-map_df = (pd.DataFrame(
-            mg.querymany(df_res['Ensembl_ID'].tolist(),
-                         scopes='ensembl.gene',
-                         fields='symbol',
-                         species='human'))
-          .rename(columns={'query':  'Ensembl_ID',
-                           'symbol': 'Symbol'})
-          .dropna(subset=['Symbol']))
-
-# ---------- 4. Đọc OncoKB (chỉ Drug target = Yes) ----------
-okb = (pd.read_excel(args.oncokb,
-                     usecols=['Hugo Symbol', 'Cancer Drug target gene', 'Gene Aliases'])
-         .rename(columns={'Hugo Symbol': 'Symbol',
-                          'Cancer Drug target gene': 'DrugTarget',
-                          'Gene Aliases': 'Aliases'}))
-
-okb_yes = okb[okb['DrugTarget'].astype(str).str.strip().str.lower() == 'yes']
-
-# ---------- 5. Tạo tập hợp Symbol + Alias ----------
+import pandas as pd, argparse, re, json, os
+from pathlib import Path
+
+from biological_random_walks.loader.gene_symbol_index import GeneSymbolIndex
+
+# ---------- 1. Đọc Top-100 ENSG ----------
+def read_top_genes(input_path, n=100):
+    return (pd.read_csv(input_path, sep='\t', nrows=n)
+              .rename(columns={'GeneNames': 'Ensembl_ID'}))
+
+# ---------- 2. Tra cứu ENSG → Symbol ----------
+# Tra trước trong chỉ mục offline (GeneSymbolIndex, từ file BioMart, một
+# Symbol chính cho mỗi ID); các ID không có tên trong chỉ mục mới hỏi
+# mygene, trừ khi remote=False.
+# symbols: dict ENSG → [Symbol, ...] dùng chung giữa các lần gọi
+MAPPING = Path(__file__).resolve().parent / 'data_set/ppi_network/mart_biotool.txt'
+
+def load_symbol_index(mapping_path=MAPPING, cache_dir=None):
+    if not Path(mapping_path).exists():
+        return None
+    return GeneSymbolIndex(str(mapping_path), cache_dir=cache_dir)
+
+def map_ensembl_to_symbol(ensembl_ids, symbols=None, index=None, remote=True):
+    if symbols is None:
+        symbols = {}
+
+    missing = [e for e in dict.fromkeys(ensembl_ids) if e not in symbols]
+    if missing and index is not None:
+        symbols.update(index.lookup(missing))
+        missing = [e for e in missing if e not in symbols]
+
+    if missing:
+        for e in missing:
+            symbols[e] = []
+        if remote:
+            import mygene
+            mg = mygene.MyGeneInfo()
+            for hit in mg.querymany(missing, scopes='ensembl.gene', fields='symbol', species='human'):
+                if pd.notna(hit.get('symbol')):
+                    symbols[hit['query']].append(hit['symbol'])
+
+    return pd.DataFrame([(e, s) for e in dict.fromkeys(ensembl_ids) for s in symbols[e]],
+                        columns=['Ensembl_ID', 'Symbol'])
+
+# kết quả tra cứu lưu ra JSON để dùng lại giữa các lần chạy; chỉ lưu các
+# ID đã có Symbol, ID chưa tìm thấy (offline, hay mygene chưa có) được tra
+# lại ở lần chạy sau
+def load_symbol_cache(cache_path):
+    if not Path(cache_path).exists():
+        return {}
+    with open(cache_path) as f:
+        return {e: s for e, s in json.load(f).items() if s}
+
+def save_symbol_cache(cache_path, symbols):
+    tmp_path = f'{cache_path}.tmp-{os.getpid()}'
+    with open(tmp_path, 'w') as f:
+        json.dump({e: s for e, s in symbols.items() if s}, f)
+    os.replace(tmp_path, cache_path)
+
+# ---------- 3. Đọc OncoKB (chỉ Drug target = Yes) ----------
 def explode_names(row):
     names = {str(row['Symbol']).strip()}
     if pd.notna(row['Aliases']):
@@ -47,20 +77,59 @@ def explode_names(row):
         names.update([p.strip() for p in parts if p.strip()])
     return names
 
-symbol_set = set()
-okb_yes.apply(lambda r: symbol_set.update(explode_names(r)), axis=1)
+def load_oncokb_symbols(oncokb_path):
+    okb = (pd.read_excel(oncokb_path,
+                         usecols=['Hugo Symbol', 'Cancer Drug target gene', 'Gene Aliases'])
+             .rename(columns={'Hugo Symbol': 'Symbol',
+                              'Cancer Drug target gene': 'DrugTarget',
+                              'Gene Aliases': 'Aliases'}))
+
+    okb_yes = okb[okb['DrugTarget'].astype(str).str.strip().str.lower() == 'yes']
+
+    # tập hợp Symbol + Alias
+    symbol_set = set()
+    okb_yes.apply(lambda r: symbol_set.update(explode_names(r)), axis=1)
+    return symbol_set
+
+# ---------- 4. Gắn cờ ----------
+# aliases: dict ENSG → [Alias, ...] của file mapping, chỉ dùng để so với OncoKB
+def check_genes(df_res, map_df, symbol_set, aliases=None):
+    aliases = aliases or {}
+
+    def in_oncokb(row):
+        names = ([row['Symbol'].strip()] if pd.notna(row['Symbol']) else []) + aliases.get(row['Ensembl_ID'], [])
+        return 'Yes' if any(n in symbol_set for n in names) else 'No'
+
+    return (df_res.merge(map_df, on='Ensembl_ID', how='left')
+                  .assign(In_OncoKB=lambda d: d.apply(in_oncokb, axis=1))
+                  .loc[:, ['Ensembl_ID', 'Symbol', 'Score', 'In_OncoKB']])
+
+# kiểm tra một file kết quả, lưu TSV và trả về số gene khớp; mặc định chỉ
+# so Symbol chính với OncoKB như bản gốc, match_aliases=True so thêm các
+# alias của file mapping (số gene khớp khi đó có thể cao hơn)
+def check_file(input_path, output_path, symbol_set, symbols=None, index=None, remote=True, match_aliases=False):
+    df_res = read_top_genes(input_path)
+    ids = df_res['Ensembl_ID'].tolist()
+    aliases = index.lookup_aliases(ids) if index is not None and match_aliases else None
+    out = check_genes(df_res, map_ensembl_to_symbol(ids, symbols, index, remote), symbol_set, aliases)
+    out.to_csv(output_path, sep='\t', index=False)
+    return out, (out['In_OncoKB'] == 'Yes').sum()
 
-# ---------- 6. Gắn cờ & lưu ----------
-out = (df_res.merge(map_df, on='Ensembl_ID', how='left')
-              .assign(In_OncoKB=lambda d:
-                      d['Symbol'].apply(lambda s:
-                          'Yes' if pd.notna(s) and s.strip() in symbol_set else 'No'))
-              .loc[:, ['Ensembl_ID', 'Symbol', 'Score', 'In_OncoKB']])
+# ---------- 5. Dòng lệnh ----------
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check OncoKB (Hugo Symbol + Aliases)")
+    parser.add_argument('--input',  required=True, help='File .txt kết quả BRW')
+    parser.add_argument('--oncokb', required=True, help='File Excel OncoKB (có cột Gene Aliases)')
+    parser.add_argument('--output', default='top100_checked.tsv', help='File TSV đầu ra')
+    parser.add_argument('--mapping', default=str(MAPPING), help='File ENSG→Symbol (BioMart) cho tra cứu offline')
+    parser.add_argument('--offline', action='store_true', help='Không hỏi mygene cho các ID ngoài file mapping')
+    parser.add_argument('--aliases', action='store_true', help='So thêm các alias của file mapping với OncoKB (khác cách đếm gốc chỉ dùng Symbol chính)')
+    args = parser.parse_args()
 
-out.to_csv(args.output, sep='\t', index=False)
-print(out.head(10))
+    out, hits = check_file(args.input, args.output, load_oncokb_symbols(args.oncokb),
+                           index=load_symbol_index(args.mapping), remote=not args.offline, match_aliases=args.aliases)
+    print(out.head(10))
 
-# ---------- 7. Thống kê ----------
-hits = (out['In_OncoKB'] == 'Yes').sum()
-print(f'✅ Có {hits} / 100 gene khớp OncoKB')
-print(f'📄 Kết quả lưu tại: {args.output}')
+    # ---------- 6. Thống kê ----------
+    print(f'✅ Có {hits} / 100 gene khớp OncoKB')
+    print(f'📄 Kết quả lưu tại: {args.output}')
@@ -1,4 +1,6 @@
 from biological_random_walks.BiologicalRandomWalks import BiologicalRandomWalks
+from biological_random_walks.core.page_rank_core import SOLVERS
+from biological_random_walks.loader.shared_network_store import SharedNetworkStore
 import os
 import argparse
 
@@ -17,12 +19,23 @@ if __name__ == '__main__':
 	parser.add_argument('-do',default = None)
 	parser.add_argument('-a',default = None)
 
-	parser.add_argument('-o',default = None)
+	parser.add_argument('-o',default = None, nargs = "+")
+	parser.add_argument('-i',default = None)
+	parser.add_argument('-k',default = None)
 	
 	parser.add_argument('-r',default = 0.9)
-	parser.add_argument('-x',default = 0.5)
+	parser.add_argument('-x',default = [0.5], nargs = "+")
 	parser.add_argument('-y',default = 0.5)
 
+	# direct factorizes the matrix once: only worth it for many -x on one -y
+	parser.add_argument('--solver',default = "power", choices = SOLVERS + ["push"])
+	parser.add_argument('--sparse',action = "store_true")
+	parser.add_argument('--cache',default = None)
+	parser.add_argument('--store',default = None)
+
+	parser.add_argument('-l',default = [], nargs = "*")
+	parser.add_argument('-w',default = None, nargs = "*")
+
 
 	args = parser.parse_args()
 	personalization_vector_creation_policies = []
@@ -55,6 +68,18 @@ if __name__ == '__main__':
 	else:
 		matrix_aggregation_policy = "only_co_expression_network"
 
+	layer_weights = None
+
+	if len(args.l) > 0:
+		matrix_aggregation_policy = "multiplex"
+		number_of_layers = int(args.p is not None) + int(args.c is not None) + len(args.l)
+
+		if args.w is not None:
+			layer_weights = [float(w) for w in args.w]
+		else:
+			# -y for the first network, the rest shared equally by the others
+			layer_weights = [float(args.y)] + [(1 - float(args.y)) / (number_of_layers - 1)] * (number_of_layers - 1)
+
 
 	if args.s is not None:
 		seed_file_path = args.s
@@ -79,7 +104,9 @@ if __name__ == '__main__':
 		ontologies_path = None
 		disease_ontology_path = None
 	
-	if args.o is not None:
+	if args.o is not None and len(args.o) == 1:
+		output_file_path = args.o[0]
+	elif args.o is not None:
 		output_file_path = args.o
 	else:
 		output_file_path = None
@@ -91,7 +118,15 @@ if __name__ == '__main__':
 
 	r = float(args.r)
 	
-	alpha = float(args.x)
+	alphas = [float(x) for x in args.x]
+	alpha = alphas[0]
+
+	# several alphas: the walk is solved once per personalization vector
+	if len(alphas) > 1:
+		if output_file_path is not None and type(output_file_path) != list:
+			output_file_path = [output_file_path]
+	else:
+		alphas = None
 	beta = float(args.y)
 
 
@@ -119,5 +154,17 @@ if __name__ == '__main__':
 
 		network_weight_flag = network_weight_flag,
 
-		output_file_path = output_file_path
+		output_file_path = output_file_path,
+
+		solver = args.solver,
+		initial_vector_file_path = args.i,
+		top_k = int(args.k) if args.k is not None else None,
+		sparse_graphs = args.sparse,
+		cache_dir = args.cache,
+		network_store = SharedNetworkStore(args.store) if args.store is not None else None,
+
+		layer_file_paths = args.l,
+		layer_weights = layer_weights,
+
+		alphas = alphas
 	)
@@ -1,85 +1,142 @@
-import subprocess, pathlib, csv
+import pathlib, csv, os, sys, shutil, tempfile
+
 import pandas as pd
 
-# ------- 1. Thư mục dữ liệu và đầu ra -------
-DATA = pathlib.Path("data_set")
-OUT  = pathlib.Path("outputs")
+import check_genes
+from biological_random_walks.experiment_spec import load_experiment_spec, expand_experiment_spec
+from biological_random_walks.stage_scheduler import StageScheduler
+from biological_random_walks.loader.network_cache import get_file_hash
+from biological_random_walks.loader.shared_network_store import SharedNetworkStore
+
+# ------- 1. Đặc tả thí nghiệm -------
+# Cancer, ablation, lưới alpha-beta và đường dẫn dữ liệu nằm trong file
+# đặc tả (JSON hoặc YAML); mặc định experiments/brw_batch.json.
+SPEC = sys.argv[1] if len(sys.argv) > 1 else "experiments/brw_batch.json"
+spec = load_experiment_spec(SPEC)
+
+# ------- 2. Thư mục dữ liệu và đầu ra -------
+DATA = pathlib.Path(spec["data_dir"])
+OUT  = pathlib.Path(spec["output_dir"])
 OUT.mkdir(exist_ok=True)
-
-PPI   = DATA / "ppi_network/HIPPIE.tsv"
-ONTO  = DATA / "ontology/ontology_graph.txt"
-ONCOKB = pathlib.Path("Dataset OncoKB.xlsx")
-
-# ------- 2. Danh sách các loại cancer -------
-CANCERS = ["BRCA", "COAD", "LUAD", "THCA", "BLCA", "PRAD", "STAD"]
-
-# ------- 3. Danh sách ablation -------
-ablations = {
-    "FULL"      : dict(use_c=True, use_de=True, use_onto=True),
-    "noCOEXP"   : dict(use_c=False, use_de=True, use_onto=True),
-    "noDE"      : dict(use_c=True,  use_de=False, use_onto=True),
-    "noONTO"    : dict(use_c=True,  use_de=True, use_onto=False),
-    "PPI_only"  : dict(use_c=False, use_de=False, use_onto=False),
-}
-
-# ------- 4. Lưới alpha-beta -------
-alpha_beta_grid = [
-    (1.0, 1.0), (0.0, 0.0), (1.0, 0.0), (0.0, 1.0), (0.5, 0.5),
-    (0.75, 0.25), (0.25, 0.75), (0.8, 0.2), (0.2, 0.8), (0.25, 0.25)
-]
-
-# ------- 5. Hàm chạy một lần -------
-def run_once(cancer, tag, alpha, beta, cfg):
-    OUT_CANCER = OUT / cancer
-    OUT_CANCER.mkdir(exist_ok=True)
-
-    out_txt = OUT_CANCER / f"results_{tag}.txt"
-    out_tsv = OUT_CANCER / f"top100_{tag}.tsv"
-
-    SEED  = DATA / f"seed_set/TCGA-{cancer}_seed.txt"
-    DE    = DATA / f"differentially_expressed_genes/TCGA-{cancer}_de_genes.tsv"
-    COEXP = DATA / f"co-expression_networks/TCGA-{cancer}__co_expression__t_70%.tsv"
-    DISO  = DATA / f"disease_specific_ontologies/TCGA-{cancer}_disease_ontologies.txt"
-
-    cmd = ["python", "main.py",
-           "-p", str(PPI), "-s", str(SEED),
-           "-x", str(alpha), "-y", str(beta), "-r", "0.9",
-           "-o", str(out_txt)]
-
-    if cfg["use_c"]:   cmd += ["-c", str(COEXP)]
-    if cfg["use_de"]:  cmd += ["-de", str(DE)]
-    if cfg["use_onto"]: cmd += ["-a", str(ONTO), "-do", str(DISO)]
-
-    subprocess.run(cmd, check=True)
-
-    subprocess.run([
-        "python", "check_genes.py",
-        "--input", str(out_txt),
-        "--oncokb", str(ONCOKB),
-        "--output", str(out_tsv)
-    ], check=True)
-
-    df = pd.read_csv(out_tsv, sep="\t")
-    return (df["In_OncoKB"] == "Yes").sum()
-
-# ------- 6. Chạy toàn bộ -------
-summary = []
-
-for cancer in CANCERS:
-    print(f"\n🧬 Cancer: {cancer}")
-    for name, cfg in ablations.items():
-        hits = run_once(cancer, name, 0.5, 0.5, cfg)
-        summary.append(("ABL", cancer, name, 0.5, 0.5, hits))
-
-    for (a, b) in alpha_beta_grid:
-        tag = f"FULL_A{a}_B{b}"
-        hits = run_once(cancer, tag, a, b, ablations["FULL"])
-        summary.append(("Tuning(alpha,beta)", cancer, tag, a, b, hits))
-
-# ------- 7. Lưu tổng kết -------
-with open(OUT/"summary.csv","w",newline="") as f:
-    w = csv.writer(f)
-    w.writerow(["Type", "Cancer", "Tag", "Alpha", "Beta", "OncoKB_hits"])
-    w.writerows(summary)
-
-print("\n✅ Hoàn tất. Xem thư mục outputs/<Cancer>/ và outputs/summary.csv")
\ No newline at end of file
+CACHE = OUT / ".cache"   # mạng và ontology đã parse, dùng lại giữa các lần chạy
+RESULTS = OUT / ".results"  # ranked list và đánh giá của các lần chạy đã xong
+STORE_ROOT = pathlib.Path("/dev/shm") if pathlib.Path("/dev/shm").is_dir() else OUT   # kho dùng chung, mỗi lần chạy một thư mục riêng
+
+PPI   = DATA / spec["ppi"]
+ONTO  = DATA / spec["ontology"]
+ONCOKB = pathlib.Path(spec["oncokb"])
+GENE_SYMBOLS = DATA / spec["gene_symbols"] if spec.get("gene_symbols") else None
+REMOTE = spec.get("remote_gene_symbols", True)   # hỏi mygene cho ID ngoài GENE_SYMBOLS
+ALIASES = spec.get("match_gene_aliases", False)  # so thêm alias của GENE_SYMBOLS với OncoKB
+
+# số tiến trình song song (mặc định: một tiến trình cho mỗi cancer, tối
+# đa số lõi) và số luồng của mỗi tiến trình (mặc định: chia đều các lõi)
+PROCESSES = int(os.environ.get("BRW_PROCESSES", min(len(spec["cancers"]), os.cpu_count())))
+WORKERS = int(os.environ.get("BRW_WORKERS", max(1, os.cpu_count() // PROCESSES)))
+
+# ------- 3. Kiểm tra OncoKB -------
+# File OncoKB chỉ đọc một lần; ENSG→Symbol tra trong chỉ mục offline,
+# ID không có trong đó mới hỏi mygene và được lưu lại giữa các lần chạy.
+# Số gene khớp và bảng top-100 đã kiểm tra được lưu cùng kết quả, theo
+# khóa của lần chạy và nội dung file OncoKB: chạy lại chỉ kiểm tra những
+# lần chạy chưa có, file top100_<tag>.tsv của mọi lần chạy được ghi lại từ
+# bảng đã lưu (kể cả các tag trùng khóa, hay khi thư mục đầu ra bị xóa).
+oncokb_symbols = None
+ensembl_symbols = {}
+symbol_index = None
+
+# tên đánh giá đổi theo nội dung file OncoKB và file mapping, theo việc có
+# hỏi mygene và so alias hay không, và theo CHECK_VERSION khi cách đếm hay dạng lưu thay đổi
+CHECK_VERSION = 4
+
+def evaluation_name():
+    name = f"OncoKB_hits-{CHECK_VERSION}-" + get_file_hash(ONCOKB)
+    if GENE_SYMBOLS is not None and GENE_SYMBOLS.exists():
+        name += "-" + get_file_hash(GENE_SYMBOLS)
+    if not REMOTE:
+        name += "-offline"
+    if ALIASES:
+        name += "-aliases"
+    return name
+
+def check_run(results, run, tag, key):
+    global oncokb_symbols
+    name = evaluation_name()
+    out_tsv = pathlib.Path(run["output_file_path"]).parent / f"top100_{tag}.tsv"
+
+    evaluation = results.load_evaluation(key, name)
+    if evaluation is None:
+        if oncokb_symbols is None:
+            oncokb_symbols = check_genes.load_oncokb_symbols(ONCOKB)
+
+        out, hits = check_genes.check_file(run["output_file_path"], out_tsv, oncokb_symbols, ensembl_symbols, symbol_index, REMOTE, ALIASES)
+        evaluation = {"hits": int(hits), "top100": out.astype(object).where(out.notna(), None).values.tolist()}
+        results.save_evaluation(key, name, evaluation)
+    else:
+        pd.DataFrame(evaluation["top100"], columns=["Ensembl_ID", "Symbol", "Score", "In_OncoKB"]).to_csv(out_tsv, sep="\t", index=False)
+
+    return evaluation["hits"]
+
+# ------- 4. Chạy toàn bộ -------
+# Các lần chạy được tách thành các bước (nạp, trọng số, gộp mạng, vector
+# cá nhân hóa, giải RWR, đánh giá); bước giống nhau giữa các lần chạy chỉ
+# chạy một lần, các bước độc lập chạy song song. Các lần chạy của một
+# cancer được gom thành một job cho cùng một tiến trình; PPI, các mạng đồng
+# biểu hiện và ontology được nạp một lần vào kho dùng chung (mmap) mà mọi
+# tiến trình cùng đọc.
+if __name__ == "__main__":
+    points = expand_experiment_spec(spec)
+    for cancer in spec["cancers"]:
+        (OUT / cancer).mkdir(exist_ok=True)
+
+    coexp_files = [DATA / spec["co_expression"].format(cancer=c) for c in spec["cancers"]]
+
+    # kho riêng của lần chạy này: không đụng tới kho của một lần chạy song
+    # song khác, và được xóa khi xong (kể cả khi lỗi) để không chiếm RAM.
+    # Chỉ dựng khi có nhiều tiến trình; một tiến trình nạp thẳng qua CACHE.
+    STORE = tempfile.mkdtemp(prefix="brw_store-", dir=STORE_ROOT) if PROCESSES > 1 else None
+    try:
+        if STORE is not None:
+            store = SharedNetworkStore.create(STORE,
+                graph_file_paths=[PPI] + [f for f in coexp_files if f.exists()],
+                map_gene_ontologies_file_path=ONTO if ONTO.exists() else None,
+                cache_dir=CACHE)
+        else:
+            store = None
+
+        # chỉ các lần chạy chưa có trong RESULTS được tính lại
+        scheduler = StageScheduler(restart_prob=spec["restart_prob"], solver=spec.get("solver", "power"), workers=WORKERS, processes=PROCESSES,
+            cache_dir=str(CACHE), network_store=store, result_cache_dir=str(RESULTS),
+            evaluate=lambda index, run, key: key)
+        scheduler.plan([p["run"] for p in points])
+        scheduler.print_stage_counts()
+        keys = scheduler.execute()
+    finally:
+        if STORE is not None:
+            shutil.rmtree(STORE, ignore_errors=True)
+    results = scheduler.result_cache
+
+    # tra ENSG→Symbol một lần cho mọi gene của các top-100 chưa đánh giá
+    if GENE_SYMBOLS is not None:
+        symbol_index = check_genes.load_symbol_index(GENE_SYMBOLS, cache_dir=str(CACHE))
+    ensembl_symbols.update(check_genes.load_symbol_cache(CACHE / "ensembl_symbols.json"))
+
+    name = evaluation_name()
+    check_genes.map_ensembl_to_symbol([g for p, key in zip(points, keys) if results.load_evaluation(key, name) is None
+        for g in check_genes.read_top_genes(p["run"]["output_file_path"])["Ensembl_ID"]], ensembl_symbols, symbol_index, REMOTE)
+    # chỉ lưu kết quả của mygene, phần còn lại đã có trong chỉ mục
+    offline = symbol_index.lookup(ensembl_symbols) if symbol_index is not None else {}
+    check_genes.save_symbol_cache(CACHE / "ensembl_symbols.json", {e: s for e, s in ensembl_symbols.items() if e not in offline})
+
+    # tổng kết dựng lại từ cache, theo thứ tự của đặc tả
+    summary = []
+    for p, key in zip(points, keys):
+        summary.append((p["type"], p["cancer"], p["tag"], p["alpha"], p["beta"], check_run(results, p["run"], p["tag"], key)))
+
+    # ------- 5. Lưu tổng kết -------
+    with open(OUT/"summary.csv","w",newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["Type", "Cancer", "Tag", "Alpha", "Beta", "OncoKB_hits"])
+        w.writerows(summary)
+
+    print("\n✅ Hoàn tất. Xem thư mục outputs/<Cancer>/ và outputs/summary.csv")
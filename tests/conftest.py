@@ -0,0 +1,64 @@
+import csv
+import random
+
+import pytest
+
+
+def write_tsv(file_path, header, rows):
+
+	with open(file_path, 'w') as fp:
+		if header != None:
+			fp.write("\t".join(header) + "\n")
+		for row in rows:
+			fp.write("\t".join(map(str, row)) + "\n")
+
+	return str(file_path)
+
+@pytest.fixture
+def dataset(tmp_path):
+
+	""" A small cancer in the data_set/ formats: PPI, co-expression network,
+	seed set, DE genes, gene ontologies and disease ontology.
+	"""
+
+	rng = random.Random(0)
+	genes = ["ENSG%011d" % i for i in range(80)]
+
+	ppi = {(u, v) for u, v in zip(genes, genes[1:] + genes[:1])}
+	while len(ppi) < 200:
+		ppi.add(tuple(rng.sample(genes, 2)))
+
+	co_expression = set()
+	while len(co_expression) < 150:
+		co_expression.add(tuple(rng.sample(genes[:60], 2)))
+
+	terms = [("T%d" % i, "Reactome" if i % 2 == 0 else "GO") for i in range(12)]
+	ontology = [(gene, term, db) for gene in genes for term, db in rng.sample(terms, rng.randint(1, 3))]
+
+	return {
+		"ppi_file_path": write_tsv(tmp_path / "ppi.tsv", ["u", "v"], sorted(ppi)),
+		"co_expression_file_path": write_tsv(tmp_path / "co_expression.tsv", ["u", "v", "score"], [(u, v, round(rng.uniform(0.7, 1.0), 6)) for u, v in sorted(co_expression)]),
+		"seed_file_path": write_tsv(tmp_path / "seed.txt", None, [(gene,) for gene in genes[3:8]]),
+		"secondary_seed_file_path": write_tsv(tmp_path / "de_genes.tsv", None, [(gene, 10.0 ** -(20 - i)) for i, gene in enumerate(genes[20:30])]),
+		"map__gene__ontologies_file_path": write_tsv(tmp_path / "ontology.txt", ["gene", "term", "db"], ontology),
+		"disease_ontology_file_path": write_tsv(tmp_path / "disease_ontology.txt", ["Term_ID", "DB"], [terms[0], terms[1], terms[4]]),
+		}
+
+@pytest.fixture
+def reference_ontologies(dataset):
+
+	""" The gene ontologies (gene -> DB -> terms) and the disease ontology
+	(DB -> terms) as the dicts the original loader built, by gene name.
+	"""
+
+	map__gene__ontologies = {}
+	with open(dataset["map__gene__ontologies_file_path"], 'r') as fp:
+		for row in list(csv.reader(fp, delimiter = "\t"))[1:]:
+			map__gene__ontologies.setdefault(row[0], {}).setdefault(row[2], set()).add(row[1])
+
+	disease_ontology = {}
+	with open(dataset["disease_ontology_file_path"], 'r') as fp:
+		for row in list(csv.reader(fp, delimiter = "\t"))[1:]:
+			disease_ontology.setdefault(row[1], set()).add(row[0])
+
+	return map__gene__ontologies, disease_ontology
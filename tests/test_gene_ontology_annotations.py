@@ -0,0 +1,66 @@
+import numpy as np
+
+from biological_random_walks.loader.loader import Loader
+from biological_random_walks.loader.gene_vocabulary import GeneVocabulary
+from biological_random_walks.loader.gene_ontology_annotations import GeneOntologyAnnotations
+
+
+def load_annotations(dataset):
+
+	loader = Loader(map_gene_ontologies_file_path = dataset["map__gene__ontologies_file_path"])
+	return loader.load_map__gene__ontologies(), loader.vocabulary
+
+def disease_terms_of(gene, db, map__gene__ontologies, disease_ontology):
+	return disease_ontology[db].intersection(map__gene__ontologies.get(gene, {}).get(db, set()))
+
+
+def test_annotations_read_like_the_dicts(dataset, reference_ontologies):
+
+	annotations, vocabulary = load_annotations(dataset)
+	map__gene__ontologies, _ = reference_ontologies
+
+	assert len(annotations) == len(map__gene__ontologies)
+	assert {vocabulary.name(gene): terms for gene, terms in annotations.items()} == map__gene__ontologies
+
+	# and so does a copy rebuilt from its arrays in another vocabulary
+	other_vocabulary = GeneVocabulary(["ENSG_OTHER"])
+	copy = GeneOntologyAnnotations.from_arrays(annotations.to_arrays(vocabulary), other_vocabulary)
+	assert {other_vocabulary.name(gene): terms for gene, terms in copy.items()} == map__gene__ontologies
+
+def test_disease_term_counts_match_set_intersections(dataset, reference_ontologies):
+
+	annotations, vocabulary = load_annotations(dataset)
+	map__gene__ontologies, disease_ontology = reference_ontologies
+
+	# an unannotated gene counts nothing
+	names = sorted(map__gene__ontologies) + ["ENSG_UNANNOTATED"]
+	genes = [vocabulary.add(name) for name in names]
+
+	counts = annotations.count_disease_terms(genes, disease_ontology)
+	for db in disease_ontology:
+		assert counts[db].tolist() == [len(disease_terms_of(name, db, map__gene__ontologies, disease_ontology)) for name in names]
+
+	pairs = list(zip(names, names[1:] + names[:1]))
+	shared = annotations.count_shared_disease_terms(genes, genes[1:] + genes[:1], disease_ontology)
+	for db in disease_ontology:
+		assert shared[db].tolist() == [len(disease_terms_of(u, db, map__gene__ontologies, disease_ontology) & disease_terms_of(v, db, map__gene__ontologies, disease_ontology)) for u, v in pairs]
+
+	# the incidence gives the relevance of the biological personalization vector
+	incidence_matrix, term_weights = annotations.get_disease_incidence(genes, disease_ontology)
+	relevance = [sum(len(disease_terms_of(name, db, map__gene__ontologies, disease_ontology)) / len(disease_ontology[db]) for db in disease_ontology) for name in names]
+
+	assert np.allclose(incidence_matrix.dot(term_weights), relevance)
+
+def test_disease_bitsets_are_built_once_per_disease_ontology(dataset, reference_ontologies):
+
+	annotations, _ = load_annotations(dataset)
+	_, disease_ontology = reference_ontologies
+
+	bitsets = annotations.get_disease_bitsets(disease_ontology)
+
+	# an equal ontology reuses them, another one gets its own
+	assert annotations.get_disease_bitsets({db: set(terms) for db, terms in disease_ontology.items()}) is bitsets
+
+	db = next(iter(disease_ontology))
+	other = annotations.get_disease_bitsets({db: set(disease_ontology[db])})
+	assert other is not bitsets and list(other) == [db]
@@ -0,0 +1,111 @@
+import sys
+import types
+
+import pandas as pd
+
+import check_genes
+from biological_random_walks.loader.gene_symbol_index import GeneSymbolIndex
+
+MAPPING = [
+	("Gene stable ID", "Gene name", "Gene Synonym"),
+	("ENSG00000000003", "TSPAN6", ""),
+	("ENSG00000000005", "", ""),
+	("ENSG00000141510", "TP53", "P53"),
+	("ENSG00000141510", "TP53", "LFS1"),
+	("ENSG00000012048", "BRCA1", ""),
+	]
+
+
+def write_mapping(tmp_path):
+
+	file_path = tmp_path / "mart.txt"
+	file_path.write_text("".join("\t".join(row) + "\n" for row in MAPPING))
+
+	return str(file_path)
+
+
+def test_lookup_missing_blank_and_alias_ids(tmp_path):
+
+	index = GeneSymbolIndex(write_mapping(tmp_path))
+
+	assert len(index) == 4
+	assert index.lookup(["ENSG00000141510", "ENSG00000000003", "ENSG00000000005", "ENSG99999999999"]) == {
+		"ENSG00000141510": ["TP53"],
+		"ENSG00000000003": ["TSPAN6"],
+		}
+	assert index.lookup_aliases(["ENSG00000141510", "ENSG00000000003", "ENSG00000000005"]) == {"ENSG00000141510": ["P53", "LFS1"]}
+	assert index.lookup([]) == {}
+
+def test_index_is_cached_on_disk(tmp_path):
+
+	mapping_file_path = write_mapping(tmp_path)
+	index = GeneSymbolIndex(mapping_file_path, cache_dir = str(tmp_path / "cache"))
+
+	# the second index maps the saved arrays
+	cached_index = GeneSymbolIndex(mapping_file_path, cache_dir = str(tmp_path / "cache"))
+	assert cached_index.ids.tolist() == index.ids.tolist()
+	assert cached_index.lookup(["ENSG00000012048"]) == {"ENSG00000012048": ["BRCA1"]}
+
+def test_blank_ids_go_to_the_remote_lookup(tmp_path, monkeypatch):
+
+	queried = []
+
+	class MyGeneInfo:
+		def querymany(self, ids, **options):
+			queried.extend(ids)
+			return [{"query": e, "symbol": "REMOTE_" + e[-3:]} for e in ids]
+
+	monkeypatch.setitem(sys.modules, "mygene", types.SimpleNamespace(MyGeneInfo = MyGeneInfo))
+
+	index = GeneSymbolIndex(write_mapping(tmp_path))
+	map_df = check_genes.map_ensembl_to_symbol(["ENSG00000141510", "ENSG00000000005", "ENSG99999999999"], {}, index)
+
+	assert queried == ["ENSG00000000005", "ENSG99999999999"]
+	assert map_df.values.tolist() == [
+		["ENSG00000141510", "TP53"],
+		["ENSG00000000005", "REMOTE_005"],
+		["ENSG99999999999", "REMOTE_999"],
+		]
+
+def test_aliases_only_feed_the_oncokb_match(tmp_path):
+
+	index = GeneSymbolIndex(write_mapping(tmp_path))
+	ids = ["ENSG00000141510", "ENSG00000000003", "ENSG00000000005"]
+	df_res = pd.DataFrame({"Ensembl_ID": ids, "Score": [0.3, 0.2, 0.1]})
+
+	map_df = check_genes.map_ensembl_to_symbol(ids, {}, index, remote = False)
+	out = check_genes.check_genes(df_res, map_df, {"LFS1", "P53"}, index.lookup_aliases(ids))
+
+	# one row per gene, its symbol, and a single hit through the aliases
+	assert out["Ensembl_ID"].tolist() == ids
+	assert out["Symbol"].tolist()[:2] == ["TP53", "TSPAN6"]
+	assert pd.isna(out["Symbol"].tolist()[2])
+	assert out["In_OncoKB"].tolist() == ["Yes", "No", "No"]
+
+def test_check_file_matches_primary_symbols_unless_asked(tmp_path):
+
+	index = GeneSymbolIndex(write_mapping(tmp_path))
+	input_path = tmp_path / "results.txt"
+	input_path.write_text("GeneNames\tScore\nENSG00000141510\t0.3\nENSG00000012048\t0.2\n")
+
+	# P53 is only an alias of TP53 in the mapping file: the original metric does not count it
+	_, hits = check_genes.check_file(str(input_path), str(tmp_path / "top100.tsv"), {"P53", "BRCA1"}, {}, index, remote = False)
+	assert hits == 1
+
+	_, hits = check_genes.check_file(str(input_path), str(tmp_path / "top100.tsv"), {"P53", "BRCA1"}, {}, index, remote = False, match_aliases = True)
+	assert hits == 2
+
+def test_symbol_cache_keeps_only_found_symbols(tmp_path):
+
+	index = GeneSymbolIndex(write_mapping(tmp_path))
+	symbols = {}
+	check_genes.map_ensembl_to_symbol(["ENSG00000141510", "ENSG99999999999"], symbols, index, remote = False)
+	symbols["ENSG99999999998"] = ["REMOTE_998"]
+
+	# an offline miss is not saved, so a later remote run still asks mygene
+	check_genes.save_symbol_cache(tmp_path / "symbols.json", symbols)
+	assert check_genes.load_symbol_cache(tmp_path / "symbols.json") == {"ENSG00000141510": ["TP53"], "ENSG99999999998": ["REMOTE_998"]}
+
+	# nor is one left over in an older cache file
+	(tmp_path / "symbols.json").write_text('{"ENSG99999999999": [], "ENSG99999999998": ["REMOTE_998"]}')
+	assert check_genes.load_symbol_cache(tmp_path / "symbols.json") == {"ENSG99999999998": ["REMOTE_998"]}
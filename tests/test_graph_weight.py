@@ -0,0 +1,41 @@
+import numpy as np
+
+from biological_random_walks.loader.loader import Loader
+from biological_random_walks.loader.sparse_graph import SparseGraph
+from biological_random_walks.graph_weight_computation.PPI_graph_weight_computation import ComputePPIGraphWeight
+
+
+def reference_weight(source, target, map__gene__ontologies, disease_ontology, c = 1):
+
+	# the original ComputePPIGraphWeight: c plus the disease terms shared by both ends, per DB
+	weight = c
+
+	for db, disease_terms in disease_ontology.items():
+		if source in map__gene__ontologies and target in map__gene__ontologies:
+			if db in map__gene__ontologies[source] and db in map__gene__ontologies[target]:
+				weight += len(disease_terms.intersection(map__gene__ontologies[source][db]).intersection(map__gene__ontologies[target][db]))
+
+	return weight
+
+def test_weights_match_the_dict_implementation(dataset, reference_ontologies):
+
+	loader = Loader(map_gene_ontologies_file_path = dataset["map__gene__ontologies_file_path"], disease_ontology_file_path = dataset["disease_ontology_file_path"])
+	PPI = loader.load_graph(dataset["ppi_file_path"])
+
+	computation = ComputePPIGraphWeight(PPI, map__gene__ontologies = loader.load_map__gene__ontologies(), disease_ontology = loader.load_disease_ontology())
+	name = loader.vocabulary.name
+
+	expected = SparseGraph.from_networkx(PPI)
+	adjacency_matrix = expected.adjacency_matrix.tocoo()
+	adjacency_matrix.data = np.array([reference_weight(name(expected.node_ids[u]), name(expected.node_ids[v]), *reference_ontologies) for u, v in zip(adjacency_matrix.row, adjacency_matrix.col)], dtype = np.float64)
+
+	# some edge gets more than the constant
+	assert adjacency_matrix.data.max() > 1
+
+	for weighted_PPI in (computation.compute_weight_on_graph(), computation.compute_sparse_weight_on_graph()):
+
+		weighted_PPI = weighted_PPI if isinstance(weighted_PPI, SparseGraph) else SparseGraph.from_networkx(weighted_PPI)
+		order = [weighted_PPI.get_node_index()[node] for node in expected.nodes()]
+
+		assert sorted(weighted_PPI.nodes()) == sorted(expected.nodes())
+		assert np.allclose(weighted_PPI.adjacency_matrix.toarray()[np.ix_(order, order)], adjacency_matrix.toarray())
@@ -0,0 +1,84 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from conftest import write_tsv
+from biological_random_walks.loader.loader import Loader
+from biological_random_walks.loader.sparse_graph import SparseGraph
+
+
+def assert_same_graph(sparse_G, G, sparse_vocabulary, vocabulary):
+
+	reference = SparseGraph.from_networkx(G)
+
+	# the same nodes, in the same order of first appearance
+	assert sparse_vocabulary.decode(sparse_G.nodes()) == vocabulary.decode(reference.nodes())
+	assert np.allclose(sparse_G.adjacency_matrix.toarray(), reference.adjacency_matrix.toarray())
+	assert sparse_G.number_of_edges() == G.number_of_edges()
+
+
+@pytest.mark.parametrize("network", ["ppi_file_path", "co_expression_file_path"])
+def test_sparse_loader_matches_networkx_loader(dataset, network):
+
+	loader = Loader()
+	G = loader.load_graph(dataset[network])
+
+	sparse_loader = Loader(sparse_graphs = True)
+	sparse_G = sparse_loader.load_sparse_graph(dataset[network])
+
+	assert_same_graph(sparse_G, G, sparse_loader.vocabulary, loader.vocabulary)
+
+def test_sparse_loader_matches_networkx_loader_on_irregular_rows(tmp_path):
+
+	# repeated and reversed pairs, a self loop, quoted names, a bad and a
+	# negative score, a row without score and one with too many columns
+	file_path = write_tsv(tmp_path / "irregular.tsv", ["u", "v", "score"], [
+		("A", "B", 0.5),
+		("B", "A", 0.9),
+		('"C D"', "A", -0.25),
+		("C D", "E", "n/a"),
+		("E", "E", 2.0),
+		("F", "B"),
+		("G", "H", 1.0, "extra"),
+		("A", "F", 0.75),
+		])
+
+	loader = Loader()
+	G = loader.load_graph(file_path)
+
+	sparse_loader = Loader(sparse_graphs = True)
+	sparse_G = sparse_loader.load_sparse_graph(file_path)
+
+	assert_same_graph(sparse_G, G, sparse_loader.vocabulary, loader.vocabulary)
+
+def load_without_warnings(file_path):
+
+	# no loadtxt warning leaks into the output of a batch
+	sparse_loader = Loader(sparse_graphs = True)
+	with warnings.catch_warnings():
+		warnings.simplefilter("error")
+		return sparse_loader, sparse_loader.load_sparse_graph(str(file_path))
+
+@pytest.mark.parametrize("content", ["", "u\tv\tscore\n"])
+def test_sparse_loader_on_empty_files(tmp_path, content):
+
+	file_path = tmp_path / "network.tsv"
+	file_path.write_text(content)
+
+	_, sparse_G = load_without_warnings(file_path)
+
+	assert sparse_G.number_of_nodes() == 0
+	assert sparse_G.number_of_edges() == len(Loader().load_graph(str(file_path)).edges()) == 0
+
+@pytest.mark.parametrize("content", ["u\tv\tscore\nA\tB\t0.5\n\nB\tC\t0.25\n\n", "u\tv\tscore\nA\tB\t0.5\n\nB\tC\n"])
+def test_sparse_loader_matches_networkx_loader_on_blank_lines(tmp_path, content):
+
+	file_path = tmp_path / "network.tsv"
+	file_path.write_text(content)
+
+	loader = Loader()
+	G = loader.load_graph(str(file_path))
+	sparse_loader, sparse_G = load_without_warnings(file_path)
+
+	assert_same_graph(sparse_G, G, sparse_loader.vocabulary, loader.vocabulary)
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from conftest import write_tsv
+
+from biological_random_walks.loader.loader import Loader
+from biological_random_walks.loader.sparse_graph import SparseGraph
+from biological_random_walks.matrix_creation.convex_combination_aggregation_matrix_creation import ConvexCombinationMatrixAggregationCreation
+from biological_random_walks.matrix_creation.multiplex_aggregation_matrix_creation import MultiplexMatrixAggregationCreation
+
+
+def load_networks(dataset, sparse_graphs):
+
+	loader = Loader(sparse_graphs = sparse_graphs)
+	return loader.load_network(dataset["ppi_file_path"]), loader.load_network(dataset["co_expression_file_path"]), loader.vocabulary
+
+def dense(G, vocabulary):
+
+	# adjacency with rows and columns in gene name order
+	G = G if isinstance(G, SparseGraph) else SparseGraph.from_networkx(G)
+	order = np.argsort(vocabulary.decode(G.nodes()))
+
+	return sorted(vocabulary.decode(G.nodes())), G.adjacency_matrix.toarray()[np.ix_(order, order)]
+
+
+@pytest.mark.parametrize("chosen_policy", ["PPI_network", "Intersection"])
+@pytest.mark.parametrize("beta", [0.0, 0.3, 1.0])
+def test_sparse_convex_combination_matches_networkx(dataset, chosen_policy, beta):
+
+	PPI, CO_expression, vocabulary = load_networks(dataset, sparse_graphs = False)
+	G, V = ConvexCombinationMatrixAggregationCreation(PPI, CO_expression, beta).run(chosen_policy)
+
+	sparse_PPI, sparse_CO_expression, sparse_vocabulary = load_networks(dataset, sparse_graphs = True)
+	sparse_G, sparse_V = ConvexCombinationMatrixAggregationCreation(sparse_PPI, sparse_CO_expression, beta).run_sparse(chosen_policy)
+
+	nodes, adjacency_matrix = dense(G, vocabulary)
+	sparse_nodes, sparse_adjacency_matrix = dense(sparse_G, sparse_vocabulary)
+
+	assert sparse_nodes == nodes
+	assert set(sparse_vocabulary.decode(sparse_V)) == set(vocabulary.decode(V))
+	assert np.allclose(sparse_adjacency_matrix, adjacency_matrix)
+
+
+def reference_multiplex(layers, weights, vocabulary):
+
+	# dense: every layer aligned on the nodes of the first one and row
+	# normalized, then the weighted sum; nodes left without edges dropped
+	nodes = sorted(vocabulary.decode(layers[0].nodes()))
+	aggregated_matrix = np.zeros((len(nodes), len(nodes)))
+
+	for layer, weight in zip(layers, weights):
+		layer = layer if isinstance(layer, SparseGraph) else SparseGraph.from_networkx(layer)
+		names = vocabulary.decode(layer.nodes())
+
+		position = {name: index for index, name in enumerate(nodes)}
+		inside = np.array([name in position for name in names])
+		order = np.array([position[name] for name, kept in zip(names, inside) if kept], dtype = int)
+
+		adjacency_matrix = np.zeros((len(nodes), len(nodes)))
+		adjacency_matrix[np.ix_(order, order)] = layer.adjacency_matrix.toarray()[np.ix_(inside, inside)]
+
+		total_weight = adjacency_matrix.sum(axis = 1, keepdims = True)
+		aggregated_matrix += weight * np.divide(adjacency_matrix, total_weight, out = np.zeros_like(adjacency_matrix), where = total_weight != 0.0)
+
+	has_edge = (aggregated_matrix > 0.0).any(axis = 0) | (aggregated_matrix > 0.0).any(axis = 1)
+
+	return [name for name, kept in zip(nodes, has_edge) if kept], aggregated_matrix[np.ix_(has_edge, has_edge)]
+
+@pytest.mark.parametrize("beta", [0.3, 0.8])
+def test_two_layer_multiplex_matches_convex_combination(dataset, beta):
+
+	PPI, CO_expression, vocabulary = load_networks(dataset, sparse_graphs = False)
+	G, _ = ConvexCombinationMatrixAggregationCreation(PPI, CO_expression, beta).run("PPI_network")
+
+	multiplex_G, _ = MultiplexMatrixAggregationCreation([PPI, CO_expression], [beta, 1 - beta]).run("First_layer")
+
+	nodes, adjacency_matrix = dense(G, vocabulary)
+	multiplex_nodes, multiplex_adjacency_matrix = dense(multiplex_G, vocabulary)
+
+	assert multiplex_nodes == nodes
+	assert np.allclose(multiplex_adjacency_matrix, adjacency_matrix)
+
+def test_multiplex_matches_dense_weighted_sum(dataset, tmp_path):
+
+	PPI, CO_expression, vocabulary = load_networks(dataset, sparse_graphs = True)
+
+	# a third layer on part of the PPI genes and on genes of no other layer
+	rows = [("ENSG%011d" % i, "ENSG%011d" % (i + 7), 0.5 + i % 3) for i in range(0, 70, 2)] + [("ENSG%011d" % 3, "NEW%d" % i, 1.0) for i in range(5)]
+	loader = Loader(sparse_graphs = True, vocabulary = vocabulary)
+	pathways = loader.load_network(write_tsv(tmp_path / "pathways.tsv", ["u", "v", "score"], rows))
+
+	layers, weights = [PPI, CO_expression, pathways], [0.5, 0.3, 0.2]
+	multiplex_G, V = MultiplexMatrixAggregationCreation(layers, weights).run("First_layer")
+
+	nodes, adjacency_matrix = reference_multiplex(layers, weights, vocabulary)
+	multiplex_nodes, multiplex_adjacency_matrix = dense(multiplex_G, vocabulary)
+
+	assert multiplex_nodes == nodes
+	assert set(vocabulary.decode(V)) == set(nodes)
+	assert np.allclose(multiplex_adjacency_matrix, adjacency_matrix)
@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+
+from biological_random_walks.loader.loader import Loader
+from biological_random_walks.loader.network_cache import NetworkCache
+
+
+def test_save_and_load(tmp_path):
+
+	cache = NetworkCache(str(tmp_path / "cache"))
+
+	assert cache.load("graph-missing") == None
+
+	cache.save("graph-1", {"indptr": np.array([0, 1, 2]), "names": np.array(["A", "B"])})
+	arrays = cache.load("graph-1")
+
+	assert arrays["indptr"].tolist() == [0, 1, 2]
+	assert arrays["names"].tolist() == ["A", "B"]
+
+def test_key_follows_content_and_options(tmp_path):
+
+	cache = NetworkCache(str(tmp_path / "cache"))
+	file_path = tmp_path / "ppi.tsv"
+
+	file_path.write_text("u\tv\nA\tB\n")
+	key = cache.key(str(file_path), "graph", has_header = True)
+
+	assert cache.key(str(file_path), "graph", has_header = True) == key
+	assert cache.key(str(file_path), "graph", has_header = False) != key
+	assert cache.key(str(file_path), "gene_ontologies", has_header = True) != key
+
+	# an edited file maps to a new entry
+	file_path.write_text("u\tv\nA\tC\n")
+	assert cache.key(str(file_path), "graph", has_header = True) != key
+
+def test_loader_hits_and_invalidates_the_cache(dataset, tmp_path):
+
+	cache_dir = str(tmp_path / "cache")
+	ppi_file_path = dataset["ppi_file_path"]
+
+	G = Loader(sparse_graphs = True, cache_dir = cache_dir).load_network(ppi_file_path)
+	entries = set(os.listdir(cache_dir))
+	assert len(entries) == 1
+
+	# a hit: no new entry, the same graph
+	cached_loader = Loader(sparse_graphs = True, cache_dir = cache_dir)
+	cached_G = cached_loader.load_network(ppi_file_path)
+
+	assert set(os.listdir(cache_dir)) == entries
+	assert [cached_loader.vocabulary.name(node) for node in cached_G.nodes()] == [G.vocabulary.name(node) for node in G.nodes()]
+	assert (cached_G.adjacency_matrix != G.adjacency_matrix).nnz == 0
+
+	# a miss after the file changes
+	with open(ppi_file_path, 'a') as fp:
+		fp.write("ENSG00000000001\tENSG00000000050\n")
+
+	edited_G = Loader(sparse_graphs = True, cache_dir = cache_dir).load_network(ppi_file_path)
+
+	assert len(os.listdir(cache_dir)) == 2
+	assert edited_G.number_of_edges() > G.number_of_edges()
@@ -0,0 +1,64 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from biological_random_walks.personalization_vector_creation.personalization_vector_cache import PersonalizationVectorCache
+
+
+def test_get_and_put():
+
+	cache = PersonalizationVectorCache()
+
+	assert cache.get("personalization_vector-missing") == None
+
+	cache.put("personalization_vector-1", np.array([0.25, 0.75]))
+	vector = cache.get("personalization_vector-1")
+
+	assert vector.tolist() == [0.25, 0.75]
+
+	# shared between runs, so read-only
+	with pytest.raises(ValueError):
+		vector[0] = 1.
+
+def test_least_recently_used_vector_is_evicted():
+
+	cache = PersonalizationVectorCache(max_size = 2)
+
+	cache.put("a", np.zeros(2))
+	cache.put("b", np.zeros(2))
+	cache.get("a")
+	cache.put("c", np.zeros(2))
+
+	assert len(cache) == 2
+	assert cache.get("b") == None
+	assert cache.get("a") is not None and cache.get("c") is not None
+
+def test_disk_hit_from_a_new_cache(tmp_path):
+
+	cache_dir = str(tmp_path / "cache")
+
+	PersonalizationVectorCache(cache_dir = cache_dir).put("personalization_vector-1", np.array([1., 2., 3.]))
+	cache = PersonalizationVectorCache(cache_dir = cache_dir)
+
+	assert cache.get("personalization_vector-1").tolist() == [1., 2., 3.]
+	assert len(cache) == 1
+
+def test_key_follows_files_nodes_and_network(tmp_path):
+
+	cache = PersonalizationVectorCache()
+	file_path = tmp_path / "seeds.txt"
+	file_path.write_text("A\n")
+
+	G = nx.Graph([("A", "B"), ("B", "C")])
+	key = cache.key("topological", [str(file_path), None], ["A", "B", "C"], G)
+
+	assert cache.key("topological", [str(file_path), None], ["A", "B", "C"], G) == key
+	assert cache.key("biological", [str(file_path), None], ["A", "B", "C"], G) != key
+	assert cache.key("topological", [str(file_path), None], ["C", "B", "A"], G) != key
+	assert cache.key("topological", [str(file_path), None], ["A", "B", "C"], nx.Graph([("A", "B"), ("A", "C")])) != key
+
+	# weights do not change the key, the edges do
+	assert cache.key("topological", [str(file_path), None], ["A", "B", "C"], nx.Graph([("A", "B", {"weight": 2.}), ("B", "C")])) == key
+
+	file_path.write_text("A\nB\n")
+	assert cache.key("topological", [str(file_path), None], ["A", "B", "C"], G) != key
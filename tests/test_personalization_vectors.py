@@ -0,0 +1,147 @@
+import numpy as np
+import pytest
+
+from biological_random_walks.loader.loader import Loader
+from biological_random_walks.personalization_vector_creation.default_personalization_vector_creation import DefaultPersonalizationVectorCreation
+from biological_random_walks.personalization_vector_creation.biological_personalization_vector_creation import BiologicalPersonalizationVectorCreation
+from biological_random_walks.personalization_vector_creation.topological_personalization_vector_creation import TopologicalPersonalizationVectorCreation
+from biological_random_walks.personalization_vector_aggregation.p_v_aggregation import PersonalizationVectorAggregation
+
+
+# the original dict implementations, by gene name
+
+def reference_default(seed_set, universe):
+
+	seeds = universe.intersection(seed_set)
+	return {node: 1.0 / len(seeds) if node in seeds else 0.0 for node in universe}
+
+def reference_biological(seed_set, universe, map__gene__ontologies, disease_ontology):
+
+	personalization_vector = {}
+	for node in universe:
+
+		if node in seed_set:
+			personalization_vector[node] = len(disease_ontology)
+			continue
+
+		node_ontologies = map__gene__ontologies.get(node, {})
+		personalization_vector[node] = sum(len(terms.intersection(node_ontologies[db])) / len(terms) for db, terms in disease_ontology.items() if db in node_ontologies)
+
+	l_1_norm = sum(personalization_vector.values())
+	return {node: value / l_1_norm for node, value in personalization_vector.items()}
+
+def reference_topological(seed_set, universe, G, secondary_seed_set):
+
+	# adjacency lists by name; the original removed the characters of the
+	# node name from its radius 2 set (difference(node)), so the node stays
+	personalization_vector = {}
+	for node in universe:
+
+		if node not in secondary_seed_set:
+			personalization_vector[node] = 0.0
+			continue
+
+		neighbors = set(G[node])
+		neighbors_radius_2 = set(neighbor_radius_2 for neighbor in neighbors for neighbor_radius_2 in G[neighbor]).difference(neighbors)
+
+		personalization_vector[node] = len(neighbors.intersection(seed_set)) / len(neighbors) + len(neighbors_radius_2.intersection(seed_set)) / len(neighbors_radius_2)
+
+	l_1_norm = sum(personalization_vector.values())
+	return {node: value / l_1_norm for node, value in personalization_vector.items()}
+
+def reference_aggregation(personalization_vectors, universe, alpha, chosen_policy):
+
+	aggregated_personalization_vector = {}
+	for node in universe:
+		aggregated_personalization_vector[node] = 0.0
+
+		for i, p_v in enumerate(personalization_vectors):
+			if i == 0:
+				aggregated_personalization_vector[node] += alpha * p_v[node]
+			elif chosen_policy == "Sum":
+				aggregated_personalization_vector[node] += (1 - alpha) * p_v[node]
+			elif chosen_policy == "Product":
+				aggregated_personalization_vector[node] *= p_v[node]
+
+	l_1 = sum(aggregated_personalization_vector.values())
+	return {node: value / l_1 for node, value in aggregated_personalization_vector.items()}
+
+
+@pytest.fixture
+def inputs(dataset):
+
+	loader = Loader(map_gene_ontologies_file_path = dataset["map__gene__ontologies_file_path"], disease_ontology_file_path = dataset["disease_ontology_file_path"], sparse_graphs = True)
+
+	G = loader.load_network(dataset["ppi_file_path"])
+	seed_set = loader.load_seed_set(dataset["seed_file_path"])
+	secondary_seed_set = loader.load_seed_set(dataset["secondary_seed_file_path"])
+
+	return G, seed_set, secondary_seed_set, loader.load_map__gene__ontologies(), loader.load_disease_ontology(), loader.vocabulary
+
+def by_name(personalization_vector, nodes, vocabulary):
+
+	# a dict or an array aligned with nodes, as {gene name: value}
+	if isinstance(personalization_vector, dict):
+		return {vocabulary.name(node): value for node, value in personalization_vector.items()}
+
+	return dict(zip(vocabulary.decode(nodes), personalization_vector.tolist()))
+
+def assert_same_vector(personalization_vector, expected):
+
+	names = sorted(expected)
+	assert sorted(personalization_vector) == names
+	assert np.allclose([personalization_vector[name] for name in names], [expected[name] for name in names])
+
+
+def test_default_and_biological_vectors_match_the_dict_implementation(inputs, reference_ontologies):
+
+	G, seed_set, _, map__gene__ontologies, disease_ontology, vocabulary = inputs
+	nodes, universe = G.nodes(), set(G.nodes())
+	names = set(vocabulary.decode(nodes))
+
+	expected = reference_default(set(vocabulary.decode(seed_set)), names)
+	step = DefaultPersonalizationVectorCreation(seed_set, universe)
+
+	assert_same_vector(by_name(step.run_vector(nodes), nodes, vocabulary), expected)
+	assert_same_vector(by_name(step.run(), nodes, vocabulary), expected)
+
+	expected = reference_biological(set(vocabulary.decode(seed_set)), names, *reference_ontologies)
+	step = BiologicalPersonalizationVectorCreation(seed_set, universe, disease_ontology = disease_ontology, map__gene_name__ontologies = map__gene__ontologies)
+
+	assert_same_vector(by_name(step.run_vector(nodes), nodes, vocabulary), expected)
+	assert_same_vector(by_name(step.run(), nodes, vocabulary), expected)
+
+@pytest.mark.parametrize("chosen_policy", ["Sum", "Product"])
+def test_vector_aggregation_matches_the_dict_implementation(inputs, chosen_policy):
+
+	G, seed_set, _, map__gene__ontologies, disease_ontology, vocabulary = inputs
+	nodes, universe = G.nodes(), set(G.nodes())
+
+	steps = [
+		DefaultPersonalizationVectorCreation(seed_set, universe),
+		BiologicalPersonalizationVectorCreation(seed_set, universe, disease_ontology = disease_ontology, map__gene_name__ontologies = map__gene__ontologies),
+		]
+	personalization_vectors = [step.run_vector(nodes) for step in steps]
+
+	expected = reference_aggregation([by_name(p_v, nodes, vocabulary) for p_v in personalization_vectors], set(vocabulary.decode(nodes)), 0.3, chosen_policy)
+	aggregated = PersonalizationVectorAggregation(personalization_vectors, universe, 0.3).run(chosen_policy = chosen_policy)
+
+	assert isinstance(aggregated, np.ndarray)
+	assert_same_vector(by_name(aggregated, nodes, vocabulary), expected)
+
+def test_topological_vector_matches_the_dict_implementation(inputs):
+
+	G, seed_set, secondary_seed_set, _, _, vocabulary = inputs
+	nodes, universe = G.nodes(), set(G.nodes())
+
+	adjacency = {vocabulary.name(node): vocabulary.decode(G[node]) for node in nodes}
+	expected = reference_topological(set(vocabulary.decode(seed_set)), set(adjacency), adjacency, set(vocabulary.decode(secondary_seed_set)))
+
+	# some secondary seed has seeds around it
+	assert max(expected.values()) > 0.0
+
+	for graph in (G, G.to_networkx()):
+		step = TopologicalPersonalizationVectorCreation(seed_set, universe, G = graph, secondary_seed_set = secondary_seed_set)
+
+		assert_same_vector(by_name(step.run_vector(nodes), nodes, vocabulary), expected)
+		assert_same_vector(by_name(step.run(), nodes, vocabulary), expected)
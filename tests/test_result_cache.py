@@ -0,0 +1,42 @@
+from biological_random_walks.result_cache import ResultCache
+
+
+def test_key_follows_files_and_parameters(tmp_path):
+
+	cache = ResultCache(str(tmp_path / "cache"))
+	file_path = tmp_path / "ppi.tsv"
+	file_path.write_text("u\tv\nA\tB\n")
+
+	file_paths = {"ppi_file_path": str(file_path), "de_genes_file_path": None}
+	key = cache.key(file_paths, alpha = 0.5, beta = 0.5)
+
+	assert cache.key(file_paths, beta = 0.5, alpha = 0.5) == key
+	assert cache.key(file_paths, alpha = 0.5, beta = 0.6) != key
+	assert cache.key({"ppi_file_path": str(file_path)}, alpha = 0.5, beta = 0.5) != key
+
+	file_path.write_text("u\tv\nA\tC\n")
+	assert cache.key(file_paths, alpha = 0.5, beta = 0.5) != key
+
+def test_ranked_list(tmp_path):
+
+	cache = ResultCache(str(tmp_path / "cache"))
+
+	assert cache.load_ranked_list("result-missing") == None
+
+	cache.save_ranked_list("result-1", [["B", 0.5], ["A", 0.25]])
+
+	assert ResultCache(str(tmp_path / "cache")).load_ranked_list("result-1") == [["B", 0.5], ["A", 0.25]]
+
+def test_evaluations(tmp_path):
+
+	cache = ResultCache(str(tmp_path / "cache"))
+	cache.save_ranked_list("result-1", [["A", 1.]])
+
+	assert cache.load_evaluations("result-1") == {}
+	assert cache.load_evaluation("result-1", "oncokb") == None
+
+	cache.save_evaluation("result-1", "oncokb", 3)
+	cache.save_evaluation("result-1", "enrichment", [1, 2])
+
+	assert ResultCache(str(tmp_path / "cache")).load_evaluations("result-1") == {"oncokb": 3, "enrichment": [1, 2]}
+	assert cache.load_evaluation("result-2", "oncokb") == None
@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+from biological_random_walks.loader.loader import Loader
+from biological_random_walks.loader.shared_network_store import SharedNetworkStore
+
+
+def test_store_serves_the_loaded_network(dataset, tmp_path):
+
+	store = SharedNetworkStore.create(str(tmp_path / "store"), graph_file_paths = [dataset["ppi_file_path"]])
+
+	G = Loader(sparse_graphs = True).load_network(dataset["ppi_file_path"])
+	stored_G = store.get_graph(dataset["ppi_file_path"], store.get_vocabulary())
+
+	assert [store.get_vocabulary().name(node) for node in stored_G.nodes()] == [G.vocabulary.name(node) for node in G.nodes()]
+	assert (stored_G.adjacency_matrix != G.adjacency_matrix).nnz == 0
+
+def test_complete_store_is_reused_not_rebuilt(dataset, tmp_path):
+
+	store_dir = str(tmp_path / "store")
+	SharedNetworkStore.create(store_dir, graph_file_paths = [dataset["ppi_file_path"]])
+	mtimes = {name: os.stat(os.path.join(store_dir, name)).st_mtime_ns for name in os.listdir(store_dir)}
+
+	SharedNetworkStore.create(store_dir, graph_file_paths = [dataset["ppi_file_path"]])
+
+	assert {name: os.stat(os.path.join(store_dir, name)).st_mtime_ns for name in os.listdir(store_dir)} == mtimes
+
+def test_other_store_is_never_deleted(dataset, tmp_path):
+
+	store_dir = str(tmp_path / "store")
+	SharedNetworkStore.create(store_dir, graph_file_paths = [dataset["ppi_file_path"]])
+	names = sorted(os.listdir(store_dir))
+
+	with pytest.raises(AssertionError):
+		SharedNetworkStore.create(store_dir, graph_file_paths = [dataset["co_expression_file_path"]])
+
+	assert sorted(os.listdir(store_dir)) == names
@@ -0,0 +1,233 @@
+import concurrent.futures
+import random
+
+import numpy as np
+import networkx as nx
+import pytest
+
+from biological_random_walks.core.page_rank_core import RandomWalkWithRestartCore, SOLVERS
+from biological_random_walks.core.alpha_free_core import AlphaFreeRandomWalkWithRestartCore
+from biological_random_walks.core.local_push_core import LocalPushRandomWalkWithRestartCore
+from biological_random_walks.loader.gene_vocabulary import GeneVocabulary
+from biological_random_walks.loader.sparse_graph import SparseGraph
+
+RESTART_PROB = 0.9
+
+
+def make_graph(n = 60, edges = 180, seed = 0):
+
+	rng = random.Random(seed)
+	names = ["G%02d" % i for i in range(n)]
+	G = nx.DiGraph()
+
+	# a ring keeps every node on an edge, as in a loaded network
+	for u, v in zip(names, names[1:] + names[:1]):
+		G.add_edge(u, v, weight = 1.0)
+		G.add_edge(v, u, weight = 1.0)
+
+	while G.number_of_edges() < edges:
+		u, v = rng.sample(names, 2)
+		w = rng.random()
+		G.add_edge(u, v, weight = w)
+		G.add_edge(v, u, weight = w)
+
+	return G
+
+def make_personalization_vector(G, seeds):
+	return {node: 1.0 / len(seeds) if node in seeds else 0.0 for node in G.nodes()}
+
+def baseline_scores(G, personalization_vector, restart_prob):
+
+	# the dict based power iteration of the original core
+	G_normalized = nx.DiGraph()
+	for u in G:
+		total_weight = sum(G[u][v]["weight"] for v in G[u])
+		for v in G[u]:
+			G_normalized.add_edge(u, v, weight = G[u][v]["weight"] / total_weight if total_weight != 0.0 else 0.0)
+
+	p_t = dict(personalization_vector)
+	diff_norm = 1
+
+	while diff_norm > 0.000001:
+		p_t_1 = {i: (1 - restart_prob) * sum(p_t[j] * G_normalized[j][i]["weight"] for j in G_normalized[i]) + restart_prob * personalization_vector[i] for i in p_t}
+		diff_norm = sum(abs(p_t_1[i] - p_t[i]) for i in p_t)
+		p_t = p_t_1
+
+	return p_t
+
+
+@pytest.mark.parametrize("solver", SOLVERS)
+def test_solver_matches_baseline(solver):
+
+	G = make_graph()
+	personalization_vector = make_personalization_vector(G, {"G01", "G07", "G30"})
+
+	expected = baseline_scores(G, personalization_vector, RESTART_PROB)
+	ranked_list = RandomWalkWithRestartCore(personalization_vector, G, RESTART_PROB, solver = solver).run()
+
+	assert set(node for node, _ in ranked_list) == set(expected)
+	for node, score in ranked_list:
+		assert score == pytest.approx(expected[node], abs = 1e-6)
+
+@pytest.mark.parametrize("solver", SOLVERS)
+def test_solver_on_sparse_graph(solver):
+
+	G = make_graph(seed = 1)
+	vocabulary = GeneVocabulary(sorted(G.nodes()))
+	sparse_G = SparseGraph.from_networkx(nx.relabel_nodes(G, vocabulary.index), vocabulary)
+
+	personalization_vector = make_personalization_vector(G, {"G02", "G11"})
+	expected = baseline_scores(G, personalization_vector, RESTART_PROB)
+
+	ranked_list = RandomWalkWithRestartCore({vocabulary.index(node): score for node, score in personalization_vector.items()}, sparse_G, RESTART_PROB, solver = solver).run()
+
+	for node, score in ranked_list:
+		assert score == pytest.approx(expected[vocabulary.name(node)], abs = 1e-6)
+
+def test_batch_matches_single_solves():
+
+	G = make_graph(seed = 2)
+	personalization_vectors = [make_personalization_vector(G, seeds) for seeds in ({"G03"}, {"G04", "G05"}, {"G40", "G41", "G42"})]
+
+	core = RandomWalkWithRestartCore(None, G, RESTART_PROB)
+	P_t = core.solve_batch(core.get_personalization_matrix(personalization_vectors))
+
+	for j, personalization_vector in enumerate(personalization_vectors):
+		expected = baseline_scores(G, personalization_vector, RESTART_PROB)
+		assert P_t[:, j] == pytest.approx([expected[node] for node in core.nodes], abs = 1e-6)
+
+def test_alpha_free_core_matches_aggregated_vector():
+
+	G = make_graph(seed = 3)
+	personalization_vectors = [make_personalization_vector(G, {"G06", "G09"}), make_personalization_vector(G, {"G20"})]
+	alpha = 0.3
+
+	# Sum aggregation: alpha * pv_0 + (1 - alpha) * pv_1, normalized
+	aggregated = {node: alpha * personalization_vectors[0][node] + (1 - alpha) * personalization_vectors[1][node] for node in G.nodes()}
+	expected = baseline_scores(G, aggregated, RESTART_PROB)
+
+	ranked_list = AlphaFreeRandomWalkWithRestartCore(personalization_vectors, G, RESTART_PROB).run(alpha)
+
+	for node, score in ranked_list:
+		assert score == pytest.approx(expected[node], abs = 1e-6)
+
+def test_ties_are_listed_by_name():
+
+	# a star: every leaf gets the same score
+	G = nx.DiGraph()
+	for leaf in ["G05", "G03", "G09", "G01"]:
+		G.add_edge("G00", leaf, weight = 1.0)
+		G.add_edge(leaf, "G00", weight = 1.0)
+
+	ranked_list = RandomWalkWithRestartCore(make_personalization_vector(G, {"G00"}), G, RESTART_PROB).run()
+
+	assert [node for node, _ in ranked_list] == ["G00", "G01", "G03", "G05", "G09"]
+	assert [node for node, _ in RandomWalkWithRestartCore(make_personalization_vector(G, {"G00"}), G, RESTART_PROB).run(top_k = 3)] == ["G00", "G01", "G03"]
+	assert [node for node, _ in LocalPushRandomWalkWithRestartCore(make_personalization_vector(G, {"G00"}), G, RESTART_PROB).run(top_k = 3)] == ["G00", "G01", "G03"]
+
+def test_direct_solver_on_threads():
+
+	# more distinct matrices than factorization cache entries, on several threads
+	G = make_graph(seed = 4)
+	personalization_vector = make_personalization_vector(G, {"G10", "G12"})
+	restart_probs = [0.5, 0.6, 0.7, 0.8, 0.9] * 4
+
+	solve = lambda restart_prob: dict(RandomWalkWithRestartCore(personalization_vector, G, restart_prob, solver = "direct").run())
+
+	with concurrent.futures.ThreadPoolExecutor(8) as pool:
+		results = list(pool.map(solve, restart_probs))
+
+	for restart_prob, scores in zip(restart_probs, results):
+		expected = baseline_scores(G, personalization_vector, restart_prob)
+		for node, score in scores.items():
+			assert score == pytest.approx(expected[node], abs = 1e-6)
+
+def test_local_push_within_its_error_bound():
+
+	G = make_graph(seed = 5)
+	personalization_vector = make_personalization_vector(G, {"G15", "G16"})
+	expected = baseline_scores(G, personalization_vector, RESTART_PROB)
+
+	core = LocalPushRandomWalkWithRestartCore(personalization_vector, G, RESTART_PROB, epsilon = 1e-9)
+	ranked_list = core.run()
+	error_bound = core.get_convergence_info()["residual"]
+
+	assert len(ranked_list) == G.number_of_nodes()
+	for node, score in ranked_list:
+		assert abs(score - expected[node]) <= error_bound + 1e-6
+
+	# the top k of a push is the head of its full ranked list
+	assert core.run(top_k = 10) == ranked_list[:10]
+
+def test_local_push_stays_local():
+
+	# a long path: a seed at one end never reaches the other end
+	names = ["G%03d" % i for i in range(500)]
+	G = nx.DiGraph()
+	for u, v in zip(names, names[1:]):
+		G.add_edge(u, v, weight = 1.0)
+		G.add_edge(v, u, weight = 1.0)
+
+	vocabulary = GeneVocabulary(names)
+	sparse_G = SparseGraph.from_networkx(nx.relabel_nodes(G, vocabulary.index), vocabulary)
+
+	core = LocalPushRandomWalkWithRestartCore({vocabulary.index("G000"): 1.0}, sparse_G, RESTART_PROB, epsilon = 1e-6)
+	ranked_list = core.run(top_k = 3)
+
+	assert core.get_convergence_info()["touched_nodes"] < 20
+	assert [vocabulary.name(node) for node, _ in ranked_list] == ["G000", "G001", "G002"]
+
+def test_top_k_stops_early_with_the_same_list():
+
+	G = make_graph(n = 300, edges = 1200, seed = 6)
+	personalization_vector = make_personalization_vector(G, {"G01", "G02"})
+
+	full_core = RandomWalkWithRestartCore(personalization_vector, G, 0.5)
+	full_ranked_list = full_core.run()
+
+	core = RandomWalkWithRestartCore(personalization_vector, G, 0.5)
+	ranked_list = core.run(top_k = 5)
+
+	assert core.get_convergence_info()["iterations"] < full_core.get_convergence_info()["iterations"]
+	assert core.get_convergence_info()["certified_k"] == 5
+	assert core.get_convergence_info()["certified_order_k"] == 5
+	assert [node for node, _ in ranked_list] == [node for node, _ in full_ranked_list[:5]]
+
+def test_tie_at_the_boundary_is_not_certified():
+
+	certify = RandomWalkWithRestartCore.__certify_top_scores__
+
+	# ties inside the top 3 do not matter, a tie between 3rd and 4th does
+	assert certify(np.array([0.5, 0.2, 0.2, 0.1]), 3, 0.01) == 3
+	assert certify(np.array([0.5, 0.2, 0.1, 0.1]), 3, 0.01) == 2
+	assert certify(np.array([0.5, 0.2]), 3, 0.01) == 2
+
+def test_order_needs_every_gap_inside_the_top_k():
+
+	certify_order = RandomWalkWithRestartCore.__certify_top_order__
+
+	# the set of 3 is certain, but the 2nd and 3rd may still swap
+	assert certify_order(np.array([0.5, 0.2, 0.185, 0.1]), 3, 0.01) == 2
+	assert certify_order(np.array([0.5, 0.2, 0.15, 0.1]), 3, 0.01) == 3
+
+	# an exact tie may still split either way, at the boundary it stops the set
+	assert certify_order(np.array([0.5, 0.2, 0.2, 0.1]), 3, 0.01) == 1
+	assert certify_order(np.array([0.5, 0.3, 0.1, 0.1]), 3, 0.01) == 2
+	assert certify_order(np.array([0.5, 0.2]), 3, 0.01) == 2
+
+def test_tie_on_the_way_is_not_certified_as_order():
+
+	# a path with 9 nodes on one side of the seed and 8 on the other: A1 and
+	# B1 tie for the first iterations and only the far ends split them
+	G = nx.DiGraph()
+	for prefix, length in (("A", 9), ("B", 8)):
+		path = ["S"] + ["%s%d" % (prefix, i) for i in range(1, length + 1)]
+		for u, v in zip(path, path[1:]):
+			G.add_edge(u, v, weight = 1.0)
+			G.add_edge(v, u, weight = 1.0)
+	personalization_vector = make_personalization_vector(G, {"S"})
+
+	full_ranked_list = RandomWalkWithRestartCore(personalization_vector, G, 0.5).run()
+	ranked_list = RandomWalkWithRestartCore(personalization_vector, G, 0.5).run(top_k = 3)
+
+	assert [node for node, _ in ranked_list] == [node for node, _ in full_ranked_list[:3]]
@@ -0,0 +1,205 @@
+import csv
+
+import pytest
+
+from biological_random_walks.BiologicalRandomWalks import BiologicalRandomWalks
+from biological_random_walks.run_policies import INPUT_KEYS, get_policies
+from biological_random_walks.stage_scheduler import StageScheduler
+from biological_random_walks.loader.shared_network_store import SharedNetworkStore
+
+ABLATIONS = {
+	"FULL": [],
+	"noCOEXP": ["co_expression_file_path"],
+	"noDE": ["secondary_seed_file_path"],
+	"noONTO": ["disease_ontology_file_path", "map__gene__ontologies_file_path"],
+	"PPI_only": ["co_expression_file_path", "secondary_seed_file_path", "disease_ontology_file_path", "map__gene__ontologies_file_path"],
+	}
+
+POINTS = [(0.5, 0.5), (0.25, 0.75), (1.0, 0.0), (0.5, 0.25)]
+
+
+def make_runs(dataset, output_dir):
+
+	runs = []
+	for name, dropped in ABLATIONS.items():
+		for alpha, beta in POINTS:
+			run = {key: None if key in dropped else dataset[key] for key in INPUT_KEYS}
+			run.update(alpha = alpha, beta = beta, output_file_path = str(output_dir / ("results_%s_A%s_B%s.txt" % (name, alpha, beta))))
+			runs.append(run)
+
+	return runs
+
+def run_serially(run, output_file_path):
+
+	# the run as main.py builds it
+	inputs = {key: run[key] for key in INPUT_KEYS}
+	matrix_aggregation_policy, personalization_vector_creation_policies, network_weight_flag = get_policies(inputs)
+
+	BiologicalRandomWalks(
+		matrix_aggregation_policy = matrix_aggregation_policy,
+		personalization_vector_creation_policies = personalization_vector_creation_policies,
+		network_weight_flag = network_weight_flag,
+		restart_prob = 0.9,
+		alpha = run["alpha"],
+		beta = run["beta"],
+		output_file_path = output_file_path,
+		**inputs)
+
+def read_ranked_list(file_path):
+
+	with open(file_path, 'r') as fp:
+		rows = list(csv.reader(fp, delimiter = "\t"))
+
+	assert rows[0] == ["GeneNames", "Score"]
+	return [(gene, float(score)) for gene, score in rows[1:]]
+
+
+def test_scheduler_matches_serial_runs(dataset, tmp_path):
+
+	(tmp_path / "scheduled").mkdir()
+	(tmp_path / "serial").mkdir()
+
+	runs = make_runs(dataset, tmp_path / "scheduled")
+
+	scheduler = StageScheduler(restart_prob = 0.9, workers = 4, evaluate = lambda index, run, key: index)
+	scheduler.plan(runs)
+
+	# one load per input file, one weighting, one solve per (inputs, beta)
+	counts = scheduler.get_stage_counts()
+	assert counts["load"][1] == len(dataset)
+	assert counts["weight"][1] == 1
+	assert counts["evaluate"][0] == len(runs)
+	assert counts["solve"][1] < counts["solve"][0]
+
+	assert scheduler.execute() == list(range(len(runs)))
+
+	for run in runs:
+		serial_file_path = str(tmp_path / "serial" / run["output_file_path"].split("/")[-1])
+		run_serially(run, serial_file_path)
+
+		scheduled = read_ranked_list(run["output_file_path"])
+		serial = read_ranked_list(serial_file_path)
+
+		assert [gene for gene, _ in scheduled] == [gene for gene, _ in serial]
+		assert [score for _, score in scheduled] == pytest.approx([score for _, score in serial], abs = 1e-6)
+
+def test_scheduler_resumes_from_result_cache(dataset, tmp_path):
+
+	runs = make_runs(dataset, tmp_path)
+
+	scheduler = StageScheduler(restart_prob = 0.9, result_cache_dir = str(tmp_path / "results"))
+	scheduler.plan(runs)
+	scheduler.execute()
+
+	first = [read_ranked_list(run["output_file_path"]) for run in runs]
+
+	# every run is found: only evaluate nodes are planned
+	scheduler = StageScheduler(restart_prob = 0.9, result_cache_dir = str(tmp_path / "results"))
+	scheduler.plan(runs)
+
+	assert sum(planned for stage, (planned, _) in scheduler.get_stage_counts().items() if stage != "evaluate") == 0
+
+	scheduler.execute()
+	assert [read_ranked_list(run["output_file_path"]) for run in runs] == first
+
+def test_betas_start_from_the_nearest_solved_beta(dataset, tmp_path):
+
+	runs = []
+	for beta in [0.5, 0.45, 0.9, 0.55]:
+		run = {key: dataset[key] for key in INPUT_KEYS}
+		run.update(alpha = 0.5, beta = beta, output_file_path = str(tmp_path / ("results_B%s.txt" % beta)))
+		runs.append(run)
+
+	scheduler = StageScheduler(restart_prob = 0.9, workers = 4)
+	scheduler.plan(runs)
+
+	solves = {key[1]: key for key, node in scheduler.nodes.items() if node.stage == "solve"}
+	first_dependencies = scheduler.nodes[solves[0.5]].dependencies
+
+	# the first beta is solved cold, every other one after its nearest planned beta
+	assert [scheduler.nodes[solves[beta]].dependencies[0] for beta in [0.45, 0.9, 0.55]] == [solves[0.5], solves[0.5], solves[0.5]]
+	assert all(scheduler.nodes[solves[beta]].dependencies[1:] == first_dependencies for beta in [0.45, 0.9, 0.55])
+
+	scheduler.execute()
+
+	cold_scheduler = StageScheduler(restart_prob = 0.9, workers = 4)
+	cold_scheduler.plan(runs[3:])
+	cold_scheduler.execute()
+
+	warm = scheduler.nodes[solves[0.55]].result
+	cold = cold_scheduler.nodes[solves[0.55]].result
+
+	assert sum(warm.get_convergence_info()["iterations"]) < sum(cold.get_convergence_info()["iterations"])
+	assert warm.get_stationary_vectors() == pytest.approx(cold.get_stationary_vectors(), abs = 1e-6)
+
+def test_process_pool_matches_threads(dataset, tmp_path):
+
+	(tmp_path / "threads").mkdir()
+	(tmp_path / "processes").mkdir()
+
+	runs = make_runs(dataset, tmp_path / "threads")
+
+	scheduler = StageScheduler(restart_prob = 0.9)
+	scheduler.plan(runs)
+	scheduler.execute()
+
+	store = SharedNetworkStore.create(str(tmp_path / "store"),
+		graph_file_paths = [dataset["ppi_file_path"], dataset["co_expression_file_path"]],
+		map_gene_ontologies_file_path = dataset["map__gene__ontologies_file_path"])
+
+	# one job per ablation, collected in the order of the runs
+	scheduler = StageScheduler(restart_prob = 0.9, processes = 2, group_keys = INPUT_KEYS, network_store = store,
+		result_cache_dir = str(tmp_path / "results"), evaluate = lambda index, run, key: (index, key))
+	scheduler.plan([dict(run, output_file_path = run["output_file_path"].replace("threads", "processes")) for run in runs])
+
+	assert len(scheduler.get_jobs()) == len(ABLATIONS)
+
+	evaluations = scheduler.execute()
+	assert [index for index, _ in evaluations] == list(range(len(runs)))
+	assert all(scheduler.result_cache.load_ranked_list(key) != None for _, key in evaluations)
+
+	for run in runs:
+		threads = read_ranked_list(run["output_file_path"])
+		processes = read_ranked_list(run["output_file_path"].replace("threads", "processes"))
+
+		assert [gene for gene, _ in processes] == [gene for gene, _ in threads]
+		assert [score for _, score in processes] == pytest.approx([score for _, score in threads], abs = 1e-9)
+
+def test_schedulers_share_loaded_inputs(dataset, tmp_path):
+
+	runs = make_runs(dataset, tmp_path)
+
+	first = StageScheduler(restart_prob = 0.9)
+	first.plan(runs[:len(POINTS)])
+	first.execute()
+
+	loaded = dict(first.loaded_inputs)
+	assert len(loaded) == len(dataset)
+
+	# a later job of the same worker: nothing is loaded again
+	second = StageScheduler(restart_prob = 0.9, vocabulary = first.vocabulary, loaded_inputs = first.loaded_inputs)
+	second.plan(runs[len(POINTS):])
+	second.execute()
+
+	assert len(second.loaded_inputs) == len(loaded)
+	assert all(second.loaded_inputs[key] is value for key, value in loaded.items())
+
+def test_personalize_stage_hits_the_vector_cache(dataset, tmp_path):
+
+	runs = make_runs(dataset, tmp_path)
+
+	first = StageScheduler(restart_prob = 0.9)
+	first.plan(runs)
+	first.execute()
+
+	vectors = [node.result for node in first.nodes.values() if node.stage == "personalize"]
+	# nodes over graphs with the same nodes (weighted or not) share their vectors
+	assert 0 < len(first.personalization_vector_cache) <= len(vectors)
+
+	# same vectors, taken from the cache instead of computed again
+	second = StageScheduler(restart_prob = 0.9, personalization_vector_cache = first.personalization_vector_cache)
+	second.plan(runs)
+	second.execute()
+
+	cached = [node.result for node in second.nodes.values() if node.stage == "personalize"]
+	assert all(any(vector is other for other in vectors) for vector in cached)